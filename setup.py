@@ -97,6 +97,9 @@ setup(
         "alignment": [
             "onnx>=1,<2",
         ],
+        "stream": [
+            "sentence-stream>=1.2.1,<2",
+        ],
         "zh": [
             # g2pW supplies the pinyin/bopomofo lookup tables. Its model is run
             # by piper.g2pw_onnx rather than g2pw.api, which is what keeps torch
@@ -1,12 +1,15 @@
 """Piper text-to-speech engine."""
 
-from .config import PhonemeType, PiperConfig, SynthesisConfig
+from .audio_cache import AudioCache
+from .config import PhonemeType, PiperConfig, SessionConfig, SynthesisConfig
 from .voice import AudioChunk, PiperVoice
 
 __all__ = [
+    "AudioCache",
     "AudioChunk",
     "PhonemeType",
     "PiperConfig",
     "PiperVoice",
+    "SessionConfig",
     "SynthesisConfig",
 ]
@@ -12,7 +12,7 @@ from pathlib import Path
 
 from pathvalidate import sanitize_filename
 
-from . import PiperVoice, SynthesisConfig
+from . import PiperVoice, SessionConfig, SynthesisConfig
 from .audio_playback import AudioPlayer
 
 _FILE = Path(__file__)
@@ -71,9 +71,67 @@ def main() -> None:
         type=float,
         help="Phoneme width noise",
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed for generator noise (voice models with noise inputs only)",
+    )
     #
     parser.add_argument("--cuda", action="store_true", help="Use GPU")
     #
+    parser.add_argument(
+        "--intra-op-threads",
+        type=int,
+        default=0,
+        help="Threads used to run a single operator (default: onnxruntime decides)",
+    )
+    parser.add_argument(
+        "--inter-op-threads",
+        type=int,
+        default=0,
+        help="Threads used to run operators in parallel (default: onnxruntime decides)",
+    )
+    parser.add_argument(
+        "--execution-mode",
+        choices=("sequential", "parallel"),
+        default="sequential",
+        help="Run operators one at a time or in parallel (default: sequential)",
+    )
+    parser.add_argument(
+        "--graph-optimization-level",
+        choices=("disable", "basic", "extended", "all"),
+        default="all",
+        help="Graph optimizations to apply (default: all)",
+    )
+    parser.add_argument(
+        "--no-cpu-mem-arena",
+        action="store_true",
+        help="Disable the onnxruntime CPU memory arena",
+    )
+    parser.add_argument(
+        "--no-mem-pattern",
+        action="store_true",
+        help="Disable onnxruntime memory pattern optimization",
+    )
+    parser.add_argument(
+        "--no-spinning",
+        action="store_true",
+        help="Don't let onnxruntime threads busy-wait for work",
+    )
+    parser.add_argument(
+        "--optimized-model-dir",
+        help="Directory to cache optimized voice models in for faster loading",
+    )
+    parser.add_argument(
+        "--shared-weights-dir",
+        help="Directory for voice model copies whose weights are shared between processes",
+    )
+    parser.add_argument(
+        "--io-binding",
+        action="store_true",
+        help="Reuse voice model input buffers between runs (onnxruntime I/O binding)",
+    )
+    #
     parser.add_argument(
         "--sentence-silence",
         "--sentence_silence",
@@ -146,14 +204,30 @@ def main() -> None:
 
     # Load voice
     _LOGGER.debug("Loading voice: '%s'", model_path)
-    voice = PiperVoice.load(model_path, use_cuda=args.cuda)
+    session_config = SessionConfig(
+        intra_op_num_threads=args.intra_op_threads,
+        inter_op_num_threads=args.inter_op_threads,
+        execution_mode=args.execution_mode,
+        graph_optimization_level=args.graph_optimization_level,
+        enable_cpu_mem_arena=(not args.no_cpu_mem_arena),
+        enable_mem_pattern=(not args.no_mem_pattern),
+        allow_spinning=(not args.no_spinning),
+        optimized_model_dir=args.optimized_model_dir,
+        shared_weights_dir=args.shared_weights_dir,
+        use_io_binding=args.io_binding,
+    )
+    voice = PiperVoice.load(
+        model_path, use_cuda=args.cuda, session_config=session_config
+    )
     syn_config = SynthesisConfig(
         speaker_id=args.speaker,
         length_scale=args.length_scale,
         noise_scale=args.noise_scale,
         noise_w_scale=args.noise_w_scale,
+        seed=args.seed,
         normalize_audio=(not args.no_normalize),
         volume=args.volume,
+        keep_float_audio=False,
     )
 
     wav_file: wave.Wave_write
@@ -179,7 +253,7 @@ def main() -> None:
                 if i > 0:
                     wav_file.writeframes(silence_int16_bytes)
 
-                wav_file.writeframes(audio_chunk.audio_int16_bytes)
+                wav_file.writeframes(audio_chunk.audio_int16_memoryview)
 
     if args.output_raw:
         # Write raw audio to stdout as its produced
@@ -189,7 +263,7 @@ def main() -> None:
                 if i > 0:
                     sys.stdout.buffer.write(silence_int16_bytes)
 
-                sys.stdout.buffer.write(audio_chunk.audio_int16_bytes)
+                sys.stdout.buffer.write(audio_chunk.audio_int16_memoryview)
                 sys.stdout.buffer.flush()
     elif args.output_dir:
         # Write multiple WAV files to a directory, one per line
@@ -218,7 +292,7 @@ def main() -> None:
                     if i > 0:
                         wav_file.writeframes(silence_int16_bytes)
 
-                    wav_file.writeframes(audio_chunk.audio_int16_bytes)
+                    wav_file.writeframes(audio_chunk.audio_int16_memoryview)
 
             _LOGGER.info("Wrote %s", wav_path)
     else:
@@ -238,7 +312,7 @@ def main() -> None:
                         if i > 0:
                             player.play(silence_int16_bytes)
 
-                        player.play(audio_chunk.audio_int16_bytes)
+                        player.play(audio_chunk.audio_int16_memoryview)
         else:
             # Write to WAV file
             if not args.output_file:
@@ -0,0 +1,180 @@
+"""Alignments between phonemes and voice model audio."""
+
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any, Optional, Union, overload
+
+import numpy as np
+
+from .const import BOS, EOS, PAD
+
+
+@dataclass
+class PhonemeAlignment:
+    phoneme: str
+    phoneme_ids: Sequence[int]
+    num_samples: int
+
+
+class PhonemeAlignments(Sequence[PhonemeAlignment]):
+    """Alignments for a sentence, stored as arrays.
+
+    Phonemes include BOS and EOS. PhonemeAlignment objects are only created
+    when items are accessed; use the arrays directly to avoid them.
+    """
+
+    def __init__(
+        self,
+        phonemes: Sequence[str],
+        phoneme_ids: np.ndarray,
+        phoneme_id_starts: np.ndarray,
+        phoneme_id_ends: np.ndarray,
+        num_samples: np.ndarray,
+    ) -> None:
+        """
+        Initialize alignments.
+
+        :param phonemes: Phoneme of each alignment.
+        :param phoneme_ids: Phoneme ids of the sentence.
+        :param phoneme_id_starts: Index of each phoneme's first id in phoneme_ids.
+        :param phoneme_id_ends: Index after each phoneme's last id in phoneme_ids.
+        :param num_samples: Number of audio samples for each phoneme.
+        """
+        self.phonemes = phonemes
+        self.phoneme_ids = phoneme_ids
+        self.phoneme_id_starts = phoneme_id_starts
+        self.phoneme_id_ends = phoneme_id_ends
+        self.num_samples = num_samples
+
+    def __len__(self) -> int:
+        """Number of phonemes."""
+        return len(self.phonemes)
+
+    @overload
+    def __getitem__(self, index: int) -> PhonemeAlignment: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[PhonemeAlignment]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[PhonemeAlignment, list[PhonemeAlignment]]:
+        """Get one alignment or a list of alignments."""
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError("alignment index out of range")
+
+        start = int(self.phoneme_id_starts[index])
+        end = int(self.phoneme_id_ends[index])
+        return PhonemeAlignment(
+            phoneme=self.phonemes[index],
+            phoneme_ids=self.phoneme_ids[start:end].tolist(),
+            num_samples=int(self.num_samples[index]),
+        )
+
+    def __iter__(self) -> Iterator[PhonemeAlignment]:
+        """Iterate over alignments."""
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare alignments with another sequence of alignments."""
+        if not isinstance(other, Sequence):
+            return NotImplemented
+
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"PhonemeAlignments({list(self)!r})"
+
+
+class PhonemeAligner:
+    """Aligns phonemes with audio using the samples for each phoneme id.
+
+    Each phoneme produces its ids from the phoneme id map followed by PAD
+    (except EOS), and phonemes missing from the map produce no ids. The ids for
+    each phoneme are looked up once and reused.
+    """
+
+    def __init__(self, phoneme_id_map: Mapping[str, Sequence[int]]) -> None:
+        """
+        Initialize aligner.
+
+        :param phoneme_id_map: Phoneme id map of the voice.
+        """
+        self.phoneme_id_map = phoneme_id_map
+        self._pad_ids = list(phoneme_id_map.get(PAD, []))
+        self._phoneme_ids: dict[str, np.ndarray] = {
+            EOS: np.array(phoneme_id_map.get(EOS, []), dtype=np.int64)
+        }
+
+    def align(
+        self,
+        phonemes: Sequence[str],
+        phoneme_ids: Union[Sequence[int], np.ndarray],
+        phoneme_id_samples: np.ndarray,
+    ) -> Optional[PhonemeAlignments]:
+        """
+        Align phonemes (without BOS/EOS) with audio.
+
+        Phonemes missing from the phoneme id map are skipped, since they were
+        also skipped when getting phoneme ids.
+
+        :param phonemes: Phonemes of a sentence.
+        :param phoneme_ids: Phoneme ids produced from the phonemes.
+        :param phoneme_id_samples: Number of audio samples for each phoneme id.
+        :return: Alignments or None if phonemes don't match the phoneme ids.
+        """
+        all_phonemes = [
+            BOS,
+            *(phoneme for phoneme in phonemes if phoneme in self.phoneme_id_map),
+            EOS,
+        ]
+        expected_ids = [self._get_phoneme_ids(phoneme) for phoneme in all_phonemes]
+        lengths = np.fromiter(
+            (len(ids) for ids in expected_ids),
+            dtype=np.int64,
+            count=len(expected_ids),
+        )
+        phoneme_id_ends = np.cumsum(lengths)
+        phoneme_id_starts = phoneme_id_ends - lengths
+        num_expected_ids = int(phoneme_id_ends[-1])
+
+        phoneme_ids_array = np.asarray(phoneme_ids, dtype=np.int64)
+        if (num_expected_ids > len(phoneme_ids_array)) or (
+            not np.array_equal(
+                np.concatenate(expected_ids), phoneme_ids_array[:num_expected_ids]
+            )
+        ):
+            return None
+
+        # Sum samples for each phoneme's ids (spans may be empty)
+        sample_offsets = np.zeros(len(phoneme_id_samples) + 1, dtype=np.int64)
+        np.cumsum(phoneme_id_samples, out=sample_offsets[1:])
+        num_samples = (
+            sample_offsets[phoneme_id_ends] - sample_offsets[phoneme_id_starts]
+        )
+
+        return PhonemeAlignments(
+            phonemes=all_phonemes,
+            phoneme_ids=phoneme_ids_array,
+            phoneme_id_starts=phoneme_id_starts,
+            phoneme_id_ends=phoneme_id_ends,
+            num_samples=num_samples,
+        )
+
+    def _get_phoneme_ids(self, phoneme: str) -> np.ndarray:
+        ids = self._phoneme_ids.get(phoneme)
+        if ids is None:
+            ids = np.array(
+                [*self.phoneme_id_map.get(phoneme, []), *self._pad_ids],
+                dtype=np.int64,
+            )
+            self._phoneme_ids[phoneme] = ids
+
+        return ids
@@ -0,0 +1,218 @@
+"""Cache of synthesized audio for repeated sentences."""
+
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+_LOGGER = logging.getLogger(__name__)
+
+CachedAudio = Tuple[np.ndarray, Optional[np.ndarray]]
+
+
+@dataclass
+class AudioCacheStats:
+    """Counters for an audio cache."""
+
+    hits: int = 0
+    """Number of lookups found in memory or on disk."""
+
+    disk_hits: int = 0
+    """Number of hits that were loaded from disk."""
+
+    misses: int = 0
+    """Number of lookups not found in the cache."""
+
+    evictions: int = 0
+    """Number of entries removed from memory to stay under the byte limit."""
+
+
+class AudioCache:
+    """Least recently used cache of raw voice model audio.
+
+    Entries are keyed on phoneme ids and synthesis settings (see make_key), and
+    hold the audio plus the number of samples for each phoneme id (if the voice
+    model outputs them). Cached arrays are read-only.
+
+    If cache_dir is set, entries evicted from memory are written there and
+    loaded back on a later hit. A cache directory must only be used by one voice.
+    """
+
+    def __init__(
+        self, max_bytes: int, cache_dir: Optional[Union[str, Path]] = None
+    ) -> None:
+        """
+        Initialize cache.
+
+        :param max_bytes: Maximum size of cached arrays held in memory.
+        :param cache_dir: Directory to write evicted entries to (disabled if None).
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir: Optional[Path] = None
+        if cache_dir is not None:
+            self.cache_dir = Path(cache_dir)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[str, CachedAudio]" = OrderedDict()
+        self._num_bytes = 0
+        self._stats = AudioCacheStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        phoneme_ids: Union[Sequence[int], np.ndarray],
+        speaker_id: Optional[int],
+        length_scale: float,
+        noise_scale: float,
+        noise_w_scale: float,
+        seed: Optional[int] = None,
+    ) -> str:
+        """Get the cache key for phoneme ids and resolved synthesis settings."""
+        key_hash = hashlib.sha256()
+        key_hash.update(np.asarray(phoneme_ids, dtype=np.int64).tobytes())
+        key_hash.update(
+            struct.pack(
+                "<qfff",
+                -1 if speaker_id is None else speaker_id,
+                length_scale,
+                noise_scale,
+                noise_w_scale,
+            )
+        )
+        if seed is not None:
+            key_hash.update(f"seed={seed}".encode("utf-8"))
+
+        return key_hash.hexdigest()
+
+    @property
+    def stats(self) -> AudioCacheStats:
+        """Copy of the cache counters."""
+        with self._lock:
+            return replace(self._stats)
+
+    @property
+    def num_bytes(self) -> int:
+        """Size of cached arrays held in memory."""
+        return self._num_bytes
+
+    def __len__(self) -> int:
+        """Number of entries held in memory."""
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedAudio]:
+        """Get cached (audio, phoneme_id_samples) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return entry
+
+            entry = self._load(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            self._stats.hits += 1
+            self._stats.disk_hits += 1
+            self._add(key, entry)
+
+            return entry
+
+    def put(
+        self, key: str, audio: np.ndarray, phoneme_id_samples: Optional[np.ndarray]
+    ) -> None:
+        """Add (audio, phoneme_id_samples) to the cache."""
+        audio = np.array(audio)
+        audio.flags.writeable = False
+        if phoneme_id_samples is not None:
+            phoneme_id_samples = np.array(phoneme_id_samples)
+            phoneme_id_samples.flags.writeable = False
+
+        with self._lock:
+            if key not in self._entries:
+                self._add(key, (audio, phoneme_id_samples))
+
+    def clear(self) -> None:
+        """Remove all entries from memory (the disk is left as-is)."""
+        with self._lock:
+            self._entries.clear()
+            self._num_bytes = 0
+
+    def _add(self, key: str, entry: CachedAudio) -> None:
+        self._entries[key] = entry
+        self._num_bytes += _entry_bytes(entry)
+
+        while self._entries and (self._num_bytes > self.max_bytes):
+            evicted_key, evicted_entry = self._entries.popitem(last=False)
+            self._num_bytes -= _entry_bytes(evicted_entry)
+            self._stats.evictions += 1
+            self._save(evicted_key, evicted_entry)
+
+    def _entry_path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+
+        return self.cache_dir / f"{key}.npz"
+
+    def _save(self, key: str, entry: CachedAudio) -> None:
+        entry_path = self._entry_path(key)
+        if (entry_path is None) or entry_path.exists():
+            return
+
+        audio, phoneme_id_samples = entry
+        try:
+            # Write to a temporary file first so other processes never see a
+            # partially written entry.
+            with tempfile.NamedTemporaryFile(
+                "wb", dir=entry_path.parent, suffix=".tmp", delete=False
+            ) as temp_file:
+                if phoneme_id_samples is None:
+                    np.savez(temp_file, audio=audio)
+                else:
+                    np.savez(
+                        temp_file, audio=audio, phoneme_id_samples=phoneme_id_samples
+                    )
+
+            os.replace(temp_file.name, entry_path)
+        except OSError:
+            _LOGGER.exception("Failed to write audio cache entry: %s", entry_path)
+
+    def _load(self, key: str) -> Optional[CachedAudio]:
+        entry_path = self._entry_path(key)
+        if (entry_path is None) or (not entry_path.exists()):
+            return None
+
+        try:
+            with np.load(entry_path) as entry_file:
+                audio = np.asarray(entry_file["audio"])
+                phoneme_id_samples: Optional[np.ndarray] = None
+                if "phoneme_id_samples" in entry_file:
+                    phoneme_id_samples = np.asarray(entry_file["phoneme_id_samples"])
+        except (OSError, ValueError, KeyError):
+            _LOGGER.exception("Failed to read audio cache entry: %s", entry_path)
+            return None
+
+        audio.setflags(write=False)
+        if phoneme_id_samples is not None:
+            phoneme_id_samples.setflags(write=False)
+
+        return audio, phoneme_id_samples
+
+
+def _entry_bytes(entry: CachedAudio) -> int:
+    audio, phoneme_id_samples = entry
+    num_bytes = audio.nbytes
+    if phoneme_id_samples is not None:
+        num_bytes += phoneme_id_samples.nbytes
+
+    return num_bytes
@@ -4,6 +4,9 @@ from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Final, Mapping, Optional, Sequence, Set, Tuple
 
+from .phoneme_ids import PhonemeIdEncoder
+from .phonemize_espeak import VowelClusterMerger
+
 DEFAULT_NOISE_SCALE: Final = 0.667
 DEFAULT_LENGTH_SCALE: Final = 1.0
 DEFAULT_NOISE_W_SCALE: Final = 0.8
@@ -63,6 +66,46 @@ class PiperConfig:
     default_speaker_id: int = 0
     """Id of the default speaker for multi-speaker voices."""
 
+    _phoneme_id_encoder: Optional[PhonemeIdEncoder] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _vowel_cluster_merger: Optional[VowelClusterMerger] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def phoneme_id_encoder(self) -> PhonemeIdEncoder:
+        """Encoder compiled from phoneme_id_map (recompiled if it is replaced)."""
+        encoder = self._phoneme_id_encoder
+        if (encoder is None) or (encoder.id_map is not self.phoneme_id_map):
+            pad_after: Optional[Set[str]] = None
+            if self.phoneme_type == PhonemeType.PINYIN:
+                # Padding after each pinyin group instead of each phoneme
+                from .phonemize_chinese import GROUP_END_PHONEMES
+
+                pad_after = GROUP_END_PHONEMES
+
+            encoder = PhonemeIdEncoder(self.phoneme_id_map, pad_after=pad_after)
+            self._phoneme_id_encoder = encoder
+
+        return encoder
+
+    @property
+    def vowel_cluster_merger(self) -> Optional[VowelClusterMerger]:
+        """Merger compiled from vowel_clusters (recompiled if it is replaced).
+
+        None if there are no vowel clusters.
+        """
+        if not self.vowel_clusters:
+            return None
+
+        merger = self._vowel_cluster_merger
+        if (merger is None) or (merger.clusters is not self.vowel_clusters):
+            merger = VowelClusterMerger(self.vowel_clusters)
+            self._vowel_cluster_merger = merger
+
+        return merger
+
     @staticmethod
     def from_dict(config: dict[str, Any]) -> "PiperConfig":
         """Load configuration from a dictionary."""
@@ -143,8 +186,121 @@ class SynthesisConfig:
     noise_w_scale: Optional[float] = None
     """Amount of phoneme width noise to add."""
 
+    seed: Optional[int] = None
+    """Seed for generator noise (None = random).
+
+    Only used by voice models exported with noise inputs (see export_onnx
+    --noise-inputs). Each sentence is seeded separately, so it gets the same
+    noise (and phoneme durations) however it is batched. The same text and
+    settings always produce the same audio.
+    """
+
     normalize_audio: bool = True
     """Enable/disable scaling audio samples to fit full range."""
 
     volume: float = 1.0
     """Multiplier for audio samples (< 1 is quieter, > 1 is louder)."""
+
+    batch_size: int = 1
+    """Number of sentences to run through the voice model at once.
+
+    Sentences of similar length are grouped together to keep padding small.
+    Batching requires a voice model with alignments (see PiperVoice.load),
+    since they are needed to split the padded audio back into sentences.
+    Without them, batch_size is ignored (with a warning).
+    The last few frames of a shorter sentence may differ slightly from running
+    it alone, since the decoder also sees the padding after it.
+    """
+
+    max_sentence_phonemes: int = 0
+    """Split sentences with more phonemes than this at clauses (0 = disabled).
+
+    Clauses end with a comma, colon, or semicolon. The audio for the first part
+    of a long sentence is then ready sooner, at the cost of a slightly
+    different pause at the split.
+    """
+
+    phonemize_ahead: int = 0
+    """Number of sentences to phonemize ahead of the voice model (0 = disabled).
+
+    When enabled, text is split into sentences and phonemized in a background
+    thread while the voice model runs, with at most this many sentences waiting.
+    """
+
+    keep_float_audio: bool = True
+    """Keep float samples in audio chunks after converting them to int16.
+
+    Disable when only 16-bit PCM is needed (audio_int16_*) to hold a third of
+    the memory per chunk. audio_float_array is then recomputed from the int16
+    samples when accessed.
+    """
+
+
+@dataclass
+class SessionConfig:
+    """Configuration for the ONNX Runtime sessions of a voice.
+
+    The defaults match onnxruntime. Thread counts of 0 let onnxruntime decide,
+    which means one thread per physical core for each voice.
+    """
+
+    num_sessions: int = 1
+    """Number of sessions to load for running the voice model concurrently.
+
+    Each session holds its own copy of the model. With more than one, thread
+    counts are the total for all sessions and are split evenly between them
+    (0 = number of CPUs).
+    """
+
+    intra_op_num_threads: int = 0
+    """Number of threads used to run a single operator (0 = default)."""
+
+    inter_op_num_threads: int = 0
+    """Number of threads used to run operators in parallel (0 = default).
+
+    Only used when execution_mode is "parallel".
+    """
+
+    execution_mode: str = "sequential"
+    """Run operators one at a time ("sequential") or in parallel ("parallel")."""
+
+    graph_optimization_level: str = "all"
+    """Graph optimizations to apply ("disable", "basic", "extended", or "all")."""
+
+    enable_cpu_mem_arena: bool = True
+    """Enable/disable the CPU memory arena (faster, but memory is not released)."""
+
+    enable_mem_pattern: bool = True
+    """Enable/disable preallocating memory based on previous runs."""
+
+    optimized_model_dir: Optional[str] = None
+    """Directory to cache optimized voice models in (disabled if None).
+
+    The first load of a voice saves the model after graph optimization (and
+    patching for alignments) here, and later loads read it directly. Cached
+    models are specific to the model file, onnxruntime version, and machine.
+    """
+
+    shared_weights_dir: Optional[str] = None
+    """Directory for copies of voice models with shareable weights (disabled if None).
+
+    The first load of a voice writes a copy of the model here with its weights
+    in a separate file, which onnxruntime memory-maps. Processes that load the
+    same voice then share one copy of the weights in memory. Weight prepacking
+    is disabled, and optimized_model_dir is not used. Requires the onnx package.
+    """
+
+    allow_spinning: bool = True
+    """Enable/disable thread pool threads busy-waiting for work.
+
+    Spinning lowers latency, but burns CPU that other voices or processes on
+    the same machine could use.
+    """
+
+    use_io_binding: bool = False
+    """Run the voice model with I/O binding instead of session.run.
+
+    Model inputs (phoneme ids, scales, noise) are written to buffers that are
+    kept between runs and grow to the largest sentence seen. Outputs are
+    allocated from onnxruntime's memory arena and returned without copying.
+    """
@@ -3,6 +3,8 @@
 #define Py_LIMITED_API 0x03090000
 #include <Python.h>
 #include <espeak-ng/speak_lib.h>
+#include <stdlib.h>
+#include <string.h>
 
 #define CLAUSE_INTONATION_FULL_STOP 0x00000000
 #define CLAUSE_INTONATION_COMMA 0x00001000
@@ -20,13 +22,119 @@
 #define CLAUSE_COLON (30 | CLAUSE_INTONATION_FULL_STOP | CLAUSE_TYPE_CLAUSE)
 #define CLAUSE_SEMICOLON (30 | CLAUSE_INTONATION_COMMA | CLAUSE_TYPE_CLAUSE)
 
+// espeak-ng has global state, so callers must not use this module from more
+// than one thread at a time. The GIL is released while espeak-ng works, so
+// other Python threads can run in the meantime.
+
+// Name passed to set_voice and identifier of the voice espeak-ng selected for
+// it (empty if unknown). The voice is only selected again if the name differs
+// or espeak-ng has a different voice now (e.g., after initialize).
+static char current_voice[256] = "";
+static char current_voice_id[256] = "";
+
+// Separators in the output of get_phonemes_batch
+#define SENTENCE_SEPARATOR "\x1e"
+#define TEXT_SEPARATOR "\x1d"
+
+// Growable UTF-8 buffer, used without the GIL
+typedef struct {
+    char *data;
+    size_t size;
+    size_t capacity;
+} Buffer;
+
+static int buffer_append(Buffer *buffer, const char *str) {
+    size_t length = strlen(str);
+    if (buffer->size + length > buffer->capacity) {
+        size_t capacity = (buffer->capacity > 0) ? buffer->capacity : 4096;
+        while (buffer->size + length > capacity) {
+            capacity *= 2;
+        }
+
+        char *data = realloc(buffer->data, capacity);
+        if (data == NULL) {
+            return -1;
+        }
+
+        buffer->data = data;
+        buffer->capacity = capacity;
+    }
+
+    memcpy(buffer->data + buffer->size, str, length);
+    buffer->size += length;
+
+    return 0;
+}
+
+// Identifier of the voice espeak-ng has selected (NULL if none)
+static const char *get_voice_id(void) {
+    espeak_VOICE *selected_voice = espeak_GetCurrentVoice();
+    if (selected_voice == NULL) {
+        return NULL;
+    }
+
+    return selected_voice->identifier;
+}
+
+// Select a voice unless it's already selected (called without the GIL)
+static espeak_ERROR select_voice(const char *voice) {
+    const char *voice_id = get_voice_id();
+    if ((current_voice[0] != '\0') && (strcmp(voice, current_voice) == 0) &&
+        (voice_id != NULL) && (strcmp(voice_id, current_voice_id) == 0)) {
+        return EE_OK;
+    }
+
+    espeak_ERROR result = espeak_SetVoiceByName(voice);
+    voice_id = get_voice_id();
+    if ((result == EE_OK) && (strlen(voice) < sizeof(current_voice)) &&
+        (voice_id != NULL) && (strlen(voice_id) < sizeof(current_voice_id))) {
+        strcpy(current_voice, voice);
+        strcpy(current_voice_id, voice_id);
+    } else {
+        // Failed or too long to remember
+        current_voice[0] = '\0';
+        current_voice_id[0] = '\0';
+    }
+
+    return result;
+}
+
+// Punctuation for a clause terminator ("" if none)
+static const char *get_terminator_str(int terminator) {
+    terminator &= 0x000FFFFF;
+
+    if (terminator == CLAUSE_PERIOD) {
+        return ".";
+    } else if (terminator == CLAUSE_QUESTION) {
+        return "?";
+    } else if (terminator == CLAUSE_EXCLAMATION) {
+        return "!";
+    } else if (terminator == CLAUSE_COMMA) {
+        return ",";
+    } else if (terminator == CLAUSE_COLON) {
+        return ":";
+    } else if (terminator == CLAUSE_SEMICOLON) {
+        return ";";
+    }
+
+    return "";
+}
+
 static PyObject *py_initialize(PyObject *self, PyObject *args) {
     const char *data_dir;
     if (!PyArg_ParseTuple(args, "s", &data_dir)) {
         return NULL;
     }
 
-    if (espeak_Initialize(AUDIO_OUTPUT_SYNCHRONOUS, 0, data_dir, 0) < 0) {
+    int result;
+    Py_BEGIN_ALLOW_THREADS;
+    result = espeak_Initialize(AUDIO_OUTPUT_SYNCHRONOUS, 0, data_dir, 0);
+    Py_END_ALLOW_THREADS;
+
+    current_voice[0] = '\0';
+    current_voice_id[0] = '\0';
+
+    if (result < 0) {
         PyErr_SetString(PyExc_RuntimeError, "Failed to initialize espeak-ng");
         return NULL;
     }
@@ -40,7 +148,12 @@ static PyObject *py_set_voice(PyObject *self, PyObject *args) {
         return NULL;
     }
 
-    if (espeak_SetVoiceByName(voice) != EE_OK) {
+    espeak_ERROR result;
+    Py_BEGIN_ALLOW_THREADS;
+    result = select_voice(voice);
+    Py_END_ALLOW_THREADS;
+
+    if (result != EE_OK) {
         PyErr_Format(PyExc_RuntimeError, "Failed to set voice: %s", voice);
         return NULL;
     }
@@ -48,6 +161,15 @@ static PyObject *py_set_voice(PyObject *self, PyObject *args) {
     Py_RETURN_NONE;
 }
 
+static PyObject *py_get_voice(PyObject *self, PyObject *args) {
+    const char *voice_id = get_voice_id();
+    if (voice_id == NULL) {
+        Py_RETURN_NONE;
+    }
+
+    return PyUnicode_FromString(voice_id);
+}
+
 static PyObject *py_get_phonemes(PyObject *self, PyObject *args) {
     const char *text;
     if (!PyArg_ParseTuple(args, "s", &text)) {
@@ -55,47 +177,159 @@ static PyObject *py_get_phonemes(PyObject *self, PyObject *args) {
     }
 
     PyObject *phonemes_and_terminators = PyList_New(0);
+    if (phonemes_and_terminators == NULL) {
+        return NULL;
+    }
 
     while (text != NULL) {
         int terminator = 0;
-        char *terminator_str = "";
 
-        const char *phonemes = espeak_TextToPhonemesWithTerminator(
+        // Phonemes are in an espeak-ng buffer that is reused by the next
+        // call, so they are copied into a Python string below (with the GIL).
+        const char *phonemes;
+        Py_BEGIN_ALLOW_THREADS;
+        phonemes = espeak_TextToPhonemesWithTerminator(
             (const void **)&text, espeakCHARS_AUTO, espeakPHONEMES_IPA,
             &terminator);
+        Py_END_ALLOW_THREADS;
+
+        const char *terminator_str = get_terminator_str(terminator);
 
-        // Categorize terminator
-        terminator &= 0x000FFFFF;
-
-        if (terminator == CLAUSE_PERIOD) {
-            terminator_str = ".";
-        } else if (terminator == CLAUSE_QUESTION) {
-            terminator_str = "?";
-        } else if (terminator == CLAUSE_EXCLAMATION) {
-            terminator_str = "!";
-        } else if (terminator == CLAUSE_COMMA) {
-            terminator_str = ",";
-        } else if (terminator == CLAUSE_COLON) {
-            terminator_str = ":";
-        } else if (terminator == CLAUSE_SEMICOLON) {
-            terminator_str = ";";
+        PyObject *item = Py_BuildValue(
+            "(ssO)", phonemes, terminator_str,
+            (terminator & CLAUSE_TYPE_SENTENCE) == CLAUSE_TYPE_SENTENCE
+                ? Py_True
+                : Py_False);
+        if ((item == NULL) ||
+            (PyList_Append(phonemes_and_terminators, item) < 0)) {
+            Py_XDECREF(item);
+            Py_DECREF(phonemes_and_terminators);
+            return NULL;
         }
 
-        PyList_Append(phonemes_and_terminators,
-                      Py_BuildValue("(ssO)", phonemes, terminator_str,
-                                    (terminator & CLAUSE_TYPE_SENTENCE) ==
-                                            CLAUSE_TYPE_SENTENCE
-                                        ? Py_True
-                                        : Py_False));
+        Py_DECREF(item);
     }
 
     return phonemes_and_terminators;
 }
 
+static PyObject *py_get_phonemes_batch(PyObject *self, PyObject *args) {
+    const char *voice;
+    PyObject *texts_arg;
+    if (!PyArg_ParseTuple(args, "sO", &voice, &texts_arg)) {
+        return NULL;
+    }
+
+    // A str is a sequence too, but of single characters
+    if (PyUnicode_Check(texts_arg) || PyBytes_Check(texts_arg)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "texts must be a sequence of str, not str or bytes");
+        return NULL;
+    }
+
+    PyObject *texts = PySequence_Tuple(texts_arg);
+    if (texts == NULL) {
+        return NULL;
+    }
+
+    // UTF-8 copies of the texts, so they can be read without the GIL
+    Py_ssize_t num_texts = PyTuple_Size(texts);
+    PyObject *encoded_texts = PyTuple_New(num_texts);
+    const char **text_ptrs = PyMem_Calloc((num_texts > 0) ? num_texts : 1,
+                                         sizeof(const char *));
+    if ((encoded_texts == NULL) || (text_ptrs == NULL)) {
+        Py_DECREF(texts);
+        Py_XDECREF(encoded_texts);
+        PyMem_Free(text_ptrs);
+        return PyErr_NoMemory();
+    }
+
+    for (Py_ssize_t i = 0; i < num_texts; i++) {
+        PyObject *text = PyTuple_GetItem(texts, i);
+        PyObject *encoded_text = NULL;
+        if (PyUnicode_Check(text)) {
+            encoded_text = PyUnicode_AsUTF8String(text);
+        } else {
+            PyErr_SetString(PyExc_TypeError, "texts must be str");
+        }
+
+        if (encoded_text == NULL) {
+            Py_DECREF(texts);
+            Py_DECREF(encoded_texts);
+            PyMem_Free(text_ptrs);
+            return NULL;
+        }
+
+        // Steals reference
+        PyTuple_SetItem(encoded_texts, i, encoded_text);
+        text_ptrs[i] = PyBytes_AsString(encoded_text);
+    }
+
+    Py_DECREF(texts);
+
+    Buffer buffer = {NULL, 0, 0};
+    espeak_ERROR result;
+    int out_of_memory = 0;
+
+    Py_BEGIN_ALLOW_THREADS;
+    result = select_voice(voice);
+    for (Py_ssize_t i = 0; (result == EE_OK) && (i < num_texts); i++) {
+        const char *text = text_ptrs[i];
+        while (text != NULL) {
+            int terminator = 0;
+            const char *phonemes = espeak_TextToPhonemesWithTerminator(
+                (const void **)&text, espeakCHARS_AUTO, espeakPHONEMES_IPA,
+                &terminator);
+
+            const char *terminator_str = get_terminator_str(terminator);
+            const int is_clause = (strchr(",:;", terminator_str[0]) != NULL) &&
+                                  (terminator_str[0] != '\0');
+            const int is_sentence_end =
+                (terminator & CLAUSE_TYPE_SENTENCE) == CLAUSE_TYPE_SENTENCE;
+
+            if (((phonemes != NULL) && (buffer_append(&buffer, phonemes) < 0)) ||
+                (buffer_append(&buffer, terminator_str) < 0) ||
+                (is_clause && (buffer_append(&buffer, " ") < 0)) ||
+                (is_sentence_end &&
+                 (buffer_append(&buffer, SENTENCE_SEPARATOR) < 0))) {
+                out_of_memory = 1;
+                break;
+            }
+        }
+
+        if (out_of_memory || (buffer_append(&buffer, TEXT_SEPARATOR) < 0)) {
+            out_of_memory = 1;
+            break;
+        }
+    }
+    Py_END_ALLOW_THREADS;
+
+    Py_DECREF(encoded_texts);
+    PyMem_Free(text_ptrs);
+
+    PyObject *phonemes = NULL;
+    if (result != EE_OK) {
+        PyErr_Format(PyExc_RuntimeError, "Failed to set voice: %s", voice);
+    } else if (out_of_memory) {
+        PyErr_NoMemory();
+    } else {
+        phonemes = PyUnicode_DecodeUTF8((buffer.data != NULL) ? buffer.data : "",
+                                        (Py_ssize_t)buffer.size, "strict");
+    }
+
+    free(buffer.data);
+
+    return phonemes;
+}
+
 static PyMethodDef methods[] = {
     {"initialize", py_initialize, METH_VARARGS, "Initialize espeak-ng"},
     {"set_voice", py_set_voice, METH_VARARGS, "Set voice by name"},
+    {"get_voice", py_get_voice, METH_NOARGS,
+     "Get identifier of the selected voice (None if none)"},
     {"get_phonemes", py_get_phonemes, METH_VARARGS, "Get phonemes from text"},
+    {"get_phonemes_batch", py_get_phonemes_batch, METH_VARARGS,
+     "Get phonemes from several texts as one string"},
     {NULL, NULL, 0, NULL}};
 
 static struct PyModuleDef module = {PyModuleDef_HEAD_INIT, "espeakbridge", NULL,
@@ -1,8 +1,14 @@
+from collections.abc import Sequence
+from typing import Optional
+
 def initialize(data_dir: str) -> None: ...
 """Initialize espeak-ng."""
 
 def set_voice(voice: str) -> None: ...
-"""Set the espeak-ng voice by name."""
+"""Set the espeak-ng voice by name (does nothing if it's already selected)."""
+
+def get_voice() -> Optional[str]: ...
+"""Get the identifier of the voice espeak-ng has selected (None if none)."""
 
 def get_phonemes(text: str) -> list[tuple[str, str, bool]]: ...
 """
@@ -14,3 +20,16 @@ Returns:
         terminator: str - punctuation mark indicating clause type (".", "?", "!", ",", ":", ";")
         end_of_sentence: bool - True if the clause ends a sentence
 """
+
+def get_phonemes_batch(voice: str, texts: Sequence[str]) -> str: ...
+"""
+Set the voice and convert several texts to phonemes in one call.
+
+A single str (or bytes) is rejected with TypeError instead of being treated
+as a sequence of one-character texts.
+
+Returns:
+    Phonemes of all texts as one string. Each clause's phonemes are followed
+    by its terminator (and a space for ",", ":", ";"), each sentence by
+    "\\x1e", and each text by "\\x1d".
+"""
@@ -6,14 +6,18 @@ import json
 import logging
 import time
 import wave
+from dataclasses import asdict
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from urllib.request import urlopen
 
 from flask import Flask, render_template, request
 
-from . import PiperVoice, SynthesisConfig
+from . import AudioCache, PiperVoice, SessionConfig, SynthesisConfig
+from .alignment import PhonemeAlignments
 from .download_voices import VOICES_JSON, download_voice
+from .phoneme_cache import PhonemeCache
+from .phonemize_espeak import EspeakPhonemizerPool
 
 _LOGGER = logging.getLogger()
 
@@ -41,9 +45,79 @@ def main() -> None:
         type=float,
         help="Phoneme width noise",
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed for generator noise (voice models with noise inputs only)",
+    )
     #
     parser.add_argument("--cuda", action="store_true", help="Use GPU")
     #
+    parser.add_argument(
+        "--num-sessions",
+        type=int,
+        default=1,
+        help="Sessions per voice for concurrent requests (threads are split between them)",
+    )
+    parser.add_argument(
+        "--intra-op-threads",
+        type=int,
+        default=0,
+        help="Threads used to run a single operator (default: onnxruntime decides)",
+    )
+    parser.add_argument(
+        "--inter-op-threads",
+        type=int,
+        default=0,
+        help="Threads used to run operators in parallel (default: onnxruntime decides)",
+    )
+    parser.add_argument(
+        "--execution-mode",
+        choices=("sequential", "parallel"),
+        default="sequential",
+        help="Run operators one at a time or in parallel (default: sequential)",
+    )
+    parser.add_argument(
+        "--graph-optimization-level",
+        choices=("disable", "basic", "extended", "all"),
+        default="all",
+        help="Graph optimizations to apply (default: all)",
+    )
+    parser.add_argument(
+        "--no-cpu-mem-arena",
+        action="store_true",
+        help="Disable the onnxruntime CPU memory arena",
+    )
+    parser.add_argument(
+        "--no-mem-pattern",
+        action="store_true",
+        help="Disable onnxruntime memory pattern optimization",
+    )
+    parser.add_argument(
+        "--no-spinning",
+        action="store_true",
+        help="Don't let onnxruntime threads busy-wait for work",
+    )
+    parser.add_argument(
+        "--optimized-model-dir",
+        help="Directory to cache optimized voice models in for faster loading",
+    )
+    parser.add_argument(
+        "--shared-weights-dir",
+        help="Directory for voice model copies whose weights are shared between processes",
+    )
+    parser.add_argument(
+        "--io-binding",
+        action="store_true",
+        help="Reuse voice model input buffers between runs (onnxruntime I/O binding)",
+    )
+    parser.add_argument(
+        "--espeak-processes",
+        type=int,
+        default=0,
+        help="Number of worker processes for espeak-ng phonemization (default: 0, in server process)",
+    )
+    #
     parser.add_argument(
         "--sentence-silence",
         "--sentence_silence",
@@ -52,6 +126,29 @@ def main() -> None:
         help="Seconds of silence after each sentence",
     )
     #
+    parser.add_argument(
+        "--audio-cache-mb",
+        "--audio_cache_mb",
+        type=float,
+        default=0.0,
+        help="Megabytes of audio to cache per voice for repeated sentences (default: disabled)",
+    )
+    parser.add_argument(
+        "--audio-cache-dir",
+        "--audio_cache_dir",
+        help="Directory to write audio evicted from the cache to (default: disabled)",
+    )
+    parser.add_argument(
+        "--phoneme-cache-size",
+        type=int,
+        default=0,
+        help="Number of phonemized texts to cache in memory (default: disabled)",
+    )
+    parser.add_argument(
+        "--phoneme-cache-db",
+        help="SQLite database to keep phonemized texts in, shared between processes and restarts",
+    )
+    #
     parser.add_argument(
         "--data-dir",
         "--data_dir",
@@ -64,6 +161,11 @@ def main() -> None:
         "--download_dir",
         help="Path to download voices (default: first data dir)",
     )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Run the default voice on dummy input before accepting requests",
+    )
     #
     parser.add_argument(
         "--debug", action="store_true", help="Print DEBUG messages to console"
@@ -97,10 +199,59 @@ def main() -> None:
 
     default_model_id = model_path.name.rstrip(".onnx")
 
+    def make_audio_cache(model_id: str) -> Optional[AudioCache]:
+        if args.audio_cache_mb <= 0:
+            return None
+
+        return AudioCache(
+            max_bytes=int(args.audio_cache_mb * 1024 * 1024),
+            cache_dir=(
+                Path(args.audio_cache_dir) / model_id if args.audio_cache_dir else None
+            ),
+        )
+
     # Load voice
+    session_config = SessionConfig(
+        num_sessions=args.num_sessions,
+        intra_op_num_threads=args.intra_op_threads,
+        inter_op_num_threads=args.inter_op_threads,
+        execution_mode=args.execution_mode,
+        graph_optimization_level=args.graph_optimization_level,
+        enable_cpu_mem_arena=(not args.no_cpu_mem_arena),
+        enable_mem_pattern=(not args.no_mem_pattern),
+        allow_spinning=(not args.no_spinning),
+        optimized_model_dir=args.optimized_model_dir,
+        shared_weights_dir=args.shared_weights_dir,
+        use_io_binding=args.io_binding,
+    )
+
+    # Shared by all voices
+    espeak_phonemizer_pool: Optional[EspeakPhonemizerPool] = None
+    if args.espeak_processes > 0:
+        espeak_phonemizer_pool = EspeakPhonemizerPool(args.espeak_processes)
+
+    phoneme_cache: Optional[PhonemeCache] = None
+    if (args.phoneme_cache_size > 0) or args.phoneme_cache_db:
+        phoneme_cache = PhonemeCache(
+            max_entries=args.phoneme_cache_size, db_path=args.phoneme_cache_db
+        )
+
     default_voice = PiperVoice.load(
-        model_path, use_cuda=args.cuda, include_alignments=True
+        model_path,
+        use_cuda=args.cuda,
+        include_alignments=True,
+        session_config=session_config,
     )
+    default_voice.audio_cache = make_audio_cache(default_model_id)
+    default_voice.espeak_phonemizer_pool = espeak_phonemizer_pool
+    default_voice.phoneme_cache = phoneme_cache
+
+    warmup_seconds: Optional[float] = None
+    if args.warmup:
+        # Keep the first requests from paying for lazy initialization
+        warmup_seconds = default_voice.warmup()
+        _LOGGER.info("Warmed up voice in %0.2f second(s)", warmup_seconds)
+
     loaded_voices: Dict[str, PiperVoice] = {default_model_id: default_voice}
 
     # Create web server.
@@ -124,7 +275,21 @@ def main() -> None:
           "voice": {
             "name": "<voice name>",
             "language": "<espeak voice/alphabet>",
-            "num_speakers": <number of speakers>
+            "num_speakers": <number of speakers>,
+            "warmup_seconds": <time spent warming up>  (null unless --warmup is set)
+          },
+          "audio_cache": {                     (null unless --audio-cache-mb is set)
+            "hits": <lookups found in memory or on disk>,
+            "disk_hits": <hits loaded from disk>,
+            "misses": <lookups not found>,
+            "evictions": <entries removed from memory>
+          },
+          "phoneme_cache": {                   (null unless --phoneme-cache-size/db is set)
+            "hits": <lookups found in memory or on disk>,
+            "disk_hits": <hits loaded from disk>,
+            "misses": <lookups not found>,
+            "evictions": <entries removed from memory>,
+            "hit_rate": <hits / lookups>
           },
           "last": {                            (null until something is synthesized)
             "text": "<synthesized text>",
@@ -137,12 +302,27 @@ def main() -> None:
           }
         }
         """
+        phoneme_cache_info: Optional[Dict[str, Any]] = None
+        if phoneme_cache is not None:
+            phoneme_cache_stats = phoneme_cache.stats
+            phoneme_cache_info = {
+                **asdict(phoneme_cache_stats),
+                "hit_rate": phoneme_cache_stats.hit_rate,
+            }
+
         return {
             "voice": {
                 "name": default_model_id,
                 "language": default_voice.config.espeak_voice,
                 "num_speakers": default_voice.config.num_speakers,
+                "warmup_seconds": warmup_seconds,
             },
+            "audio_cache": (
+                asdict(default_voice.audio_cache.stats)
+                if default_voice.audio_cache is not None
+                else None
+            ),
+            "phoneme_cache": phoneme_cache_info,
             "last": last_synthesis or None,
         }
 
@@ -242,7 +422,14 @@ def main() -> None:
                 maybe_model_path = Path(data_dir) / f"{model_id}.onnx"
                 if maybe_model_path.exists():
                     _LOGGER.debug("Loading voice %s", model_id)
-                    voice = PiperVoice.load(maybe_model_path, use_cuda=args.cuda)
+                    voice = PiperVoice.load(
+                        maybe_model_path,
+                        use_cuda=args.cuda,
+                        session_config=session_config,
+                    )
+                    voice.audio_cache = make_audio_cache(model_id)
+                    voice.espeak_phonemizer_pool = espeak_phonemizer_pool
+                    voice.phoneme_cache = phoneme_cache
                     loaded_voices[model_id] = voice
                     break
 
@@ -267,6 +454,7 @@ def main() -> None:
         if (speaker_id is not None) and (speaker_id > voice.config.num_speakers):
             speaker_id = 0
 
+        seed = data.get("seed", args.seed)
         syn_config = SynthesisConfig(
             speaker_id=speaker_id,
             length_scale=float(
@@ -299,6 +487,8 @@ def main() -> None:
                     ),
                 )
             ),
+            seed=int(seed) if seed is not None else None,
+            keep_float_audio=False,
         )
 
         _LOGGER.debug("Synthesizing text: '%s' with config=%s", text, syn_config)
@@ -327,17 +517,18 @@ def main() -> None:
                             )
                         )
 
-                    wav_file.writeframes(audio_chunk.audio_int16_bytes)
+                    wav_file.writeframes(audio_chunk.audio_int16_memoryview)
 
                     # Collect phonemes/alignments for the web page
                     phonemes.extend(audio_chunk.phonemes)
-                    for alignment in audio_chunk.phoneme_alignments or []:
-                        alignments.append(
-                            {
-                                "phoneme": alignment.phoneme,
-                                "seconds": alignment.num_samples
-                                / audio_chunk.sample_rate,
-                            }
+                    chunk_alignments = audio_chunk.phoneme_alignments
+                    if isinstance(chunk_alignments, PhonemeAlignments):
+                        seconds = chunk_alignments.num_samples / audio_chunk.sample_rate
+                        alignments.extend(
+                            {"phoneme": phoneme, "seconds": phoneme_seconds}
+                            for phoneme, phoneme_seconds in zip(
+                                chunk_alignments.phonemes, seconds.tolist()
+                            )
                         )
 
             synthesize_seconds = time.monotonic() - start_time
@@ -0,0 +1,141 @@
+"""Copies of voice models prepared for faster or cheaper loading."""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Mapping, Optional, Union
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None  # type: ignore[assignment]
+
+_LOGGER = logging.getLogger(__name__)
+
+# Tensors smaller than this stay in the model file
+_EXTERNAL_DATA_THRESHOLD = 1024
+
+
+def get_model_key(model_path: Union[str, Path], settings: Mapping[str, Any]) -> str:
+    """Get a key for a model file and the settings used to prepare it.
+
+    The file is identified by its resolved path, size, and modification time
+    instead of its contents, so the key is cheap to get for large models.
+    A model file that is replaced or modified gets a new key.
+    """
+    model_path = Path(model_path).resolve()
+    model_stat = model_path.stat()
+    key_dict = {
+        "path": str(model_path),
+        "size": model_stat.st_size,
+        "mtime_ns": model_stat.st_mtime_ns,
+        "settings": settings,
+    }
+
+    return hashlib.sha256(
+        json.dumps(key_dict, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def get_shared_weights_model(
+    model_path: Union[str, Path],
+    cache_dir: Union[str, Path],
+    include_alignments: bool = False,
+) -> Optional[Path]:
+    """Get a copy of a model with its weights in a separate, page-aligned file.
+
+    onnxruntime memory-maps aligned external weights instead of copying them,
+    so every process that loads the copy shares one set of weights in memory.
+    The copy is created on first use, and patched for alignments if requested.
+    Processes that load the same model at once wait on a lock file, so only
+    one creates the copy and the others use it.
+
+    Returns None if the onnx package is not installed.
+    """
+    cache_dir = Path(cache_dir)
+    key = get_model_key(model_path, {"alignments": include_alignments})
+    shared_model_path = cache_dir / f"{key}.onnx"
+    if shared_model_path.exists():
+        return shared_model_path
+
+    try:
+        import onnx
+    except ImportError:
+        _LOGGER.warning(
+            "The onnx package is required to share weights. "
+            "Install it with: pip install piper-tts[alignment]"
+        )
+        return None
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir / f"{key}.lock", "wb") as lock_file:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        if shared_model_path.exists():
+            # Created by another process while waiting for the lock.
+            # Replacing its weights file would stop sharing it.
+            return shared_model_path
+
+        model = onnx.load(str(model_path))
+        if include_alignments:
+            from .patch_voice_with_alignment import add_alignment_output
+
+            try:
+                add_alignment_output(model)
+            except ValueError as error:
+                # Tensor not found or model already patched: use it as-is.
+                _LOGGER.debug("Not patching model for alignments: %s", error)
+
+        save_with_external_weights(model, shared_model_path)
+        _LOGGER.debug("Saved model with shared weights: %s", shared_model_path)
+
+    return shared_model_path
+
+
+def save_with_external_weights(model: Any, model_path: Union[str, Path]) -> None:
+    """Save an onnx model with its weights in model_path + ".data".
+
+    Each tensor starts on a multiple of the memory map allocation granularity,
+    which onnxruntime requires to map it instead of reading it into memory.
+    Files are written under temporary names and renamed into place, weights
+    first, so a model file that exists is always complete.
+    """
+    import onnx
+    from onnx.external_data_helper import set_external_data
+
+    model_path = Path(model_path)
+    data_path = model_path.with_name(f"{model_path.name}.data")
+
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=model_path.parent, suffix=".tmp", delete=False
+    ) as data_file:
+        for tensor in model.graph.initializer:
+            if len(tensor.raw_data) < _EXTERNAL_DATA_THRESHOLD:
+                continue
+
+            offset = data_file.tell()
+            padding = (-offset) % mmap.ALLOCATIONGRANULARITY
+            data_file.write(bytes(padding))
+            offset += padding
+
+            data_file.write(tensor.raw_data)
+            set_external_data(
+                tensor, data_path.name, offset=offset, length=len(tensor.raw_data)
+            )
+            tensor.ClearField("raw_data")
+            tensor.data_location = onnx.TensorProto.EXTERNAL
+
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=model_path.parent, suffix=".tmp", delete=False
+    ) as model_file:
+        model_file.write(model.SerializeToString())
+
+    os.replace(data_file.name, data_path)
+    os.replace(model_file.name, model_path)
@@ -0,0 +1,201 @@
+"""Cache of phonemes for repeated texts."""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Optional, Set, Tuple, Union
+
+_LOGGER = logging.getLogger(__name__)
+
+# Phonemes grouped by sentence (immutable, so they can be shared)
+CachedPhonemes = Tuple[Tuple[str, ...], ...]
+
+
+@dataclass
+class PhonemeCacheStats:
+    """Counters for a phoneme cache."""
+
+    hits: int = 0
+    """Number of lookups found in memory or on disk."""
+
+    disk_hits: int = 0
+    """Number of hits that were loaded from disk."""
+
+    misses: int = 0
+    """Number of lookups not found in the cache."""
+
+    evictions: int = 0
+    """Number of entries removed from memory to stay under the entry limit."""
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups that were hits (0 if there were none)."""
+        num_lookups = self.hits + self.misses
+        return (self.hits / num_lookups) if num_lookups > 0 else 0.0
+
+
+class PhonemeCache:
+    """Least recently used cache of phonemes for texts.
+
+    Entries are keyed on the phonemizer voice, text, and vowel clusters (see
+    make_key), and hold the phonemes of each sentence. Lists returned by get
+    are new copies, so callers may modify them.
+
+    If db_path is set, entries are also written to an SQLite database there
+    and loaded back on a miss in memory. The database can be shared by several
+    processes and is kept across restarts. With max_entries set to 0, entries
+    are only kept in the database.
+    """
+
+    def __init__(
+        self, max_entries: int, db_path: Optional[Union[str, Path]] = None
+    ) -> None:
+        """
+        Initialize cache.
+
+        :param max_entries: Maximum number of entries held in memory (0 for none).
+        :param db_path: Path to SQLite database for entries (disabled if None).
+        """
+        self.max_entries = max_entries
+        self.db_path: Optional[Path] = None
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            self.db_path = Path(db_path)
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = _open_db(self.db_path)
+
+        self._entries: "OrderedDict[str, CachedPhonemes]" = OrderedDict()
+        self._stats = PhonemeCacheStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        voice: str,
+        text: str,
+        vowel_clusters: Optional[Set[Tuple[str, ...]]] = None,
+    ) -> str:
+        """Get the cache key for text phonemized with a voice."""
+        key_hash = hashlib.sha256()
+        key_hash.update(voice.encode("utf-8"))
+        key_hash.update(b"\0")
+        key_hash.update(text.encode("utf-8"))
+        if vowel_clusters:
+            key_hash.update(b"\0")
+            key_hash.update(
+                json.dumps(sorted(vowel_clusters), ensure_ascii=False).encode("utf-8")
+            )
+
+        return key_hash.hexdigest()
+
+    @property
+    def stats(self) -> PhonemeCacheStats:
+        """Copy of the cache counters."""
+        with self._lock:
+            return replace(self._stats)
+
+    def __len__(self) -> int:
+        """Number of entries held in memory."""
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[list[list[str]]]:
+        """Get cached phonemes for each sentence or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return [list(sentence_phonemes) for sentence_phonemes in entry]
+
+            entry = self._load(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+
+            self._stats.hits += 1
+            self._stats.disk_hits += 1
+            self._add(key, entry)
+
+            return [list(sentence_phonemes) for sentence_phonemes in entry]
+
+    def put(self, key: str, phonemes: list[list[str]]) -> None:
+        """Add phonemes for each sentence to the cache."""
+        entry = tuple(tuple(sentence_phonemes) for sentence_phonemes in phonemes)
+        with self._lock:
+            if key not in self._entries:
+                self._add(key, entry)
+                self._save(key, entry)
+
+    def clear(self) -> None:
+        """Remove all entries from memory (the database is left as-is)."""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        """Close the database (entries in memory are still available)."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _add(self, key: str, entry: CachedPhonemes) -> None:
+        if self.max_entries <= 0:
+            # Database only
+            return
+
+        self._entries[key] = entry
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def _save(self, key: str, entry: CachedPhonemes) -> None:
+        if self._db is None:
+            return
+
+        try:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO phonemes (key, phonemes) VALUES (?, ?)",
+                    (key, json.dumps(entry, ensure_ascii=False)),
+                )
+        except sqlite3.Error:
+            _LOGGER.exception("Failed to write phoneme cache entry: %s", key)
+
+    def _load(self, key: str) -> Optional[CachedPhonemes]:
+        if self._db is None:
+            return None
+
+        try:
+            row = self._db.execute(
+                "SELECT phonemes FROM phonemes WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            return tuple(
+                tuple(sentence_phonemes) for sentence_phonemes in json.loads(row[0])
+            )
+        except (sqlite3.Error, ValueError):
+            _LOGGER.exception("Failed to read phoneme cache entry: %s", key)
+            return None
+
+
+def _open_db(db_path: Path) -> sqlite3.Connection:
+    # Access is serialized by the cache's lock
+    db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+
+    # Readers in other processes don't block writers (and vice versa)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    with db:
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS phonemes "
+            "(key TEXT PRIMARY KEY NOT NULL, phonemes TEXT NOT NULL)"
+        )
+
+    return db
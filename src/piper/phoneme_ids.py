@@ -1,9 +1,14 @@
 """Utilities for converting phonemes to ids."""
 
+import itertools
 import logging
-from collections.abc import Mapping, Sequence
+import threading
+from collections import Counter
+from collections.abc import Collection, Mapping, Sequence
 from typing import Optional
 
+import numpy as np
+
 from .const import BOS, EOS, PAD
 
 _LOGGER = logging.getLogger(__name__)
@@ -202,3 +207,127 @@ def phonemes_to_ids(
     ids.extend(id_map[EOS])
 
     return ids
+
+
+class PhonemeIdEncoder:
+    """Converts phonemes to ids with a phoneme id map compiled into arrays.
+
+    Each phoneme becomes a "token" of its ids followed by PAD. Sentences are
+    encoded by gathering tokens into a single int64 array, or by writing ids
+    and PAD into alternating slots of a preallocated array when every phoneme
+    has one id.
+
+    Phonemes missing from the id map are skipped and counted (see
+    missing_phonemes). A warning is logged the first time each one is seen.
+    """
+
+    def __init__(
+        self,
+        id_map: Mapping[str, Sequence[int]],
+        pad_after: Optional[Collection[str]] = None,
+    ) -> None:
+        """
+        Initialize encoder.
+
+        :param id_map: Phoneme id map.
+        :param pad_after: Phonemes followed by PAD (all phonemes if None).
+        """
+        self.id_map = id_map
+
+        pad_ids = list(id_map[PAD])
+
+        def is_padded(phoneme: str) -> bool:
+            return (pad_after is None) or (phoneme in pad_after)
+
+        token_ids: list[int] = []
+        token_starts: list[int] = []
+        token_lengths: list[int] = []
+
+        def add_token(ids: Sequence[int]) -> int:
+            token_starts.append(len(token_ids))
+            token_lengths.append(len(ids))
+            token_ids.extend(ids)
+            return len(token_starts) - 1
+
+        self._token_index: dict[str, int] = {
+            phoneme: add_token([*ids, *pad_ids] if is_padded(phoneme) else ids)
+            for phoneme, ids in id_map.items()
+        }
+        self._bos_token = add_token(
+            [*id_map[BOS], *pad_ids] if is_padded(BOS) else id_map[BOS]
+        )
+        self._eos_token = add_token(id_map[EOS])
+
+        self._token_ids = np.array(token_ids, dtype=np.int64)
+        self._token_starts = np.array(token_starts, dtype=np.int64)
+        self._token_lengths = np.array(token_lengths, dtype=np.int64)
+
+        # Phoneme -> id for the alternating layout, if every phoneme has one id
+        self._single_ids: Optional[dict[str, int]] = None
+        self._pad_id = 0
+        if (
+            (pad_after is None)
+            and (len(pad_ids) == 1)
+            and all(len(ids) == 1 for ids in id_map.values())
+        ):
+            self._single_ids = {phoneme: ids[0] for phoneme, ids in id_map.items()}
+            self._pad_id = pad_ids[0]
+            self._bos_ids = self._token_ids[
+                token_starts[self._bos_token] : token_starts[self._eos_token]
+            ]
+            self._eos_ids = self._token_ids[token_starts[self._eos_token] :]
+
+        self._missing_phonemes: Counter[str] = Counter()
+        self._missing_lock = threading.Lock()
+
+    @property
+    def missing_phonemes(self) -> Counter[str]:
+        """Copy of the number of times each missing phoneme was skipped."""
+        with self._missing_lock:
+            return Counter(self._missing_phonemes)
+
+    def encode(self, phonemes: Sequence[str]) -> np.ndarray:
+        """Get phoneme ids (int64) for phonemes, including BOS/EOS."""
+        if self._single_ids is not None:
+            phoneme_ids = self._lookup(phonemes, self._single_ids)
+            num_bos_ids = len(self._bos_ids)
+            phonemes_end = num_bos_ids + (2 * len(phoneme_ids))
+            ids = np.empty(phonemes_end + len(self._eos_ids), dtype=np.int64)
+            ids[:num_bos_ids] = self._bos_ids
+            ids[num_bos_ids:phonemes_end:2] = phoneme_ids
+            ids[num_bos_ids + 1 : phonemes_end : 2] = self._pad_id
+            ids[phonemes_end:] = self._eos_ids
+            return ids
+
+        tokens = self._lookup(phonemes, self._token_index)
+        tokens = np.concatenate(([self._bos_token], tokens, [self._eos_token]))
+        lengths = self._token_lengths[tokens]
+        ends = np.cumsum(lengths)
+        offsets = np.repeat(self._token_starts[tokens] - (ends - lengths), lengths)
+        return self._token_ids[offsets + np.arange(ends[-1])]
+
+    def _lookup(self, phonemes: Sequence[str], values: Mapping[str, int]) -> np.ndarray:
+        """Look up phonemes, skipping missing ones."""
+        found = np.fromiter(
+            map(values.get, phonemes, itertools.repeat(-1)),
+            dtype=np.int64,
+            count=len(phonemes),
+        )
+        if (found < 0).any():
+            self._count_missing(
+                [phoneme for phoneme in phonemes if phoneme not in values]
+            )
+            found = found[found >= 0]
+
+        return found
+
+    def _count_missing(self, missing: Sequence[str]) -> None:
+        with self._missing_lock:
+            for phoneme in missing:
+                if phoneme not in self._missing_phonemes:
+                    _LOGGER.warning(
+                        "Missing phoneme from id map: %s (further occurrences are counted)",
+                        phoneme,
+                    )
+
+                self._missing_phonemes[phoneme] += 1
@@ -1,39 +1,208 @@
 """Phonemization with espeak-ng."""
 
+import functools
+import multiprocessing
+import os
 import re
+import threading
 import unicodedata
 from collections.abc import Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Set, Tuple, Union
+from typing import Callable, Dict, FrozenSet, Optional, Set, Tuple, Union
+
+from .phoneme_cache import PhonemeCache
 
 _DIR = Path(__file__).parent
 ESPEAK_DATA_DIR = _DIR / "espeak-ng-data"
 
+# espeak-ng has global state (including the current voice).
+# espeakbridge releases the GIL while espeak-ng runs, so other threads can
+# run Python code (and voice models) while one thread holds this lock.
+_ESPEAK_LOCK = threading.Lock()
+
+# Data dir that espeak-ng was last initialized with. Initializing espeak-ng
+# again in the same process can crash it, so this is only done for a new dir.
+_ESPEAK_DATA_DIR: Optional[str] = None
+
+# Separators in the output of espeakbridge.get_phonemes_batch
+_SENTENCE_SEPARATOR = "\x1e"
+_TEXT_SEPARATOR = "\x1d"
+
+# Separator between phonemes in results from EspeakPhonemizerPool workers
+_PHONEME_SEPARATOR = "\x1f"
+
+# (lang) switch flags, within one text
+_LANG_FLAGS = re.compile(f"\\([^){_SENTENCE_SEPARATOR}{_TEXT_SEPARATOR}]+\\)")
+
+
+class VowelClusterMerger:
+    """Merges known vowel clusters (e.g. diphthongs) into single phonemes.
+
+    Clusters are compiled once into a trie, so merging is one pass over the
+    phonemes that takes the longest cluster starting at each phoneme.
+    """
+
+    def __init__(self, clusters: Set[Tuple[str, ...]]) -> None:
+        """
+        Initialize merger.
+
+        :param clusters: Clusters of phonemes to merge (single phonemes are ignored).
+        """
+        self.clusters = clusters
+        self._trie: Dict[str, _TrieNode] = {}
+
+        for cluster in clusters:
+            if len(cluster) < 2:
+                continue
+
+            children = self._trie
+            node: Optional[_TrieNode] = None
+            for phoneme in cluster:
+                node = children.get(phoneme)
+                if node is None:
+                    node = _TrieNode()
+                    children[phoneme] = node
+
+                children = node.children
+
+            assert node is not None
+            node.merged = "".join(cluster)
+
+    def merge(self, phonemes: Sequence[str]) -> list[str]:
+        """Merge clusters in the phonemes of a sentence."""
+        trie = self._trie
+        merged_phonemes: list[str] = []
+        num_phonemes = len(phonemes)
+        i = 0
+
+        while i < num_phonemes:
+            match = phonemes[i]
+            match_end = i + 1
+
+            # Follow the trie as far as the phonemes go
+            node = trie.get(match)
+            j = i + 1
+            while (node is not None) and (j < num_phonemes):
+                node = node.children.get(phonemes[j])
+                j += 1
+                if (node is not None) and (node.merged is not None):
+                    match = node.merged
+                    match_end = j
+
+            merged_phonemes.append(match)
+            i = match_end
+
+        return merged_phonemes
+
+
+class _TrieNode:
+    __slots__ = ("children", "merged")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _TrieNode] = {}
+        self.merged: Optional[str] = None  # cluster that ends here
+
+
+# Vowel clusters as a set or already compiled
+VowelClusters = Union[Set[Tuple[str, ...]], VowelClusterMerger]
+
 
 class EspeakPhonemizer:
-    """Phonemizer that uses espeak-ng."""
+    """Phonemizer that uses espeak-ng.
+
+    espeak-ng is initialized once per process, so phonemizers with the same
+    data dir share it. With a cache, texts that were phonemized before (with
+    the same voice and vowel clusters) skip espeak-ng.
+    """
+
+    def __init__(
+        self,
+        espeak_data_dir: Union[str, Path] = ESPEAK_DATA_DIR,
+        cache: Optional[PhonemeCache] = None,
+    ) -> None:
+        """
+        Initialize phonemizer.
+
+        :param espeak_data_dir: Path to espeak-ng data dir (defaults to internal data).
+        :param cache: Cache of phonemes for repeated texts (disabled if None).
+        """
+        global _ESPEAK_DATA_DIR
 
-    def __init__(self, espeak_data_dir: Union[str, Path] = ESPEAK_DATA_DIR) -> None:
-        """Initialize phonemizer."""
         from . import espeakbridge  # avoid circular import
 
-        espeakbridge.initialize(str(espeak_data_dir))
+        self.cache = cache
+
+        with _ESPEAK_LOCK:
+            if _ESPEAK_DATA_DIR != str(espeak_data_dir):
+                espeakbridge.initialize(str(espeak_data_dir))
+                _ESPEAK_DATA_DIR = str(espeak_data_dir)
 
     def phonemize(
         self,
         voice: str,
         text: str,
-        vowel_clusters: Optional[Set[Tuple[str, ...]]] = None,
+        vowel_clusters: Optional[VowelClusters] = None,
+        cache: Optional[PhonemeCache] = None,
+    ) -> list[list[str]]:
+        """Text to phonemes grouped by sentence (thread-safe).
+
+        Vowel clusters may be compiled ahead of time (see
+        PiperConfig.vowel_cluster_merger). A cache given here is used instead
+        of the phonemizer's cache.
+        """
+        merger = _get_vowel_cluster_merger(vowel_clusters)
+        if cache is None:
+            cache = self.cache
+
+        if cache is None:
+            return self._phonemize(voice, text, merger)
+
+        key = cache.make_key(voice, text, merger.clusters if merger else None)
+        phonemes = cache.get(key)
+        if phonemes is None:
+            phonemes = self._phonemize(voice, text, merger)
+            cache.put(key, phonemes)
+
+        return phonemes
+
+    def phonemize_batch(
+        self,
+        voice: str,
+        texts: Sequence[str],
+        vowel_clusters: Optional[VowelClusters] = None,
+        cache: Optional[PhonemeCache] = None,
+    ) -> list[list[list[str]]]:
+        """Phonemize several texts with the same voice (thread-safe).
+
+        Returns the same as phonemize for each text. espeak-ng is called once
+        for all texts (that aren't cached), and the result is post-processed
+        as a single string, which is much faster than phonemizing texts one
+        at a time.
+        """
+        return _phonemize_batch_cached(
+            self._phonemize_batch,
+            voice,
+            texts,
+            _get_vowel_cluster_merger(vowel_clusters),
+            self.cache if cache is None else cache,
+        )
+
+    def _phonemize(
+        self,
+        voice: str,
+        text: str,
+        merger: Optional[VowelClusterMerger],
     ) -> list[list[str]]:
-        """Text to phonemes grouped by sentence."""
         from . import espeakbridge  # avoid circular import
 
-        espeakbridge.set_voice(voice)
+        with _ESPEAK_LOCK:
+            espeakbridge.set_voice(voice)
+            clause_phonemes = espeakbridge.get_phonemes(text)
 
         all_phonemes: list[list[str]] = []
         sentence_phonemes: list[str] = []
 
-        clause_phonemes = espeakbridge.get_phonemes(text)
         for phonemes_str, terminator_str, end_of_sentence in clause_phonemes:
             # Filter out (lang) switch (flags).
             # These surround words from languages other than the current voice.
@@ -50,48 +219,310 @@ class EspeakPhonemizer:
             sentence_phonemes.extend(list(unicodedata.normalize("NFD", phonemes_str)))
 
             if end_of_sentence:
-                if vowel_clusters:
-                    sentence_phonemes = _merge_known_vowel_clusters(
-                        sentence_phonemes, vowel_clusters
-                    )
+                if merger is not None:
+                    sentence_phonemes = merger.merge(sentence_phonemes)
 
                 all_phonemes.append(sentence_phonemes)
                 sentence_phonemes = []
 
         if sentence_phonemes:
             # Text without a final sentence terminator
-            if vowel_clusters:
-                sentence_phonemes = _merge_known_vowel_clusters(
-                    sentence_phonemes, vowel_clusters
-                )
+            if merger is not None:
+                sentence_phonemes = merger.merge(sentence_phonemes)
 
             all_phonemes.append(sentence_phonemes)
 
         return all_phonemes
 
+    def _phonemize_batch(
+        self,
+        voice: str,
+        texts: Sequence[str],
+        merger: Optional[VowelClusterMerger],
+    ) -> list[list[list[str]]]:
+        from . import espeakbridge  # avoid circular import
+
+        with _ESPEAK_LOCK:
+            batch_str = espeakbridge.get_phonemes_batch(voice, texts)
+
+        batch_str = _LANG_FLAGS.sub("", batch_str)
+        batch_str = unicodedata.normalize("NFD", batch_str)
+
+        # Drop empty string after last text separator
+        text_strs = batch_str.split(_TEXT_SEPARATOR)[:-1]
+
+        all_text_phonemes: list[list[list[str]]] = []
+        for text_str in text_strs:
+            sentence_strs = text_str.split(_SENTENCE_SEPARATOR)
+            if not sentence_strs[-1]:
+                # Text ends with a sentence terminator
+                sentence_strs.pop()
+
+            text_phonemes: list[list[str]] = []
+            for sentence_str in sentence_strs:
+                sentence_phonemes = list(sentence_str)
+                if merger is not None:
+                    sentence_phonemes = merger.merge(sentence_phonemes)
+
+                text_phonemes.append(sentence_phonemes)
+
+            all_text_phonemes.append(text_phonemes)
+
+        return all_text_phonemes
+
+
+class EspeakPhonemizerPool:
+    """Phonemizer that runs espeak-ng in worker processes.
+
+    espeak-ng can only phonemize one text at a time per process. Each worker
+    process initializes espeak-ng once and phonemizes independently, so
+    throughput scales with the number of workers.
+
+    Requests go to the least busy worker, preferring one that last used the
+    same voice (switching voices reloads espeak-ng data). Results are sent
+    back as one string per request.
+    """
+
+    def __init__(
+        self,
+        num_processes: Optional[int] = None,
+        espeak_data_dir: Union[str, Path] = ESPEAK_DATA_DIR,
+        cache: Optional[PhonemeCache] = None,
+    ) -> None:
+        """
+        Initialize pool. Worker processes are started on first use.
+
+        :param num_processes: Number of worker processes (defaults to CPU count).
+        :param espeak_data_dir: Path to espeak-ng data dir (defaults to internal data).
+        :param cache: Cache of phonemes for repeated texts, checked before
+            sending texts to workers (disabled if None).
+        """
+        if num_processes is None:
+            num_processes = os.cpu_count() or 1
+
+        if num_processes < 1:
+            raise ValueError("Phonemizer pool needs at least one process")
+
+        # Forking a process with running threads (onnxruntime) is unsafe
+        mp_context = multiprocessing.get_context("spawn")
+        self._executors = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp_context,
+                initializer=_init_pool_worker,
+                initargs=(str(espeak_data_dir),),
+            )
+            for _ in range(num_processes)
+        ]
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._num_pending = [0] * num_processes
+        self._voices: list[Optional[str]] = [None] * num_processes
+
+    def __len__(self) -> int:
+        """Number of worker processes."""
+        return len(self._executors)
+
+    def phonemize(
+        self,
+        voice: str,
+        text: str,
+        vowel_clusters: Optional[VowelClusters] = None,
+        cache: Optional[PhonemeCache] = None,
+    ) -> list[list[str]]:
+        """Text to phonemes grouped by sentence (thread-safe).
+
+        A cache given here is used instead of the pool's cache.
+        """
+        return self.phonemize_batch(
+            voice, [text], vowel_clusters=vowel_clusters, cache=cache
+        )[0]
+
+    def phonemize_batch(
+        self,
+        voice: str,
+        texts: Sequence[str],
+        vowel_clusters: Optional[VowelClusters] = None,
+        cache: Optional[PhonemeCache] = None,
+    ) -> list[list[list[str]]]:
+        """Phonemize several texts with the same voice (thread-safe).
+
+        Returns the same as EspeakPhonemizer.phonemize_batch. Texts that
+        aren't cached are split evenly between the workers.
+        """
+        return _phonemize_batch_cached(
+            self._phonemize_batch,
+            voice,
+            texts,
+            _get_vowel_cluster_merger(vowel_clusters),
+            self.cache if cache is None else cache,
+        )
+
+    def _phonemize_batch(
+        self,
+        voice: str,
+        texts: Sequence[str],
+        merger: Optional[VowelClusterMerger],
+    ) -> list[list[list[str]]]:
+        if not texts:
+            return []
+
+        texts = list(texts)
+        num_chunks = min(len(self._executors), len(texts))
+        chunk_size = -(-len(texts) // num_chunks)
+        futures = [
+            self.submit_batch(voice, texts[start : start + chunk_size], merger)
+            for start in range(0, len(texts), chunk_size)
+        ]
+
+        all_text_phonemes: list[list[list[str]]] = []
+        for future in futures:
+            all_text_phonemes.extend(_decode_pool_result(future.result()))
+
+        return all_text_phonemes
+
+    def submit_batch(
+        self,
+        voice: str,
+        texts: Sequence[str],
+        vowel_clusters: Optional[VowelClusters] = None,
+    ) -> "Future[str]":
+        """Phonemize texts in one worker without waiting.
+
+        The result is encoded as a string; see _decode_pool_result.
+        """
+        merger = _get_vowel_cluster_merger(vowel_clusters)
+        with self._lock:
+            worker_idx = min(
+                range(len(self._executors)),
+                key=lambda i: self._num_pending[i] + (self._voices[i] != voice),
+            )
+            self._num_pending[worker_idx] += 1
+            self._voices[worker_idx] = voice
+
+        try:
+            future = self._executors[worker_idx].submit(
+                _pool_phonemize_batch, voice, list(texts), merger
+            )
+        except Exception:
+            self._finish(worker_idx)
+            raise
+
+        future.add_done_callback(lambda _future: self._finish(worker_idx))
+        return future
+
+    def close(self) -> None:
+        """Stop worker processes."""
+        for executor in self._executors:
+            executor.shutdown()
+
+    def __enter__(self) -> "EspeakPhonemizerPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _finish(self, worker_idx: int) -> None:
+        with self._lock:
+            self._num_pending[worker_idx] -= 1
+
+
+def _phonemize_batch_cached(
+    phonemize_batch: Callable[
+        [str, Sequence[str], Optional[VowelClusterMerger]], list[list[list[str]]]
+    ],
+    voice: str,
+    texts: Sequence[str],
+    merger: Optional[VowelClusterMerger],
+    cache: Optional[PhonemeCache],
+) -> list[list[list[str]]]:
+    """Phonemize texts in a batch, skipping texts that are in the cache."""
+    if cache is None:
+        return phonemize_batch(voice, texts, merger)
+
+    vowel_clusters = merger.clusters if merger else None
+    keys = [cache.make_key(voice, text, vowel_clusters) for text in texts]
+    all_text_phonemes = [cache.get(key) for key in keys]
+    missing_idxs = [
+        i for i, phonemes in enumerate(all_text_phonemes) if phonemes is None
+    ]
+    if missing_idxs:
+        missing_phonemes = phonemize_batch(
+            voice, [texts[i] for i in missing_idxs], merger
+        )
+        for i, text_phonemes in zip(missing_idxs, missing_phonemes):
+            cache.put(keys[i], text_phonemes)
+            all_text_phonemes[i] = text_phonemes
+
+    # All texts have phonemes now
+    return [
+        text_phonemes
+        for text_phonemes in all_text_phonemes
+        if text_phonemes is not None
+    ]
+
+
+# Phonemizer of an EspeakPhonemizerPool worker process
+_POOL_PHONEMIZER: Optional[EspeakPhonemizer] = None
+
+
+def _init_pool_worker(espeak_data_dir: str) -> None:
+    global _POOL_PHONEMIZER
+    _POOL_PHONEMIZER = EspeakPhonemizer(espeak_data_dir)
+
+
+def _pool_phonemize_batch(
+    voice: str,
+    texts: Sequence[str],
+    merger: Optional[VowelClusterMerger],
+) -> str:
+    """Phonemize texts in a worker, encoded as a single string.
+
+    Phonemes are separated by \\x1f, each sentence is followed by \\x1e,
+    and each text by \\x1d. A string pickles much faster than nested lists
+    of phonemes.
+    """
+    assert _POOL_PHONEMIZER is not None
+    all_text_phonemes = _POOL_PHONEMIZER.phonemize_batch(
+        voice, texts, vowel_clusters=merger
+    )
+
+    return "".join(
+        "".join(
+            _PHONEME_SEPARATOR.join(sentence_phonemes) + _SENTENCE_SEPARATOR
+            for sentence_phonemes in text_phonemes
+        )
+        + _TEXT_SEPARATOR
+        for text_phonemes in all_text_phonemes
+    )
+
+
+def _decode_pool_result(result: str) -> list[list[list[str]]]:
+    """Decode phonemes from _pool_phonemize_batch."""
+    return [
+        [
+            sentence_str.split(_PHONEME_SEPARATOR) if sentence_str else []
+            for sentence_str in text_str.split(_SENTENCE_SEPARATOR)[:-1]
+        ]
+        for text_str in result.split(_TEXT_SEPARATOR)[:-1]
+    ]
+
 
-def _merge_known_vowel_clusters(
-    phones: Sequence[str], clusters: Set[Tuple[str, ...]]
-) -> List[str]:
-    """Merge adjacent recognized vowel clusters."""
-    max_len = max(len(k) for k in clusters)
-    out: list[str] = []
-    i = 0
+def _get_vowel_cluster_merger(
+    vowel_clusters: Optional[VowelClusters],
+) -> Optional[VowelClusterMerger]:
+    """Get merger for vowel clusters (None if there are none)."""
+    if isinstance(vowel_clusters, VowelClusterMerger):
+        return vowel_clusters
 
-    while i < len(phones):
-        match: Tuple[str, ...] | None = None
+    if not vowel_clusters:
+        return None
 
-        for n in range(min(max_len, len(phones) - i), 1, -1):
-            candidate = tuple(phones[i : i + n])
-            if candidate in clusters:
-                match = candidate
-                break
+    return _compile_vowel_clusters(frozenset(vowel_clusters))
 
-        if match is not None:
-            out.append("".join(match))
-            i += len(match)
-        else:
-            out.append(phones[i])
-            i += 1
 
-    return out
+@functools.lru_cache(maxsize=16)
+def _compile_vowel_clusters(
+    vowel_clusters: FrozenSet[Tuple[str, ...]],
+) -> VowelClusterMerger:
+    return VowelClusterMerger(set(vowel_clusters))
@@ -0,0 +1,334 @@
+"""Quantizes a voice ONNX model to int8 and reports its speed and quality.
+
+Requires the onnx package to be installed, in addition to onnxruntime.
+"""
+
+import argparse
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Any, Optional, Union
+
+import numpy as np
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from .config import SynthesisConfig
+from .voice import PiperVoice
+
+_LOGGER = logging.getLogger(__name__)
+
+# Operators quantized in static mode. These are nearly all of the decoder's
+# compute; the rest of the model stays in fp32.
+STATIC_OP_TYPES = ["Conv", "ConvTranspose", "MatMul"]
+
+# No generator noise, so fp32 and int8 audio can be compared sample by sample
+_REPORT_SYNTHESIS_CONFIG = SynthesisConfig(noise_scale=0.0, noise_w_scale=0.0, seed=0)
+
+# STFT settings for spectral distance
+_N_FFT = 1024
+_HOP_LENGTH = 256
+
+
+class VoiceCalibrationReader(CalibrationDataReader):
+    """Voice model inputs for calibrating static quantization."""
+
+    def __init__(
+        self, voice: PiperVoice, sentence_phoneme_ids: Sequence[np.ndarray]
+    ) -> None:
+        """
+        Initialize reader.
+
+        :param voice: fp32 voice, used to create model inputs.
+        :param sentence_phoneme_ids: Phoneme ids of each calibration sentence.
+        """
+        self.voice = voice
+        self.sentence_phoneme_ids = sentence_phoneme_ids
+        self._next_index = 0
+
+    def get_next(self) -> Optional[dict[str, np.ndarray]]:
+        if self._next_index >= len(self.sentence_phoneme_ids):
+            return None
+
+        phoneme_ids = self.sentence_phoneme_ids[self._next_index]
+        self._next_index += 1
+
+        return self.voice.get_model_inputs(phoneme_ids)
+
+    def rewind(self) -> None:
+        self._next_index = 0
+
+
+def get_sentence_phoneme_ids(
+    voice: PiperVoice, lines: Iterable[str], max_sentences: int
+) -> list[np.ndarray]:
+    """Phonemize lines of text into the phoneme ids of at most max_sentences."""
+    sentence_phoneme_ids: list[np.ndarray] = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        for phonemes in voice.phonemize(line):
+            if not phonemes:
+                continue
+
+            sentence_phoneme_ids.append(
+                voice.config.phoneme_id_encoder.encode(phonemes)
+            )
+            if len(sentence_phoneme_ids) >= max_sentences:
+                return sentence_phoneme_ids
+
+    return sentence_phoneme_ids
+
+
+def quantize_voice(
+    model_path: Union[str, Path],
+    output_path: Union[str, Path],
+    calibration_reader: Optional[CalibrationDataReader] = None,
+    per_channel: bool = False,
+) -> None:
+    """Quantize a voice model to int8.
+
+    Static quantization is used if a calibration reader is given: weights and
+    activations of STATIC_OP_TYPES are int8, with activation ranges taken from
+    the calibration inputs. Otherwise, weights are quantized ahead of time and
+    activations are quantized dynamically at run time.
+
+    :param model_path: Path to fp32 voice model.
+    :param output_path: Path to write int8 voice model.
+    :param calibration_reader: Model inputs for static quantization (dynamic if None).
+    :param per_channel: Quantize weights per output channel instead of per tensor.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Folds the Identity nodes that torch inserts for shared weights, which
+        # would otherwise keep those weights from being quantized.
+        preprocessed_path = Path(temp_dir) / "preprocessed.onnx"
+        quant_pre_process(
+            str(model_path), str(preprocessed_path), skip_symbolic_shape=True
+        )
+
+        if calibration_reader is None:
+            # ConvInteger is only implemented for uint8 weights
+            quantize_dynamic(
+                preprocessed_path,
+                output_path,
+                per_channel=per_channel,
+                weight_type=QuantType.QUInt8,
+            )
+        else:
+            quantize_static(
+                preprocessed_path,
+                output_path,
+                calibration_reader,
+                quant_format=QuantFormat.QDQ,
+                op_types_to_quantize=STATIC_OP_TYPES,
+                per_channel=per_channel,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+            )
+
+
+def spectral_distance(audio: np.ndarray, reference_audio: np.ndarray) -> float:
+    """Log-spectral distance (dB) between audio and reference audio.
+
+    The longer of the two is truncated.
+    """
+    num_samples = min(len(audio), len(reference_audio))
+    spectrum = _log_spectrogram(audio[:num_samples])
+    reference_spectrum = _log_spectrogram(reference_audio[:num_samples])
+
+    return float(
+        np.mean(np.sqrt(np.mean((spectrum - reference_spectrum) ** 2, axis=1)))
+    )
+
+
+def make_report(
+    voice: PiperVoice,
+    quantized_voice: PiperVoice,
+    sentence_phoneme_ids: Sequence[np.ndarray],
+    model_path: Union[str, Path],
+    quantized_model_path: Union[str, Path],
+) -> dict[str, Any]:
+    """Compare the speed, size, and output of a voice and its quantized version.
+
+    Audio is synthesized without generator noise, so differences are only
+    from quantization.
+    """
+    voice_audio, voice_seconds = _synthesize_timed(voice, sentence_phoneme_ids)
+    quantized_audio, quantized_seconds = _synthesize_timed(
+        quantized_voice, sentence_phoneme_ids
+    )
+
+    sample_rate = voice.config.sample_rate
+    voice_rtf = voice_seconds / (sum(len(a) for a in voice_audio) / sample_rate)
+    quantized_rtf = quantized_seconds / (
+        sum(len(a) for a in quantized_audio) / sample_rate
+    )
+
+    voice_size = _get_model_size(model_path)
+    quantized_size = _get_model_size(quantized_model_path)
+
+    distances = [
+        spectral_distance(audio, reference_audio)
+        for audio, reference_audio in zip(quantized_audio, voice_audio)
+    ]
+
+    return {
+        "sentences": len(sentence_phoneme_ids),
+        "fp32": {"model_size": voice_size, "real_time_factor": voice_rtf},
+        "int8": {"model_size": quantized_size, "real_time_factor": quantized_rtf},
+        "size_ratio": quantized_size / voice_size,
+        "speedup": voice_rtf / quantized_rtf,
+        "spectral_distance_db": float(np.mean(distances)),
+        "max_spectral_distance_db": float(np.max(distances)),
+        "length_ratio": sum(len(a) for a in quantized_audio)
+        / sum(len(a) for a in voice_audio),
+    }
+
+
+def main() -> int:
+    """Main entry point."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", help="Path to ONNX voice model")
+    parser.add_argument(
+        "--calibration-file",
+        required=True,
+        help="Path to text file with sentences for calibration and the report",
+    )
+    parser.add_argument("-c", "--config", help="Path to model config file")
+    parser.add_argument(
+        "--output-file",
+        help="Path to write quantized model (default: <model>.int8.onnx)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("static", "dynamic"),
+        default="static",
+        help="Quantize activations ahead of time from calibration or at run time "
+        "(default: static)",
+    )
+    parser.add_argument(
+        "--per-channel",
+        action="store_true",
+        help="Quantize weights per output channel",
+    )
+    parser.add_argument(
+        "--max-sentences",
+        type=int,
+        default=50,
+        help="Maximum number of sentences from calibration file (default: 50)",
+    )
+    parser.add_argument("--report-file", help="Path to write JSON report")
+    parser.add_argument(
+        "--debug", action="store_true", help="Print DEBUG messages to console"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+
+    model_path = Path(args.model)
+    config_path = Path(args.config or f"{model_path}.json")
+    output_path = Path(args.output_file or model_path.with_suffix(".int8.onnx"))
+
+    voice = PiperVoice.load(model_path, config_path=config_path)
+    with open(args.calibration_file, "r", encoding="utf-8") as calibration_file:
+        sentence_phoneme_ids = get_sentence_phoneme_ids(
+            voice, calibration_file, args.max_sentences
+        )
+
+    if not sentence_phoneme_ids:
+        _LOGGER.fatal("No sentences in calibration file: %s", args.calibration_file)
+        return 1
+
+    _LOGGER.info(
+        "Quantizing (%s) with %s sentence(s)", args.mode, len(sentence_phoneme_ids)
+    )
+    calibration_reader: Optional[CalibrationDataReader] = None
+    if args.mode == "static":
+        calibration_reader = VoiceCalibrationReader(voice, sentence_phoneme_ids)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    quantize_voice(
+        model_path,
+        output_path,
+        calibration_reader=calibration_reader,
+        per_channel=args.per_channel,
+    )
+
+    output_config_path = Path(f"{output_path}.json")
+    shutil.copyfile(config_path, output_config_path)
+    _LOGGER.info("Wrote %s and %s", output_path, output_config_path)
+
+    quantized_voice = PiperVoice.load(output_path, config_path=output_config_path)
+    report = {
+        "mode": args.mode,
+        **make_report(
+            voice, quantized_voice, sentence_phoneme_ids, model_path, output_path
+        ),
+    }
+
+    report_json = json.dumps(report, indent=2)
+    print(report_json)
+
+    if args.report_file:
+        Path(args.report_file).write_text(report_json + "\n", encoding="utf-8")
+
+    return 0
+
+
+# -----------------------------------------------------------------------------
+
+
+def _synthesize_timed(
+    voice: PiperVoice, sentence_phoneme_ids: Sequence[np.ndarray]
+) -> tuple[list[np.ndarray], float]:
+    """Synthesize each sentence and return (audio, seconds spent in the model)."""
+    # First run is slower
+    voice.phoneme_ids_to_audio(sentence_phoneme_ids[0], _REPORT_SYNTHESIS_CONFIG)
+
+    sentence_audio: list[np.ndarray] = []
+    seconds = 0.0
+    for phoneme_ids in sentence_phoneme_ids:
+        start_time = time.perf_counter()
+        audio = voice.phoneme_ids_to_audio(phoneme_ids, _REPORT_SYNTHESIS_CONFIG)
+        seconds += time.perf_counter() - start_time
+
+        assert isinstance(audio, np.ndarray)
+        sentence_audio.append(audio.reshape(-1))
+
+    return sentence_audio, seconds
+
+
+def _get_model_size(model_path: Union[str, Path]) -> int:
+    """Size in bytes of a voice model file (and its external weights, if any)."""
+    model_path = Path(model_path)
+    size = model_path.stat().st_size
+    data_path = model_path.with_name(f"{model_path.name}.data")
+    if data_path.exists():
+        size += data_path.stat().st_size
+
+    return size
+
+
+def _log_spectrogram(audio: np.ndarray) -> np.ndarray:
+    """Log-magnitude (dB) spectrogram with shape (frames, bins)."""
+    audio = np.pad(audio.astype(np.float32), (0, max(0, _N_FFT - len(audio))))
+    frames = np.lib.stride_tricks.sliding_window_view(audio, _N_FFT)[::_HOP_LENGTH]
+    magnitude = np.abs(np.fft.rfft(frames * np.hanning(_N_FFT), axis=1))
+
+    return 20 * np.log10(np.maximum(magnitude, 1e-5))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""I/O binding for running an ONNX session with reusable input buffers."""
+
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+import onnxruntime
+
+
+class SessionBinding:
+    """Runs a session with I/O binding, reusing input buffers between runs.
+
+    Each input has a buffer that grows to the largest size requested so far
+    (doubling, so a slowly growing input does not reallocate on every run).
+    Outputs are bound to the CPU and allocated by onnxruntime from the
+    session's memory arena. Their shapes depend on the phoneme durations, and
+    onnxruntime only accepts preallocated outputs of the exact computed shape.
+    Outputs are returned as views of that memory without copying.
+
+    Buffers are shared by all runs, so only one thread may use a binding at a
+    time (from filling its buffers until its outputs are returned).
+    """
+
+    def __init__(self, session: onnxruntime.InferenceSession) -> None:
+        """
+        Initialize binding.
+
+        :param session: Session to run.
+        """
+        self.session = session
+        self._io_binding = session.io_binding()
+        self._output_names = [output.name for output in session.get_outputs()]
+        self._buffers: dict[str, np.ndarray] = {}
+
+    def get_buffer(self, name: str, shape: Sequence[int], dtype: type) -> np.ndarray:
+        """Get a contiguous array with the given shape from an input's buffer.
+
+        The contents are left over from previous runs.
+        """
+        size = int(np.prod(shape))
+        buffer = self._buffers.get(name)
+        if (buffer is None) or (buffer.dtype != dtype) or (buffer.size < size):
+            capacity = size
+            if (buffer is not None) and (buffer.dtype == dtype):
+                capacity = max(size, 2 * buffer.size)
+
+            buffer = np.empty(capacity, dtype=dtype)
+            self._buffers[name] = buffer
+
+        return buffer[:size].reshape(shape)
+
+    def run(self, args: Mapping[str, np.ndarray]) -> list[np.ndarray]:
+        """Run the session on inputs (buffers or other contiguous arrays)."""
+        for name, value in args.items():
+            # Wraps the array's memory (bind_cpu_input would copy it)
+            self._io_binding.bind_ortvalue_input(
+                name, onnxruntime.OrtValue.ortvalue_from_numpy(value)
+            )
+
+        for name in self._output_names:
+            self._io_binding.bind_output(name, "cpu")
+
+        self.session.run_with_iobinding(self._io_binding)
+        outputs = [output.numpy() for output in self._io_binding.get_outputs()]
+
+        # Outputs stay allocated only as long as the returned arrays
+        self._io_binding.clear_binding_outputs()
+
+        return outputs
+
+    @property
+    def buffer_bytes(self) -> int:
+        """Total size of the input buffers."""
+        return sum(buffer.nbytes for buffer in self._buffers.values())
@@ -0,0 +1,48 @@
+"""Pool of ONNX sessions for running one voice model concurrently."""
+
+import queue
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+
+import onnxruntime
+
+
+class SessionPool:
+    """Sessions for the same voice model, each used by one caller at a time.
+
+    A single session can be run from several threads, but the runs then share
+    its thread pool. With a pool, each concurrent run gets a session (and
+    threads) of its own, and callers wait when all sessions are busy.
+    """
+
+    def __init__(self, sessions: Sequence[onnxruntime.InferenceSession]) -> None:
+        """
+        Initialize pool.
+
+        :param sessions: Sessions to hand out (at least one).
+        """
+        if not sessions:
+            raise ValueError("Session pool needs at least one session")
+
+        self.sessions = list(sessions)
+        self._available: "queue.Queue[onnxruntime.InferenceSession]" = queue.Queue()
+        for session in self.sessions:
+            self._available.put(session)
+
+    def __len__(self) -> int:
+        """Number of sessions in the pool."""
+        return len(self.sessions)
+
+    @property
+    def num_available(self) -> int:
+        """Number of sessions not checked out."""
+        return self._available.qsize()
+
+    @contextmanager
+    def checkout(self) -> Iterator[onnxruntime.InferenceSession]:
+        """Get a session for the duration of a with block, waiting if needed."""
+        session = self._available.get()
+        try:
+            yield session
+        finally:
+            self._available.put(session)
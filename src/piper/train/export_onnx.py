@@ -12,6 +12,12 @@ from .vits.lightning import VitsModel
 _LOGGER = logging.getLogger(__name__)
 OPSET_VERSION = 15
 
+# Noise frames in the dummy input when exporting with --noise-inputs
+DUMMY_NOISE_FRAMES = 100
+
+# Latent frames in the dummy input of the decoder when exporting with --streaming
+DUMMY_LATENT_FRAMES = 100
+
 
 def main() -> None:
     """Main entry point"""
@@ -25,6 +31,21 @@ def main() -> None:
         "--output-file", required=True, help="Path to output file (.onnx)"
     )
 
+    parser.add_argument(
+        "--noise-inputs",
+        action="store_true",
+        help="Add noise and noise_w inputs so synthesis can be seeded",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Also export separate encoder/decoder models for streaming synthesis",
+    )
+    parser.add_argument(
+        "--durations",
+        action="store_true",
+        help="Also export a model that only predicts phoneme durations",
+    )
     parser.add_argument(
         "--debug", action="store_true", help="Print DEBUG messages to the console"
     )
@@ -54,7 +75,7 @@ def main() -> None:
     with torch.no_grad():
         model_g.dec.remove_weight_norm()
 
-    def infer_forward(text, text_lengths, scales, sid=None):
+    def infer_forward(text, text_lengths, scales, sid=None, noise=None, noise_w=None):
         noise_scale = scales[0]
         length_scale = scales[1]
         noise_scale_w = scales[2]
@@ -65,6 +86,8 @@ def main() -> None:
             length_scale=length_scale,
             noise_scale_w=noise_scale_w,
             sid=sid,
+            noise=noise,
+            noise_w=noise_w,
         )[0].unsqueeze(1)
 
         return audio
@@ -86,7 +109,28 @@ def main() -> None:
 
     # noise, length, noise_w
     scales = torch.FloatTensor([0.667, 1.0, 0.8])
-    dummy_input = (sequences, sequence_lengths, scales, sid)
+    dummy_input: tuple = (sequences, sequence_lengths, scales, sid)
+    input_names = ["input", "input_lengths", "scales"]
+    if sid is not None:
+        input_names.append("sid")
+
+    dynamic_axes = {
+        "input": {0: "batch_size", 1: "phonemes"},
+        "input_lengths": {0: "batch_size"},
+        "output": {0: "batch_size", 2: "time"},
+    }
+    if sid is not None:
+        dynamic_axes["sid"] = {0: "batch_size"}
+
+    if args.noise_inputs:
+        # Standard normal noise, supplied by the caller instead of sampled in
+        # the graph so that output is reproducible.
+        noise = torch.randn(1, model_g.inter_channels, DUMMY_NOISE_FRAMES)
+        noise_w = torch.randn(1, 2, dummy_input_length)
+        dummy_input = (*dummy_input, noise, noise_w)
+        input_names.extend(["noise", "noise_w"])
+        dynamic_axes["noise"] = {0: "batch_size", 2: "noise_frames"}
+        dynamic_axes["noise_w"] = {0: "batch_size", 2: "phonemes"}
 
     # Export
     torch.onnx.export(
@@ -95,16 +139,146 @@ def main() -> None:
         f=output_path,
         verbose=False,
         opset_version=OPSET_VERSION,
-        input_names=["input", "input_lengths", "scales", "sid"],
+        input_names=input_names,
         output_names=["output"],
-        dynamic_axes={
-            "input": {0: "batch_size", 1: "phonemes"},
-            "input_lengths": {0: "batch_size"},
-            "output": {0: "batch_size", 2: "time"},
-        },
+        dynamic_axes=dynamic_axes,
     )
     _LOGGER.info("Exported model to %s", output_path)
 
+    if args.durations:
+        export_durations(
+            model_g,
+            output_path.with_suffix(".durations.onnx"),
+            sequences,
+            sequence_lengths,
+            scales,
+            sid=sid,
+            noise_inputs=args.noise_inputs,
+        )
+
+    if not args.streaming:
+        return
+
+    # Encoder: text encoder, duration predictor, and flow.
+    # Produces latent frames that can be decoded to audio a window at a time.
+    def encoder_forward(text, text_lengths, scales, sid=None, noise=None, noise_w=None):
+        z, _attn, y_mask, _ = model_g.infer_latent(
+            text,
+            text_lengths,
+            noise_scale=scales[0],
+            length_scale=scales[1],
+            noise_scale_w=scales[2],
+            sid=sid,
+            noise=noise,
+            noise_w=noise_w,
+        )
+
+        return z * y_mask
+
+    model_g.forward = encoder_forward  # type: ignore[method-assign,assignment]
+
+    encoder_path = output_path.with_suffix(".encoder.onnx")
+    encoder_dynamic_axes = {
+        name: axes for name, axes in dynamic_axes.items() if name != "output"
+    }
+    encoder_dynamic_axes["z"] = {0: "batch_size", 2: "frames"}
+    torch.onnx.export(
+        model=model_g,
+        args=dummy_input,
+        f=encoder_path,
+        verbose=False,
+        opset_version=OPSET_VERSION,
+        input_names=input_names,
+        output_names=["z"],
+        dynamic_axes=encoder_dynamic_axes,
+    )
+    _LOGGER.info("Exported encoder to %s", encoder_path)
+
+    # Decoder: latent frames to audio
+    def decoder_forward(z, sid=None):
+        return model_g.decode(z, sid=sid)
+
+    model_g.forward = decoder_forward  # type: ignore[method-assign,assignment]
+
+    decoder_path = output_path.with_suffix(".decoder.onnx")
+    decoder_input_names = ["z"]
+    decoder_dynamic_axes = {
+        "z": {0: "batch_size", 2: "frames"},
+        "output": {0: "batch_size", 2: "time"},
+    }
+    if sid is not None:
+        decoder_input_names.append("sid")
+        decoder_dynamic_axes["sid"] = {0: "batch_size"}
+
+    torch.onnx.export(
+        model=model_g,
+        args=(torch.randn(1, model_g.inter_channels, DUMMY_LATENT_FRAMES), sid),
+        f=decoder_path,
+        verbose=False,
+        opset_version=OPSET_VERSION,
+        input_names=decoder_input_names,
+        output_names=["output"],
+        dynamic_axes=decoder_dynamic_axes,
+    )
+    _LOGGER.info("Exported decoder to %s", decoder_path)
+
+
+def export_durations(
+    model_g,
+    durations_path: Path,
+    sequences: torch.Tensor,
+    sequence_lengths: torch.Tensor,
+    scales: torch.Tensor,
+    sid: Optional[torch.Tensor] = None,
+    noise_inputs: bool = False,
+) -> None:
+    """Export text encoder and duration predictor only.
+
+    The output is the ceiled duration of each phoneme id in latent frames
+    (the w_ceil tensor of the full model), which is enough for timings.
+    The noise input is dropped since the flow and decoder are not included.
+    """
+
+    def durations_forward(text, text_lengths, scales, sid=None, noise_w=None):
+        return model_g.infer_durations(
+            text,
+            text_lengths,
+            sid=sid,
+            length_scale=scales[1],
+            noise_scale_w=scales[2],
+            noise_w=noise_w,
+        )
+
+    model_g.forward = durations_forward  # type: ignore[method-assign,assignment]
+
+    dummy_input: tuple = (sequences, sequence_lengths, scales, sid)
+    input_names = ["input", "input_lengths", "scales"]
+    dynamic_axes = {
+        "input": {0: "batch_size", 1: "phonemes"},
+        "input_lengths": {0: "batch_size"},
+        "durations": {0: "batch_size", 2: "phonemes"},
+    }
+    if sid is not None:
+        input_names.append("sid")
+        dynamic_axes["sid"] = {0: "batch_size"}
+
+    if noise_inputs:
+        dummy_input = (*dummy_input, torch.randn(1, 2, sequences.size(1)))
+        input_names.append("noise_w")
+        dynamic_axes["noise_w"] = {0: "batch_size", 2: "phonemes"}
+
+    torch.onnx.export(
+        model=model_g,
+        args=dummy_input,
+        f=durations_path,
+        verbose=False,
+        opset_version=OPSET_VERSION,
+        input_names=input_names,
+        output_names=["durations"],
+        dynamic_axes=dynamic_axes,
+    )
+    _LOGGER.info("Exported durations model to %s", durations_path)
+
 
 # -----------------------------------------------------------------------------
 
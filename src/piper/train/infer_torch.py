@@ -95,7 +95,7 @@ def main() -> None:
                 espeak_phonemizer = EspeakPhonemizer()
 
             sentence_phonemes = espeak_phonemizer.phonemize(
-                config.espeak_voice, text, vowel_clusters=config.vowel_clusters
+                config.espeak_voice, text, vowel_clusters=config.vowel_cluster_merger
             )
 
         # Phonemes -> ids
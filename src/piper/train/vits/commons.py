@@ -44,6 +44,12 @@ def rand_gumbel_like(x):
     return g
 
 
+def repeat_to_length(x, length):
+    """Repeat x along its last axis and truncate to length."""
+    num_repeats = (length + x.size(-1) - 1) // x.size(-1)
+    return x.repeat(1, 1, num_repeats)[:, :, :length]
+
+
 def slice_segments(x, ids_str, segment_size=4):
     ret = torch.zeros_like(x[:, :, :segment_size])
     for i in range(x.size(0)):
@@ -1,6 +1,8 @@
 """PyTorch Lightning dataset."""
 
+import contextlib
 import csv
+import functools
 import itertools
 import json
 import logging
@@ -9,7 +11,18 @@ import unicodedata
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 import librosa
 import lightning as L
@@ -22,7 +35,7 @@ from torch.utils.data import DataLoader, Dataset, random_split
 from piper.config import PhonemeType, PiperConfig
 from piper.phoneme_ids import DEFAULT_PHONEME_ID_MAP
 from piper.phoneme_ids import phonemes_to_ids as default_phonemes_to_ids
-from piper.phonemize_espeak import EspeakPhonemizer
+from piper.phonemize_espeak import EspeakPhonemizer, EspeakPhonemizerPool
 
 from .mel_processing import spectrogram_torch
 from .utils import get_cache_id
@@ -30,6 +43,9 @@ from .utils import get_cache_id
 _LOGGER = logging.getLogger(__name__)
 VAD_SAMPLE_RATE = 16000
 
+# Number of CSV rows whose texts are phonemized together (per process)
+PHONEMIZE_BATCH_SIZE = 256
+
 
 @dataclass
 class CachedUtterance:
@@ -73,6 +89,7 @@ class VitsDataModule(L.LightningDataModule):
         dataset_type: Union[str, DatasetType] = DatasetType.TEXT.value,
         phonemes_path: Optional[Union[str, Path]] = None,
         vowel_clusters: Optional[str] = None,
+        phonemizer_processes: int = 0,
     ) -> None:
         super().__init__()
 
@@ -137,6 +154,9 @@ class VitsDataModule(L.LightningDataModule):
         if vowel_clusters:
             self.vowel_clusters = {tuple(vc) for vc in json.loads(vowel_clusters)}
 
+        # Worker processes for espeak-ng (0 = phonemize in this process)
+        self.phonemizer_processes = phonemizer_processes
+
     def prepare_data(self):
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
@@ -219,198 +239,285 @@ class VitsDataModule(L.LightningDataModule):
                 indent=2,
             )
 
-        if self.phoneme_type == PhonemeType.PINYIN:
-            from piper.phonemize_chinese import ChinesePhonemizer
+        # Closes the phonemizer pool (if any), even if preparation fails
+        with contextlib.ExitStack() as exit_stack:
+            # Phonemizes several texts at once (if supported)
+            phonemize_batch: Optional[Callable[[List[str]], List[List[List[str]]]]] = (
+                None
+            )
+            phonemize_batch_size = PHONEMIZE_BATCH_SIZE
 
-            # g2pW -> pinyin -> phonemes
-            phonemizer = ChinesePhonemizer(model_dir=Path.cwd() / "local" / "g2pW")
+            if self.phoneme_type == PhonemeType.PINYIN:
+                from piper.phonemize_chinese import ChinesePhonemizer
 
-            def phonemize(text: str) -> list[list[str]]:
-                return phonemizer.phonemize(text)
+                # g2pW -> pinyin -> phonemes
+                phonemizer = ChinesePhonemizer(model_dir=Path.cwd() / "local" / "g2pW")
 
-        elif self.phoneme_type == PhonemeType.HEBREW:
-            from piper.phonemize_hebrew import HebrewPhonemizer
+                def phonemize(text: str) -> list[list[str]]:
+                    return phonemizer.phonemize(text)
 
-            # Nakdimon (niqqud) -> IPA G2P (default IPA id map)
-            hebrew_phonemizer = HebrewPhonemizer()
+            elif self.phoneme_type == PhonemeType.HEBREW:
+                from piper.phonemize_hebrew import HebrewPhonemizer
 
-            def phonemize(text: str) -> list[list[str]]:
-                return hebrew_phonemizer.phonemize(text)
+                # Nakdimon (niqqud) -> IPA G2P (default IPA id map)
+                hebrew_phonemizer = HebrewPhonemizer()
 
-        elif self.phoneme_type == PhonemeType.JAPANESE:
-            from piper.phonemize_japanese import JapanesePhonemizer
+                def phonemize(text: str) -> list[list[str]]:
+                    return hebrew_phonemizer.phonemize(text)
 
-            # OpenJTalk -> IPA + pitch accent (default IPA id map)
-            japanese_phonemizer = JapanesePhonemizer()
+            elif self.phoneme_type == PhonemeType.JAPANESE:
+                from piper.phonemize_japanese import JapanesePhonemizer
 
-            def phonemize(text: str) -> list[list[str]]:
-                return japanese_phonemizer.phonemize(text)
+                # OpenJTalk -> IPA + pitch accent (default IPA id map)
+                japanese_phonemizer = JapanesePhonemizer()
 
-        elif self.phoneme_type == PhonemeType.TEXT:
-            # text = phonemes
+                def phonemize(text: str) -> list[list[str]]:
+                    return japanese_phonemizer.phonemize(text)
 
-            def phonemize(text: str) -> list[list[str]]:
-                return [list(unicodedata.normalize("NFD", text))]
+            elif self.phoneme_type == PhonemeType.TEXT:
+                # text = phonemes
 
-        else:
-            # espeak-ng
-            phonemizer = EspeakPhonemizer()
+                def phonemize(text: str) -> list[list[str]]:
+                    return [list(unicodedata.normalize("NFD", text))]
 
-            def phonemize(text: str) -> list[list[str]]:
-                return phonemizer.phonemize(
-                    self.espeak_voice, text, vowel_clusters=self.vowel_clusters
-                )
-
-        vad = SileroVoiceActivityDetector()
+            else:
+                # espeak-ng
+                phonemizer: Union[EspeakPhonemizer, EspeakPhonemizerPool]
+                if self.phonemizer_processes > 0:
+                    phonemizer = exit_stack.enter_context(
+                        EspeakPhonemizerPool(self.phonemizer_processes)
+                    )
+                    phonemize_batch_size *= self.phonemizer_processes
+                else:
+                    phonemizer = EspeakPhonemizer()
 
-        num_utterances = 0
-        report_prepare: Optional[bool] = None
-        with open(self.csv_path, "r", encoding="utf-8") as csv_file:
-            reader = csv.reader(csv_file, delimiter="|")
-            for row_number, row in enumerate(reader, start=1):
-                utt_id = row[0]
-                speaker_id: Optional[int] = None
-                if self.is_multispeaker:
-                    assert (
-                        len(row) >= 3
-                    ), "Expected CSV columns for multi-speaker metadata: wav|speaker|text"
-                    speaker_name = row[1]
-                    speaker_id = speaker_id_map[speaker_name]
+                # Compiled once for all utterances
+                vowel_cluster_merger = self.piper_config.vowel_cluster_merger
 
-                audio_path = self.audio_dir / utt_id
-                if not audio_path.exists():
-                    audio_path = self.audio_dir / f"{utt_id}.wav"
+                def phonemize(text: str) -> list[list[str]]:
+                    return phonemizer.phonemize(
+                        self.espeak_voice, text, vowel_clusters=vowel_cluster_merger
+                    )
 
-                if not audio_path.exists():
-                    _LOGGER.warning("Missing audio file: %s", audio_path)
-                    continue
+                phonemize_batch = functools.partial(
+                    phonemizer.phonemize_batch,
+                    self.espeak_voice,
+                    vowel_clusters=vowel_cluster_merger,
+                )
 
-                if self.dataset_type == DatasetType.PHONEME_IDS:
-                    # utt_id|text|phoneme_ids
-                    # or
-                    # utt_id|speaker_id|text|phoneme_ids
-                    text = row[-2]
-                else:
-                    # utt_id|text
-                    # or
-                    # utt_id|speaker_id|text
-                    text = row[-1]
+            vad = SileroVoiceActivityDetector()
 
-                cache_id = get_cache_id(row_number, text, speaker_id=speaker_id)
+            num_utterances = 0
+            report_prepare: Optional[bool] = None
+            with open(self.csv_path, "r", encoding="utf-8") as csv_file:
+                reader = csv.reader(csv_file, delimiter="|")
+                for row_number, row, batch_phonemes in self._phonemize_rows(
+                    enumerate(reader, start=1),
+                    speaker_id_map,
+                    phonemize_batch,
+                    phonemize_batch_size,
+                ):
+                    utt_id = row[0]
+                    speaker_id: Optional[int] = None
+                    if self.is_multispeaker:
+                        assert (
+                            len(row) >= 3
+                        ), "Expected CSV columns for multi-speaker metadata: wav|speaker|text"
+                        speaker_name = row[1]
+                        speaker_id = speaker_id_map[speaker_name]
+
+                    audio_path = self.audio_dir / utt_id
+                    if not audio_path.exists():
+                        audio_path = self.audio_dir / f"{utt_id}.wav"
+
+                    if not audio_path.exists():
+                        _LOGGER.warning("Missing audio file: %s", audio_path)
+                        continue
 
-                # text
-                text_path = self.cache_dir / f"{cache_id}.txt"
-                if not text_path.exists():
-                    text_path.write_text(text, encoding="utf-8")
+                    if self.dataset_type == DatasetType.PHONEME_IDS:
+                        # utt_id|text|phoneme_ids
+                        # or
+                        # utt_id|speaker_id|text|phoneme_ids
+                        text = row[-2]
+                    else:
+                        # utt_id|text
+                        # or
+                        # utt_id|speaker_id|text
+                        text = row[-1]
+
+                    cache_id = get_cache_id(row_number, text, speaker_id=speaker_id)
+
+                    # text
+                    text_path = self.cache_dir / f"{cache_id}.txt"
+                    if not text_path.exists():
+                        text_path.write_text(text, encoding="utf-8")
+
+                    if self.dataset_type == DatasetType.PHONEME_IDS:
+                        phoneme_ids_str = row[-1]
+
+                        # ids separated by whitespace
+                        phoneme_ids = [int(p_id) for p_id in phoneme_ids_str.split()]
+                        max_phoneme_id = max(phoneme_ids)
+                        assert (
+                            self.num_symbols > max_phoneme_id
+                        ), f"Number of symbols ({self.num_symbols}) must be greater than max phoneme id ({max_phoneme_id})"
+
+                        # phoneme ids
+                        phoneme_ids_path = self.cache_dir / f"{cache_id}.phonemes.pt"
+                        if not phoneme_ids_path.exists():
+                            torch.save(torch.LongTensor(phoneme_ids), phoneme_ids_path)
+                            if report_prepare is None:
+                                report_prepare = True
+                    else:
+                        # phonemes
+                        phonemes: Optional[List[List[str]]] = None
+                        phonemes_path = self.cache_dir / f"{cache_id}.phonemes.txt"
+                        if not phonemes_path.exists():
+                            phonemes = (
+                                batch_phonemes
+                                if batch_phonemes is not None
+                                else phonemize(text)
+                            )
+                            with open(
+                                phonemes_path, "w", encoding="utf-8"
+                            ) as phonemes_file:
+                                for sentence_phonemes in phonemes:
+                                    print(
+                                        "".join(sentence_phonemes), file=phonemes_file
+                                    )
 
-                if self.dataset_type == DatasetType.PHONEME_IDS:
-                    phoneme_ids_str = row[-1]
+                            if report_prepare is None:
+                                report_prepare = True
+
+                        # phoneme ids
+                        phoneme_ids_path = self.cache_dir / f"{cache_id}.phonemes.pt"
+                        if not phoneme_ids_path.exists():
+                            if phonemes is None:
+                                phonemes = (
+                                    batch_phonemes
+                                    if batch_phonemes is not None
+                                    else phonemize(text)
+                                )
 
-                    # ids separated by whitespace
-                    phoneme_ids = [int(p_id) for p_id in phoneme_ids_str.split()]
-                    max_phoneme_id = max(phoneme_ids)
-                    assert (
-                        self.num_symbols > max_phoneme_id
-                    ), f"Number of symbols ({self.num_symbols}) must be greater than max phoneme id ({max_phoneme_id})"
+                            phoneme_ids = list(
+                                itertools.chain(
+                                    *(
+                                        phonemes_to_ids(
+                                            sentence_phonemes, id_map=phoneme_id_map
+                                        )
+                                        for sentence_phonemes in phonemes
+                                    )
+                                )
+                            )
+                            torch.save(torch.LongTensor(phoneme_ids), phoneme_ids_path)
+                            if report_prepare is None:
+                                report_prepare = True
+
+                    # normalized audio
+                    norm_audio_path = self.cache_dir / f"{cache_id}.audio.pt"
+                    audio_norm_tensor: Optional[torch.Tensor] = None
+                    if not norm_audio_path.exists():
+                        audio_norm_array, audio_sample_rate = librosa.load(
+                            path=audio_path, sr=self.sample_rate, mono=True
+                        )
+                        if self.trim_silence:
+                            if audio_sample_rate != VAD_SAMPLE_RATE:
+                                # VAD needs 16Khz
+                                audio_16khz_array, _sr = librosa.load(
+                                    path=audio_path, sr=VAD_SAMPLE_RATE, mono=True
+                                )
+                            else:
+                                audio_16khz_array = audio_norm_array
 
-                    # phoneme ids
-                    phoneme_ids_path = self.cache_dir / f"{cache_id}.phonemes.pt"
-                    if not phoneme_ids_path.exists():
-                        torch.save(torch.LongTensor(phoneme_ids), phoneme_ids_path)
-                        if report_prepare is None:
-                            report_prepare = True
-                else:
-                    # phonemes
-                    phonemes: Optional[List[List[str]]] = None
-                    phonemes_path = self.cache_dir / f"{cache_id}.phonemes.txt"
-                    if not phonemes_path.exists():
-                        phonemes = phonemize(text)
-                        with open(
-                            phonemes_path, "w", encoding="utf-8"
-                        ) as phonemes_file:
-                            for sentence_phonemes in phonemes:
-                                print("".join(sentence_phonemes), file=phonemes_file)
+                            audio_norm_array = self._trim_silence(
+                                audio_norm_array, audio_16khz_array, vad
+                            )
 
+                        audio_norm_tensor = torch.FloatTensor(audio_norm_array)
+                        torch.save(
+                            audio_norm_tensor,
+                            norm_audio_path,
+                        )
                         if report_prepare is None:
                             report_prepare = True
 
-                    # phoneme ids
-                    phoneme_ids_path = self.cache_dir / f"{cache_id}.phonemes.pt"
-                    if not phoneme_ids_path.exists():
-                        if phonemes is None:
-                            phonemes = phonemize(text)
-
-                        phoneme_ids = list(
-                            itertools.chain(
-                                *(
-                                    phonemes_to_ids(
-                                        sentence_phonemes, id_map=phoneme_id_map
-                                    )
-                                    for sentence_phonemes in phonemes
-                                )
-                            )
+                    # mel spectrogram
+                    audio_spec_path = self.cache_dir / f"{cache_id}.spec.pt"
+                    if not audio_spec_path.exists():
+                        if audio_norm_tensor is None:
+                            # Load audio from cache
+                            audio_norm_tensor = torch.load(norm_audio_path)
+
+                        assert audio_norm_tensor is not None
+
+                        torch.save(
+                            spectrogram_torch(
+                                y=audio_norm_tensor.unsqueeze(0),
+                                n_fft=self.filter_length,
+                                sampling_rate=self.sample_rate,
+                                hop_size=self.hop_length,
+                                win_size=self.win_length,
+                                center=False,
+                            ).squeeze(0),
+                            audio_spec_path,
                         )
-                        torch.save(torch.LongTensor(phoneme_ids), phoneme_ids_path)
                         if report_prepare is None:
                             report_prepare = True
 
-                # normalized audio
-                norm_audio_path = self.cache_dir / f"{cache_id}.audio.pt"
-                audio_norm_tensor: Optional[torch.Tensor] = None
-                if not norm_audio_path.exists():
-                    audio_norm_array, audio_sample_rate = librosa.load(
-                        path=audio_path, sr=self.sample_rate, mono=True
-                    )
-                    if self.trim_silence:
-                        if audio_sample_rate != VAD_SAMPLE_RATE:
-                            # VAD needs 16Khz
-                            audio_16khz_array, _sr = librosa.load(
-                                path=audio_path, sr=VAD_SAMPLE_RATE, mono=True
-                            )
-                        else:
-                            audio_16khz_array = audio_norm_array
+                    num_utterances += 1
+                    if report_prepare:
+                        _LOGGER.info("Processing utterances...")
+                        report_prepare = False
 
-                        audio_norm_array = self._trim_silence(
-                            audio_norm_array, audio_16khz_array, vad
-                        )
-
-                    audio_norm_tensor = torch.FloatTensor(audio_norm_array)
-                    torch.save(
-                        audio_norm_tensor,
-                        norm_audio_path,
-                    )
-                    if report_prepare is None:
-                        report_prepare = True
+        _LOGGER.info("Processed %s utterance(s)", num_utterances)
 
-                # mel spectrogram
-                audio_spec_path = self.cache_dir / f"{cache_id}.spec.pt"
-                if not audio_spec_path.exists():
-                    if audio_norm_tensor is None:
-                        # Load audio from cache
-                        audio_norm_tensor = torch.load(norm_audio_path)
-
-                    assert audio_norm_tensor is not None
-
-                    torch.save(
-                        spectrogram_torch(
-                            y=audio_norm_tensor.unsqueeze(0),
-                            n_fft=self.filter_length,
-                            sampling_rate=self.sample_rate,
-                            hop_size=self.hop_length,
-                            win_size=self.win_length,
-                            center=False,
-                        ).squeeze(0),
-                        audio_spec_path,
-                    )
-                    if report_prepare is None:
-                        report_prepare = True
+    def _phonemize_rows(
+        self,
+        rows: Iterable[Tuple[int, List[str]]],
+        speaker_id_map: Dict[str, int],
+        phonemize_batch: Optional[Callable[[List[str]], List[List[List[str]]]]],
+        batch_size: int = PHONEMIZE_BATCH_SIZE,
+    ) -> Iterator[Tuple[int, List[str], Optional[List[List[str]]]]]:
+        """Yield (row_number, row, phonemes) for numbered CSV rows.
+
+        Texts of rows without cached phonemes are phonemized in batches of
+        batch_size. Phonemes are None for other rows.
+        """
+        if (phonemize_batch is None) or (self.dataset_type == DatasetType.PHONEME_IDS):
+            for row_number, row in rows:
+                yield row_number, row, None
+
+            return
+
+        rows_iter = iter(rows)
+        while True:
+            row_batch = list(itertools.islice(rows_iter, batch_size))
+            if not row_batch:
+                break
+
+            texts: Dict[int, str] = {}
+            for row_number, row in row_batch:
+                speaker_id: Optional[int] = None
+                if self.is_multispeaker and (len(row) >= 3):
+                    # Invalid rows are reported by prepare_data
+                    speaker_id = speaker_id_map.get(row[1])
 
-                num_utterances += 1
-                if report_prepare:
-                    _LOGGER.info("Processing utterances...")
-                    report_prepare = False
+                text = row[-1]
+                cache_id = get_cache_id(row_number, text, speaker_id=speaker_id)
+                if not (
+                    (self.cache_dir / f"{cache_id}.phonemes.txt").exists()
+                    and (self.cache_dir / f"{cache_id}.phonemes.pt").exists()
+                ):
+                    texts[row_number] = text
+
+            row_phonemes: Dict[int, List[List[str]]] = {}
+            if texts:
+                row_phonemes = dict(
+                    zip(texts.keys(), phonemize_batch(list(texts.values())))
+                )
 
-        _LOGGER.info("Processed %s utterance(s)", num_utterances)
+            for row_number, row in row_batch:
+                yield row_number, row, row_phonemes.get(row_number)
 
     def setup(self, stage: str) -> None:
         assert self.piper_config is not None
@@ -60,7 +60,9 @@ class StochasticDurationPredictor(nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, filter_channels, 1)
 
-    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0):
+    def forward(
+        self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0, noise=None
+    ):
         x = torch.detach(x)
         x = self.pre(x)
         if g is not None:
@@ -108,7 +110,10 @@ class StochasticDurationPredictor(nn.Module):
         else:
             flows = list(reversed(self.flows))
             flows = flows[:-2] + [flows[-1]]  # remove a useless vflow
-            z = torch.randn(x.size(0), 2, x.size(2)).type_as(x) * noise_scale
+            if noise is None:
+                noise = torch.randn(x.size(0), 2, x.size(2)).type_as(x)
+
+            z = noise * noise_scale
 
             for flow in flows:
                 z = flow(z, x_mask, g=x, reverse=reverse)
@@ -780,20 +785,52 @@ class SynthesizerTrn(nn.Module):
         length_scale=1,
         noise_scale_w=0.8,
         max_len=None,
+        noise=None,
+        noise_w=None,
     ):
+        """Synthesize audio from phoneme ids.
+
+        Random noise is sampled unless noise ([b, inter_channels, n]) and noise_w
+        ([b, 2, t]) are given. noise is repeated along its last axis as needed to
+        cover the output frames.
+        """
+        z, attn, y_mask, (z_p, m_p, logs_p) = self.infer_latent(
+            x,
+            x_lengths,
+            sid=sid,
+            noise_scale=noise_scale,
+            length_scale=length_scale,
+            noise_scale_w=noise_scale_w,
+            noise=noise,
+            noise_w=noise_w,
+        )
+        o = self.decode((z * y_mask)[:, :, :max_len], sid=sid)
+
+        return o, attn, y_mask, (z, z_p, m_p, logs_p)
+
+    def infer_latent(
+        self,
+        x,
+        x_lengths,
+        sid=None,
+        noise_scale=0.667,
+        length_scale=1,
+        noise_scale_w=0.8,
+        noise=None,
+        noise_w=None,
+    ):
+        """Phoneme ids to latent frames for the decoder (see infer)."""
         x, m_p, logs_p, x_mask = self.enc_p(x, x_lengths)
-        if self.n_speakers > 1:
-            assert sid is not None, "Missing speaker id"
-            g = self.emb_g(sid).unsqueeze(-1)  # [b, h, 1]
-        else:
-            g = None
+        g = self._speaker_embedding(sid)
 
-        if self.use_sdp:
-            logw = self.dp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w)
-        else:
-            logw = self.dp(x, x_mask, g=g)
-        w = torch.exp(logw) * x_mask * length_scale
-        w_ceil = torch.ceil(w)
+        w_ceil = self._predict_durations(
+            x,
+            x_mask,
+            g=g,
+            length_scale=length_scale,
+            noise_scale_w=noise_scale_w,
+            noise_w=noise_w,
+        )
         y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
         y_mask = torch.unsqueeze(
             commons.sequence_mask(y_lengths, y_lengths.max()), 1
@@ -808,11 +845,70 @@ class SynthesizerTrn(nn.Module):
             1, 2
         )  # [b, t', t], [b, t, d] -> [b, d, t']
 
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        if noise is None:
+            noise = torch.randn_like(m_p)
+        else:
+            noise = commons.repeat_to_length(noise, m_p.size(2))
+
+        z_p = m_p + noise * torch.exp(logs_p) * noise_scale
         z = self.flow(z_p, y_mask, g=g, reverse=True)
-        o = self.dec((z * y_mask)[:, :, :max_len], g=g)
 
-        return o, attn, y_mask, (z, z_p, m_p, logs_p)
+        return z, attn, y_mask, (z_p, m_p, logs_p)
+
+    def infer_durations(
+        self,
+        x,
+        x_lengths,
+        sid=None,
+        length_scale=1,
+        noise_scale_w=0.8,
+        noise_w=None,
+    ):
+        """Phoneme ids to the number of latent frames for each id ([b, 1, t]).
+
+        Stops after the duration predictor, so it is much cheaper than infer.
+        Multiply by the hop length to get audio samples.
+        """
+        x, _m_p, _logs_p, x_mask = self.enc_p(x, x_lengths)
+        g = self._speaker_embedding(sid)
+
+        return self._predict_durations(
+            x,
+            x_mask,
+            g=g,
+            length_scale=length_scale,
+            noise_scale_w=noise_scale_w,
+            noise_w=noise_w,
+        )
+
+    def _predict_durations(
+        self, x, x_mask, g=None, length_scale=1, noise_scale_w=0.8, noise_w=None
+    ):
+        if self.use_sdp:
+            logw = self.dp(
+                x,
+                x_mask,
+                g=g,
+                reverse=True,
+                noise_scale=noise_scale_w,
+                noise=noise_w,
+            )
+        else:
+            logw = self.dp(x, x_mask, g=g)
+        w = torch.exp(logw) * x_mask * length_scale
+
+        return torch.ceil(w)
+
+    def decode(self, z, sid=None):
+        """Latent frames ([b, inter_channels, t']) to audio."""
+        return self.dec(z, g=self._speaker_embedding(sid))
+
+    def _speaker_embedding(self, sid):
+        if self.n_speakers <= 1:
+            return None
+
+        assert sid is not None, "Missing speaker id"
+        return self.emb_g(sid).unsqueeze(-1)  # [b, h, 1]
 
     def voice_conversion(self, y, y_lengths, sid_src, sid_tgt):
         assert self.n_speakers > 1, "n_speakers have to be larger than 1."
@@ -1,45 +1,112 @@
 """Phonemization and synthesis for Piper."""
 
+import asyncio
 import itertools
 import json
 import logging
+import os
+import platform
+import queue
 import re
 import threading
+import time
 import unicodedata
 import wave
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Any, Iterable, Optional, Sequence, Tuple, Union
+from types import ModuleType
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 import onnxruntime
 
-from .config import PhonemeType, PiperConfig, SynthesisConfig
-from .const import BOS, EOS, PAD
-from .phoneme_ids import phonemes_to_ids
-from .phonemize_espeak import ESPEAK_DATA_DIR, EspeakPhonemizer
+from .alignment import PhonemeAligner, PhonemeAlignment, PhonemeAlignments
+from .audio_cache import AudioCache
+from .config import PhonemeType, PiperConfig, SessionConfig, SynthesisConfig
+from .model_cache import get_model_key, get_shared_weights_model
+from .phoneme_cache import PhonemeCache
+from .phonemize_espeak import ESPEAK_DATA_DIR, EspeakPhonemizer, EspeakPhonemizerPool
+from .session_binding import SessionBinding
+from .session_pool import SessionPool
 from .tashkeel import TashkeelDiacritizer
 
 _ESPEAK_PHONEMIZER: Optional[EspeakPhonemizer] = None
 _ESPEAK_PHONEMIZER_LOCK = threading.Lock()
+_ASYNC_EXECUTOR_LOCK = threading.Lock()
+_SESSION_BINDINGS_LOCK = threading.Lock()
 
 _DEFAULT_SYNTHESIS_CONFIG = SynthesisConfig()
+_DEFAULT_SESSION_CONFIG = SessionConfig()
 _MAX_WAV_VALUE = 32767.0
 _PHONEME_BLOCK_PATTERN = re.compile(r"(\[\[.*?\]\])")
 
+# Number of batches worth of sentences that are grouped by length at a time
+_BATCH_WINDOW = 4
+
+# Frames at the end of a sentence whose audio can change when it's padded in a
+# batch. These are left out of the peak for normalize_audio, so the rest of the
+# audio is the same with or without batching.
+_PADDING_EDGE_FRAMES = 8
+
+_EXECUTION_MODES = {
+    "sequential": onnxruntime.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": onnxruntime.ExecutionMode.ORT_PARALLEL,
+}
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+# Lengths of the dummy phoneme id sequences used by warmup
+_WARMUP_LENGTHS = (16, 64, 256)
+
+# Phonemes that end a clause within a sentence (followed by a space)
+_CLAUSE_TERMINATORS = {",", ":", ";"}
+
+# Seconds between checks for a stopped synthesis in the phonemizer thread
+_PHONEMIZE_AHEAD_POLL = 0.1
+
+# Latent frames decoded per chunk in synthesize_streaming (hop_length samples each)
+_STREAMING_CHUNK_FRAMES = 64
+
+# Extra latent frames decoded on each side of a chunk. This covers the receptive
+# field of the decoder, so windows line up with audio from a full decode.
+_STREAMING_CONTEXT_FRAMES = 16
+
+# Latent frames crossfaded between consecutive chunks
+_STREAMING_CROSSFADE_FRAMES = 2
+
+# Generator noise frames per phoneme id for voice models with noise inputs.
+# Noise is repeated by the model if a sentence needs more.
+_NOISE_FRAMES_PER_PHONEME_ID = 8
+
 _LOGGER = logging.getLogger(__name__)
 
+# Phoneme ids as a list or int64 array
+_PhonemeIds = Union[Sequence[int], np.ndarray]
 
-@dataclass
-class PhonemeAlignment:
-    phoneme: str
-    phoneme_ids: Sequence[int]
-    num_samples: int
+# Audio or (audio, phoneme_id_samples) from the voice model
+_AudioResult = Union[np.ndarray, Tuple[np.ndarray, Optional[np.ndarray]]]
 
 
 @dataclass
-class AudioChunk:
-    """Chunk of raw audio."""
+class _AudioChunkFields:
+    """Fields of AudioChunk (see there for how they are stored)."""
 
     sample_rate: int
     """Rate of chunk samples in Hertz."""
@@ -50,29 +117,128 @@ class AudioChunk:
     sample_channels: int
     """Number of channels in chunk samples."""
 
-    audio_float_array: np.ndarray
+    audio_float_array: Optional[np.ndarray] = None
     """Audio data as float numpy array in [-1, 1]."""
 
-    phonemes: list[str]
+    phonemes: Sequence[str] = ()
     """Phonemes that produced this audio chunk."""
 
-    phoneme_ids: list[int]
+    phoneme_ids: _PhonemeIds = ()
     """Phoneme ids that produced this audio chunk."""
 
     phoneme_id_samples: Optional[np.ndarray] = None
     """Number of audio samples for each phoneme id (alignments).
 
-    Only available for supported voice models.
+    Only available for voice models with alignments.
+    """
+
+    phoneme_alignments: Optional[Sequence[PhonemeAlignment]] = None
+    """Alignments between phonemes and audio samples.
+
+    From synthesize, a PhonemeAlignments with the sample counts in arrays.
     """
 
-    phoneme_alignments: Optional[list[PhonemeAlignment]] = None
-    """Alignments between phonemes and audio samples."""
+    audio_int16_array: Optional[np.ndarray] = field(
+        default=None, repr=False, compare=False
+    )
+    """Audio data as int16 numpy array (instead of or in addition to audio_float_array)."""
+
+    def __post_init__(self) -> None:
+        """Check fields after __init__ (see AudioChunk)."""
+
+
+class AudioChunk(_AudioChunkFields):
+    """Chunk of raw audio.
+
+    Audio is held as float samples, int16 samples, or both (see
+    drop_float_audio). Phonemes and phoneme ids are held in numpy arrays, and
+    the list properties create lists when accessed.
+
+    This is a dataclass, but its fields are properties over these arrays.
+    """
 
-    # ---
+    _audio_float_array: Optional[np.ndarray]
+    _audio_int16_array: Optional[np.ndarray]
+    _phonemes: np.ndarray
+    _phoneme_ids: np.ndarray
 
-    _audio_int16_array: Optional[np.ndarray] = None
-    _audio_int16_bytes: Optional[bytes] = None
-    _phoneme_alignments: Optional[list[PhonemeAlignment]] = None
+    def __post_init__(self) -> None:
+        if (self._audio_float_array is None) and (self._audio_int16_array is None):
+            raise ValueError("Audio chunk needs float or int16 audio")
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+
+        for chunk_field in fields(self):
+            if not chunk_field.compare:
+                continue
+
+            value = getattr(self, chunk_field.name)
+            other_value = getattr(other, chunk_field.name)
+            if isinstance(value, np.ndarray) or isinstance(other_value, np.ndarray):
+                # Arrays are equal if their values are
+                if not np.array_equal(value, other_value):
+                    return False
+            elif value != other_value:
+                return False
+
+        return True
+
+    @property
+    def num_samples(self) -> int:
+        """Number of audio samples."""
+        if self._audio_int16_array is not None:
+            return len(self._audio_int16_array)
+
+        assert self._audio_float_array is not None
+        return len(self._audio_float_array)
+
+    @property
+    def audio_float_array(self) -> np.ndarray:
+        """Audio data as float numpy array in [-1, 1].
+
+        Recomputed from the int16 samples on each access if the float samples
+        were dropped.
+        """
+        if self._audio_float_array is None:
+            assert self._audio_int16_array is not None
+            return self._audio_int16_array / np.float32(_MAX_WAV_VALUE)
+
+        return self._audio_float_array
+
+    @audio_float_array.setter
+    def audio_float_array(self, audio: Optional[np.ndarray]) -> None:
+        self._audio_float_array = audio
+        self._audio_int16_array = None
+
+    @property  # type: ignore[override]
+    def phonemes(self) -> list[str]:
+        """Phonemes that produced this audio chunk."""
+        return self._phonemes.tolist()
+
+    @phonemes.setter
+    def phonemes(self, phonemes: Sequence[str]) -> None:
+        self._phonemes = np.array(phonemes, dtype=np.str_)
+
+    @property
+    def phoneme_ids(self) -> list[int]:
+        """Phoneme ids that produced this audio chunk."""
+        return self._phoneme_ids.tolist()
+
+    @phoneme_ids.setter
+    def phoneme_ids(self, phoneme_ids: _PhonemeIds) -> None:
+        self._phoneme_ids = np.asarray(phoneme_ids, dtype=np.int64)
+
+    @property
+    def phoneme_ids_array(self) -> np.ndarray:
+        """Phoneme ids that produced this audio chunk as an int64 array."""
+        return self._phoneme_ids
+
+    def drop_float_audio(self) -> None:
+        """Convert audio to int16 samples and free the float samples."""
+        self._audio_int16_array = self.audio_int16_array
+        self._audio_float_array = None
 
     @property
     def audio_int16_array(self) -> np.ndarray:
@@ -82,21 +248,39 @@ class AudioChunk:
         :return: Audio data as int16 numpy array.
         """
         if self._audio_int16_array is None:
-            self._audio_int16_array = np.clip(
-                self.audio_float_array * _MAX_WAV_VALUE, -_MAX_WAV_VALUE, _MAX_WAV_VALUE
-            ).astype(np.int16)
+            assert self._audio_float_array is not None
+            self._audio_int16_array = _float_to_int16(self._audio_float_array)
 
         return self._audio_int16_array
 
+    @audio_int16_array.setter
+    def audio_int16_array(self, audio: Optional[np.ndarray]) -> None:
+        # Set after audio_float_array in __init__
+        self._audio_int16_array = audio
+
     @property
     def audio_int16_bytes(self) -> bytes:
         """
         Get audio as 16-bit PCM bytes.
 
+        Use audio_int16_memoryview to avoid copying the samples.
+
         :return: Audio data as signed 16-bit sample bytes.
         """
         return self.audio_int16_array.tobytes()
 
+    @property
+    def audio_int16_memoryview(self) -> memoryview:
+        """
+        Get audio as 16-bit PCM bytes without copying them.
+
+        Can be passed to anything that accepts bytes-like objects, such as
+        wave.Wave_write.writeframes or a socket.
+
+        :return: Read-only memoryview of signed 16-bit sample bytes.
+        """
+        return self.audio_int16_array.data.cast("B").toreadonly()
+
 
 @dataclass
 class PiperVoice:
@@ -119,6 +303,61 @@ class PiperVoice:
     tashkeel_diacritizier: Optional[TashkeelDiacritizer] = None
     taskeen_threshold: Optional[float] = 0.8
 
+    audio_cache: Optional[AudioCache] = None
+    """Cache of voice model audio for repeated sentences (disabled if None)."""
+
+    session_pool: Optional[SessionPool] = None
+    """Sessions for running the voice model concurrently (see SessionConfig).
+
+    If set, session is the first session of the pool.
+    """
+
+    encoder_session: Optional[onnxruntime.InferenceSession] = None
+    """ONNX session for the encoder of a streaming voice (see load)."""
+
+    decoder_session: Optional[onnxruntime.InferenceSession] = None
+    """ONNX session for the decoder of a streaming voice (see load)."""
+
+    durations_session: Optional[onnxruntime.InferenceSession] = None
+    """ONNX session for the duration predictor of a voice (see load)."""
+
+    max_async_workers: int = 0
+    """Number of threads running synthesize_async for this voice (0 = one per session).
+
+    Requests beyond this wait for a free thread.
+    """
+
+    io_binding: bool = False
+    """Run the voice model with I/O binding, reusing input buffers between runs.
+
+    See SessionConfig.use_io_binding.
+    """
+
+    espeak_phonemizer_pool: Optional[EspeakPhonemizerPool] = None
+    """Worker processes for espeak-ng phonemization (may be shared by voices).
+
+    If None, one espeak-ng phonemizer in this process is shared by all voices,
+    so only one text is phonemized at a time.
+    """
+
+    phoneme_cache: Optional[PhonemeCache] = None
+    """Cache of espeak-ng phonemes for repeated texts (disabled if None).
+
+    May be shared by voices, since entries are keyed on the espeak-ng voice.
+    """
+
+    _phoneme_aligner: Optional[PhonemeAligner] = field(
+        default=None, init=False, repr=False
+    )
+    _async_executor: Optional[ThreadPoolExecutor] = field(
+        default=None, init=False, repr=False
+    )
+    # Idle I/O bindings by session id (one is created per concurrent run)
+    _session_bindings: dict[int, list[SessionBinding]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _warned_no_batching: bool = field(default=False, init=False, repr=False)
+
     @staticmethod
     def load(
         model_path: Union[str, Path],
@@ -127,6 +366,10 @@ class PiperVoice:
         espeak_data_dir: Union[str, Path] = ESPEAK_DATA_DIR,
         download_dir: Optional[Union[str, Path]] = None,
         include_alignments: bool = False,
+        streaming: bool = False,
+        session_config: Optional[SessionConfig] = None,
+        warmup: bool = False,
+        durations: bool = False,
     ) -> "PiperVoice":
         """
         Load an ONNX model and config.
@@ -139,6 +382,15 @@ class PiperVoice:
         :param include_alignments: If True, patch the model in memory (requires the
             onnx package) so phoneme/audio alignments are available even if the model
             file has not been patched with piper.patch_voice_with_alignment.
+        :param streaming: If True, also load the encoder and decoder models from
+            piper.train.export_onnx --streaming (model_path with .encoder.onnx and
+            .decoder.onnx suffixes) for synthesize_streaming.
+        :param session_config: Threading and memory settings for onnxruntime.
+        :param warmup: If True, run the voice model on dummy input before returning
+            so the first real synthesis is not slowed down (see warmup).
+        :param durations: If True, also load the duration model from
+            piper.train.export_onnx --durations (model_path with .durations.onnx
+            suffix) for predict_durations.
         :return: Voice object.
         """
         if config_path is None:
@@ -163,11 +415,41 @@ class PiperVoice:
         if download_dir is None:
             download_dir = Path.cwd()
 
+        if session_config is None:
+            session_config = _DEFAULT_SESSION_CONFIG
+
+        # Model with memory-mapped weights, shared between processes
+        shared_model_path: Optional[Path] = None
+        if session_config.shared_weights_dir is not None:
+            shared_model_path = get_shared_weights_model(
+                model_path, session_config.shared_weights_dir, include_alignments
+            )
+
+        # Optimized (and patched for alignments) model from a previous load.
+        # Not used with shared weights, since optimized models embed them.
+        optimized_model_path: Optional[Path] = None
+        if (session_config.optimized_model_dir is not None) and (
+            shared_model_path is None
+        ):
+            optimized_model_path = _get_optimized_model_path(
+                model_path, session_config, use_cuda, include_alignments
+            )
+
+        is_optimized = (optimized_model_path is not None) and (
+            optimized_model_path.exists()
+        )
+
         # By default, load the model directly from its path. To expose alignments
         # without writing a patched model to disk, load and patch the model in
         # memory and hand the serialized bytes to onnxruntime.
         model_or_path: Union[str, bytes] = str(model_path)
-        if include_alignments:
+        if shared_model_path is not None:
+            model_or_path = str(shared_model_path)
+            _LOGGER.debug("Loading model with shared weights: %s", shared_model_path)
+        elif is_optimized:
+            model_or_path = str(optimized_model_path)
+            _LOGGER.debug("Loading optimized model: %s", optimized_model_path)
+        elif include_alignments:
             try:
                 import onnx
 
@@ -184,21 +466,187 @@ class PiperVoice:
                     "The onnx package is required for include_alignments. "
                     "Install it with: pip install piper-tts[alignment]"
                 )
+
+                # Don't cache the unpatched model
+                optimized_model_path = None
             except ValueError as error:
                 # Tensor not found or model already patched: use it as-is.
                 _LOGGER.debug("Not patching model for alignments: %s", error)
 
-        return PiperVoice(
-            config=PiperConfig.from_dict(config_dict),
-            session=onnxruntime.InferenceSession(
-                model_or_path,
-                sess_options=onnxruntime.SessionOptions(),
+        num_sessions = max(1, session_config.num_sessions)
+        sessions: list[onnxruntime.InferenceSession] = []
+        for session_idx in range(num_sessions):
+            sess_options = _make_session_options(
+                session_config, num_sessions=num_sessions
+            )
+            temp_model_path: Optional[Path] = None
+            if shared_model_path is not None:
+                # Prepacked weights would be private copies
+                sess_options.add_session_config_entry("session.disable_prepacking", "1")
+            elif is_optimized:
+                sess_options.graph_optimization_level = (
+                    onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+                )
+            elif (optimized_model_path is not None) and (session_idx == 0):
+                # Save optimized model for the next load
+                optimized_model_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_model_path = optimized_model_path.with_suffix(
+                    f".{os.getpid()}.tmp"
+                )
+                sess_options.optimized_model_filepath = str(temp_model_path)
+
+            sessions.append(
+                onnxruntime.InferenceSession(
+                    model_or_path, sess_options=sess_options, providers=providers
+                )
+            )
+
+            if (temp_model_path is not None) and (optimized_model_path is not None):
+                # Rename so other processes never load a partially written model
+                try:
+                    os.replace(temp_model_path, optimized_model_path)
+                    _LOGGER.debug("Saved optimized model: %s", optimized_model_path)
+                except OSError:
+                    _LOGGER.exception(
+                        "Failed to save optimized model: %s", optimized_model_path
+                    )
+
+        streaming_sessions: dict[str, onnxruntime.InferenceSession] = {}
+        if streaming:
+            for part in ("encoder", "decoder"):
+                part_path = Path(model_path).with_suffix(f".{part}.onnx")
+                if not part_path.exists():
+                    raise FileNotFoundError(
+                        f"Missing {part} model for streaming: {part_path}"
+                    )
+
+                streaming_sessions[part] = onnxruntime.InferenceSession(
+                    str(part_path),
+                    sess_options=_make_session_options(session_config),
+                    providers=providers,
+                )
+
+        durations_session: Optional[onnxruntime.InferenceSession] = None
+        if durations:
+            durations_path = Path(model_path).with_suffix(".durations.onnx")
+            if not durations_path.exists():
+                raise FileNotFoundError(f"Missing durations model: {durations_path}")
+
+            durations_session = onnxruntime.InferenceSession(
+                str(durations_path),
+                sess_options=_make_session_options(session_config),
                 providers=providers,
-            ),
+            )
+
+        config = PiperConfig.from_dict(config_dict)
+
+        # Compile the phoneme id map and vowel clusters now instead of on the
+        # first synthesis
+        _ = config.phoneme_id_encoder
+        _ = config.vowel_cluster_merger
+
+        voice = PiperVoice(
+            config=config,
+            session=sessions[0],
+            session_pool=SessionPool(sessions) if (num_sessions > 1) else None,
             espeak_data_dir=Path(espeak_data_dir),
             download_dir=Path(download_dir),
+            encoder_session=streaming_sessions.get("encoder"),
+            decoder_session=streaming_sessions.get("decoder"),
+            durations_session=durations_session,
+            io_binding=session_config.use_io_binding,
         )
 
+        if warmup:
+            warmup_seconds = voice.warmup()
+            _LOGGER.info("Warmed up voice in %0.2f second(s)", warmup_seconds)
+
+        return voice
+
+    def warmup(
+        self, lengths: Sequence[int] = _WARMUP_LENGTHS, all_speakers: bool = False
+    ) -> float:
+        """
+        Run every session of the voice on dummy phoneme ids.
+
+        The first runs of a session are slow because of memory allocation and
+        other lazy initialization in onnxruntime. Each session (including the
+        streaming and duration sessions) is run once per length with the
+        default speaker. The audio cache is not used.
+
+        :param lengths: Lengths of the dummy phoneme id sequences.
+        :param all_speakers: Also run every other speaker once at the shortest length.
+        :return: Seconds spent warming up.
+        """
+        start_time = time.monotonic()
+
+        # Cycle through all phoneme ids in the voice
+        all_phoneme_ids = sorted(
+            {
+                phoneme_id
+                for phoneme_ids in self.config.phoneme_id_map.values()
+                for phoneme_id in phoneme_ids
+            }
+        ) or [0]
+
+        # (length, speaker id)
+        runs: list[Tuple[int, Optional[int]]] = [
+            (length, None) for length in sorted(lengths)
+        ]
+        if all_speakers and (self.config.num_speakers > 1):
+            runs.extend(
+                (min(lengths), speaker_id)
+                for speaker_id in range(self.config.num_speakers)
+                if speaker_id != self.config.default_speaker_id
+            )
+
+        sessions = (
+            self.session_pool.sessions
+            if self.session_pool is not None
+            else [self.session]
+        )
+        for length, speaker_id in runs:
+            phoneme_ids_array = np.array(
+                [list(itertools.islice(itertools.cycle(all_phoneme_ids), length))],
+                dtype=np.int64,
+            )
+            phoneme_ids_lengths = np.array([length], dtype=np.int64)
+            syn_config = SynthesisConfig(speaker_id=speaker_id)
+            for session in sessions:
+                self._run_session(session, [phoneme_ids_array[0]], syn_config)
+
+            if self.durations_session is not None:
+                self.durations_session.run(
+                    None,
+                    self._get_model_args(
+                        phoneme_ids_array,
+                        phoneme_ids_lengths,
+                        syn_config,
+                        session=self.durations_session,
+                    ),
+                )
+
+            if (self.encoder_session is not None) and (
+                self.decoder_session is not None
+            ):
+                z = self.encoder_session.run(
+                    None,
+                    self._get_model_args(
+                        phoneme_ids_array,
+                        phoneme_ids_lengths,
+                        syn_config,
+                        session=self.encoder_session,
+                    ),
+                )[0]
+                for _audio in self._decode_streaming(
+                    z,
+                    self._get_synthesis_settings(syn_config)[0],
+                    _STREAMING_CHUNK_FRAMES,
+                ):
+                    pass
+
+        return time.monotonic() - start_time
+
     def phonemize(self, text: str) -> list[list[str]]:
         """
         Text to phonemes grouped by sentence.
@@ -279,22 +727,30 @@ class PiperVoice:
                     text_part, taskeen_threshold=self.taskeen_threshold
                 )
 
-            with _ESPEAK_PHONEMIZER_LOCK:
-                if _ESPEAK_PHONEMIZER is None:
-                    _ESPEAK_PHONEMIZER = EspeakPhonemizer(self.espeak_data_dir)
-
-                text_part_phonemes = _ESPEAK_PHONEMIZER.phonemize(
-                    self.config.espeak_voice,
-                    text_part,
-                    vowel_clusters=self.config.vowel_clusters,
-                )
+            espeak_phonemizer: Union[EspeakPhonemizer, EspeakPhonemizerPool]
+            if self.espeak_phonemizer_pool is not None:
+                espeak_phonemizer = self.espeak_phonemizer_pool
+            else:
+                with _ESPEAK_PHONEMIZER_LOCK:
+                    if _ESPEAK_PHONEMIZER is None:
+                        _ESPEAK_PHONEMIZER = EspeakPhonemizer(self.espeak_data_dir)
+
+                espeak_phonemizer = _ESPEAK_PHONEMIZER
+
+            # Thread-safe: only the espeak-ng calls are serialized (per process)
+            text_part_phonemes = espeak_phonemizer.phonemize(
+                self.config.espeak_voice,
+                text_part,
+                vowel_clusters=self.config.vowel_cluster_merger,
+                cache=self.phoneme_cache,
+            )
 
-                if prev_raw_phonemes and text_part_phonemes:
-                    # Add to previous block of phonemes first if it came from [[ raw phonemes]]
-                    phonemes[-1].extend(text_part_phonemes[0])
-                    text_part_phonemes = text_part_phonemes[1:]
+            if prev_raw_phonemes and text_part_phonemes:
+                # Add to previous block of phonemes first if it came from [[ raw phonemes]]
+                phonemes[-1].extend(text_part_phonemes[0])
+                text_part_phonemes = text_part_phonemes[1:]
 
-                phonemes.extend(text_part_phonemes)
+            phonemes.extend(text_part_phonemes)
 
             prev_raw_phonemes = False
 
@@ -311,13 +767,7 @@ class PiperVoice:
         :param phonemes: List of phonemes.
         :return: List of phoneme ids.
         """
-
-        if self.config.phoneme_type == PhonemeType.PINYIN:
-            from .phonemize_chinese import phonemes_to_ids as chinese_phonemes_to_ids
-
-            return chinese_phonemes_to_ids(phonemes, self.config.phoneme_id_map)
-
-        return phonemes_to_ids(phonemes, self.config.phoneme_id_map)
+        return self.config.phoneme_id_encoder.encode(phonemes).tolist()
 
     def synthesize(
         self,
@@ -335,19 +785,11 @@ class PiperVoice:
         if syn_config is None:
             syn_config = _DEFAULT_SYNTHESIS_CONFIG
 
-        sentence_phonemes = self.phonemize(text)
-        _LOGGER.debug("text=%s, phonemes=%s", text, sentence_phonemes)
-
-        for phonemes in sentence_phonemes:
-            if not phonemes:
-                continue
-
-            phoneme_ids = self.phonemes_to_ids(phonemes)
-
+        sentences = self._get_sentences(text, syn_config)
+        for phonemes, phoneme_ids, audio_result in self._sentences_to_audio(
+            sentences, syn_config, include_alignments
+        ):
             phoneme_id_samples: Optional[np.ndarray] = None
-            audio_result = self.phoneme_ids_to_audio(
-                phoneme_ids, syn_config, include_alignments=include_alignments
-            )
             if isinstance(audio_result, tuple):
                 # Audio + alignments
                 audio, phoneme_id_samples = audio_result
@@ -355,71 +797,24 @@ class PiperVoice:
                 # Audio only
                 audio = audio_result
 
-            if syn_config.normalize_audio:
-                max_val = np.max(np.abs(audio))
-                if max_val < 1e-8:
-                    # Prevent division by zero
-                    audio = np.zeros_like(audio)
-                else:
-                    audio = audio / max_val
-
-            if syn_config.volume != 1.0:
-                audio = audio * syn_config.volume
-
-            audio = np.clip(audio, -1.0, 1.0).astype(np.float32)
+            audio = _postprocess_audio(
+                audio,
+                syn_config.normalize_audio,
+                syn_config.volume,
+                edge_samples=_PADDING_EDGE_FRAMES * self.config.hop_length,
+            )
 
-            phoneme_alignments: Optional[list[PhonemeAlignment]] = None
+            phoneme_alignments: Optional[PhonemeAlignments] = None
             if (phoneme_id_samples is not None) and (
                 len(phoneme_id_samples) == len(phoneme_ids)
             ):
-                # Create phoneme/audio alignments by determining the phoneme ids
-                # produced by each phoneme (including the next PAD), and then
-                # summing the audio sample counts for those phoneme ids.
-                pad_ids = self.config.phoneme_id_map.get(PAD, [])
-                phoneme_id_idx = 0
-                phoneme_alignments = []
-                alignment_failed = False
-                for phoneme in itertools.chain([BOS], phonemes, [EOS]):
-                    expected_ids = self.config.phoneme_id_map.get(phoneme, [])
-
-                    ids_to_check: Sequence[int]
-                    if phoneme != EOS:
-                        ids_to_check = list(itertools.chain(expected_ids, pad_ids))
-                    else:
-                        ids_to_check = expected_ids
-
-                    start_phoneme_id_idx = phoneme_id_idx
-                    for phoneme_id in ids_to_check:
-                        if phoneme_id_idx >= len(phoneme_ids):
-                            # Ran out of phoneme ids
-                            alignment_failed = True
-                            break
-
-                        if phoneme_id != phoneme_ids[phoneme_id_idx]:
-                            # Bad alignment
-                            alignment_failed = True
-                            break
-
-                        phoneme_id_idx += 1
-
-                    if alignment_failed:
-                        break
-
-                    phoneme_alignments.append(
-                        PhonemeAlignment(
-                            phoneme=phoneme,
-                            phoneme_ids=ids_to_check,
-                            num_samples=sum(
-                                phoneme_id_samples[start_phoneme_id_idx:phoneme_id_idx]
-                            ),
-                        )
-                    )
-
-                if alignment_failed:
-                    phoneme_alignments = None
+                phoneme_alignments = self._get_phoneme_aligner().align(
+                    phonemes, phoneme_ids, phoneme_id_samples
+                )
+                if phoneme_alignments is None:
                     _LOGGER.debug("Phoneme alignment failed")
 
-            yield AudioChunk(
+            audio_chunk = AudioChunk(
                 sample_rate=self.config.sample_rate,
                 sample_width=2,
                 sample_channels=1,
@@ -429,6 +824,206 @@ class PiperVoice:
                 phoneme_id_samples=phoneme_id_samples,
                 phoneme_alignments=phoneme_alignments,
             )
+            if not syn_config.keep_float_audio:
+                audio_chunk.drop_float_audio()
+
+            yield audio_chunk
+
+    async def synthesize_async(
+        self,
+        text: str,
+        syn_config: Optional[SynthesisConfig] = None,
+        include_alignments: bool = False,
+    ) -> AsyncGenerator[AudioChunk, None]:
+        """
+        Synthesize one audio chunk per sentence without blocking the event loop.
+
+        Sentences are synthesized in this voice's thread pool (see
+        max_async_workers). If the caller is cancelled or the iterator is closed,
+        synthesis stops after the sentence in progress. Close the iterator when
+        breaking out of a loop early (e.g., with contextlib.aclosing).
+
+        :param text: Text to synthesize.
+        :param syn_config: Synthesis configuration.
+        :param include_alignments: If True and the model supports it, include phoneme/audio alignments.
+        """
+        executor = self._get_async_executor()
+        audio_chunks = iter(self.synthesize(text, syn_config, include_alignments))
+        next_chunk: Optional["Future[Optional[AudioChunk]]"] = None
+        try:
+            while True:
+                next_chunk = executor.submit(next, audio_chunks, None)
+                audio_chunk = await asyncio.wrap_future(next_chunk)
+                if audio_chunk is None:
+                    break
+
+                yield audio_chunk
+        finally:
+            # Stop at the next sentence boundary without waiting for it here
+            if next_chunk is not None:
+                next_chunk.cancel()
+
+            try:
+                executor.submit(_close_after, audio_chunks, next_chunk)
+            except RuntimeError:
+                # Thread pool was shut down (close_async)
+                if next_chunk is None:
+                    _close_after(audio_chunks, None)
+                else:
+                    # Called now if the pending step is already done
+                    next_chunk.add_done_callback(
+                        lambda _future: _close_after(audio_chunks, None)
+                    )
+
+    def close_async(self, wait: bool = True) -> None:
+        """
+        Shut down the thread pool used by synthesize_async.
+
+        A new thread pool is created if synthesize_async is called again.
+
+        :param wait: If True, wait for sentences in progress to finish.
+        """
+        with _ASYNC_EXECUTOR_LOCK:
+            executor = self._async_executor
+            self._async_executor = None
+
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def synthesize_stream(
+        self,
+        text_stream: Iterable[str],
+        syn_config: Optional[SynthesisConfig] = None,
+        include_alignments: bool = False,
+    ) -> Iterable[AudioChunk]:
+        """
+        Synthesize audio chunks from text that arrives in pieces (e.g., tokens).
+
+        Text is buffered until a sentence is complete, and each sentence is
+        synthesized before more text is read. Set max_sentence_phonemes in the
+        synthesis config to also split long sentences at clauses.
+
+        :param text_stream: Pieces of text, in order.
+        :param syn_config: Synthesis configuration.
+        :param include_alignments: If True and the model supports it, include phoneme/audio alignments.
+        """
+        stream_to_sentences = _import_sentence_stream().stream_to_sentences
+
+        for sentence_text in stream_to_sentences(text_stream):
+            yield from self.synthesize(sentence_text, syn_config, include_alignments)
+
+    async def synthesize_stream_async(
+        self,
+        text_stream: AsyncIterable[str],
+        syn_config: Optional[SynthesisConfig] = None,
+        include_alignments: bool = False,
+    ) -> AsyncGenerator[AudioChunk, None]:
+        """
+        Synthesize audio chunks from text that arrives in pieces asynchronously.
+
+        Like synthesize_stream, but text is read and split into sentences in a
+        separate task while sentences are synthesized in this voice's thread
+        pool (see synthesize_async).
+
+        :param text_stream: Pieces of text, in order.
+        :param syn_config: Synthesis configuration.
+        :param include_alignments: If True and the model supports it, include phoneme/audio alignments.
+        """
+        async_stream_to_sentences = _import_sentence_stream().async_stream_to_sentences
+
+        # Sentences, then None at the end of the text
+        sentence_queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+        async def read_sentences() -> None:
+            async for sentence_text in async_stream_to_sentences(text_stream):
+                await sentence_queue.put(sentence_text)
+
+            await sentence_queue.put(None)
+
+        read_task = asyncio.ensure_future(read_sentences())
+        try:
+            while True:
+                get_task = asyncio.ensure_future(sentence_queue.get())
+                await asyncio.wait(
+                    [get_task, read_task], return_when=asyncio.FIRST_COMPLETED
+                )
+                if (not get_task.done()) and (read_task.exception() is not None):
+                    # Text stream failed
+                    get_task.cancel()
+                    read_task.result()
+
+                sentence_text = await get_task
+                if sentence_text is None:
+                    break
+
+                audio_chunks = self.synthesize_async(
+                    sentence_text, syn_config, include_alignments
+                )
+                try:
+                    async for audio_chunk in audio_chunks:
+                        yield audio_chunk
+                finally:
+                    await audio_chunks.aclose()
+        finally:
+            read_task.cancel()
+
+    def synthesize_streaming(
+        self,
+        text: str,
+        syn_config: Optional[SynthesisConfig] = None,
+        chunk_frames: int = _STREAMING_CHUNK_FRAMES,
+    ) -> Iterable[AudioChunk]:
+        """
+        Synthesize audio chunks from text, decoding each sentence a window at a time.
+
+        Requires a voice loaded with streaming=True. The first chunk of a sentence
+        is ready once the encoder and one decoder window have run, instead of
+        the whole voice model. Windows are decoded with extra context on both
+        sides and crossfaded.
+
+        Since audio is yielded before the sentence is complete, normalize_audio
+        is not applied (only volume). Phonemes and phoneme ids are only set on
+        the first chunk of each sentence. batch_size is ignored.
+
+        :param text: Text to synthesize.
+        :param syn_config: Synthesis configuration.
+        :param chunk_frames: Number of latent frames to decode per chunk.
+        """
+        if (self.encoder_session is None) or (self.decoder_session is None):
+            raise ValueError("Voice was not loaded with streaming=True")
+
+        if syn_config is None:
+            syn_config = _DEFAULT_SYNTHESIS_CONFIG
+
+        speaker_id = self._get_synthesis_settings(syn_config)[0]
+        for phonemes, phoneme_ids in self._get_sentences(text, syn_config):
+            phoneme_ids_array = np.expand_dims(phoneme_ids, 0)
+            phoneme_ids_lengths = np.array([phoneme_ids_array.shape[1]], dtype=np.int64)
+            args = self._get_model_args(
+                phoneme_ids_array,
+                phoneme_ids_lengths,
+                syn_config,
+                session=self.encoder_session,
+            )
+            z = self.encoder_session.run(None, args)[0]
+
+            is_first_chunk = True
+            for audio in self._decode_streaming(z, speaker_id, chunk_frames):
+                audio = _postprocess_audio(audio, False, syn_config.volume)
+
+                audio_chunk = AudioChunk(
+                    sample_rate=self.config.sample_rate,
+                    sample_width=2,
+                    sample_channels=1,
+                    audio_float_array=audio,
+                    phonemes=phonemes if is_first_chunk else [],
+                    phoneme_ids=phoneme_ids if is_first_chunk else [],
+                )
+                if not syn_config.keep_float_audio:
+                    audio_chunk.drop_float_audio()
+
+                yield audio_chunk
+                is_first_chunk = False
 
     def synthesize_wav(
         self,
@@ -463,7 +1058,7 @@ class PiperVoice:
 
                 first_chunk = False
 
-            wav_file.writeframes(audio_chunk.audio_int16_bytes)
+            wav_file.writeframes(audio_chunk.audio_int16_memoryview)
 
             if include_alignments and audio_chunk.phoneme_alignments:
                 alignments.extend(audio_chunk.phoneme_alignments)
@@ -475,7 +1070,7 @@ class PiperVoice:
 
     def phoneme_ids_to_audio(
         self,
-        phoneme_ids: list[int],
+        phoneme_ids: _PhonemeIds,
         syn_config: Optional[SynthesisConfig] = None,
         include_alignments: bool = False,
     ) -> Union[np.ndarray, Tuple[np.ndarray, Optional[np.ndarray]]]:
@@ -494,6 +1089,307 @@ class PiperVoice:
         if syn_config is None:
             syn_config = _DEFAULT_SYNTHESIS_CONFIG
 
+        cache_key = ""
+        if self.audio_cache is not None:
+            cache_key = self._get_cache_key(phoneme_ids, syn_config)
+            cached_audio = self.audio_cache.get(cache_key)
+            if cached_audio is not None:
+                return cached_audio if include_alignments else cached_audio[0]
+
+        # Synthesize through onnx
+        result = self._run_model([phoneme_ids], syn_config)
+        audio = result[0].squeeze()
+
+        phoneme_id_samples: Optional[np.ndarray] = None
+        if len(result) > 1:
+            # Number of samples for each phoneme id
+            phoneme_id_samples = (result[1].squeeze() * self.config.hop_length).astype(
+                np.int64
+            )
+
+        if self.audio_cache is not None:
+            self.audio_cache.put(cache_key, audio, phoneme_id_samples)
+
+        if not include_alignments:
+            return audio
+
+        # phoneme_id_samples is None if alignment is not available from voice model
+        return audio, phoneme_id_samples
+
+    def phoneme_ids_to_audio_batch(
+        self,
+        phoneme_ids_batch: Sequence[_PhonemeIds],
+        syn_config: Optional[SynthesisConfig] = None,
+        include_alignments: bool = False,
+    ) -> list[_AudioResult]:
+        """
+        Synthesize raw audio for several phoneme id sequences in one model run.
+
+        The sequences are padded to the same length and the audio is split back
+        up using the number of samples per phoneme id. If the voice model does
+        not output these (see include_alignments in load), each sequence is
+        synthesized separately instead.
+
+        :param phoneme_ids_batch: Phoneme id sequences.
+        :param syn_config: Synthesis configuration.
+        :param include_alignments: Return samples per phoneme id if True.
+        :return: Results in the same order and format as phoneme_ids_to_audio.
+        """
+        if syn_config is None:
+            syn_config = _DEFAULT_SYNTHESIS_CONFIG
+
+        if (len(phoneme_ids_batch) < 2) or (len(self.session.get_outputs()) < 2):
+            return [
+                self.phoneme_ids_to_audio(
+                    phoneme_ids, syn_config, include_alignments=include_alignments
+                )
+                for phoneme_ids in phoneme_ids_batch
+            ]
+
+        results: dict[int, _AudioResult] = {}
+        cache_keys: dict[int, str] = {}
+        missing_idxs: list[int] = []
+        for i, phoneme_ids in enumerate(phoneme_ids_batch):
+            if self.audio_cache is not None:
+                cache_key = self._get_cache_key(phoneme_ids, syn_config)
+                cache_keys[i] = cache_key
+                cached_audio = self.audio_cache.get(cache_key)
+                if cached_audio is not None:
+                    results[i] = cached_audio if include_alignments else cached_audio[0]
+                    continue
+
+            missing_idxs.append(i)
+
+        if len(missing_idxs) < 2:
+            for i in missing_idxs:
+                results[i] = self.phoneme_ids_to_audio(
+                    phoneme_ids_batch[i],
+                    syn_config,
+                    include_alignments=include_alignments,
+                )
+
+            return [results[i] for i in range(len(phoneme_ids_batch))]
+
+        result = self._run_model(
+            [phoneme_ids_batch[i] for i in missing_idxs], syn_config
+        )
+        audio_batch = result[0].reshape(len(missing_idxs), -1)
+        samples_batch = (
+            result[1].reshape(len(missing_idxs), -1) * self.config.hop_length
+        ).astype(np.int64)
+
+        for row, i in enumerate(missing_idxs):
+            # Padding has no duration, so each sentence's audio ends where the
+            # samples of its phoneme ids do.
+            phoneme_id_samples = samples_batch[row, : len(phoneme_ids_batch[i])]
+            audio = audio_batch[row, : phoneme_id_samples.sum()]
+
+            if self.audio_cache is not None:
+                self.audio_cache.put(cache_keys[i], audio, phoneme_id_samples)
+
+            if include_alignments:
+                results[i] = (audio, phoneme_id_samples)
+            else:
+                results[i] = audio
+
+        return [results[i] for i in range(len(phoneme_ids_batch))]
+
+    def predict_durations(
+        self, text: str, syn_config: Optional[SynthesisConfig] = None
+    ) -> list[Optional[PhonemeAlignments]]:
+        """
+        Predict phoneme timings for text without synthesizing audio.
+
+        Requires a voice loaded with durations=True. Only the text encoder and
+        duration predictor are run, so this is much faster than synthesis.
+        Timings match synthesize with the same settings and seed (for models
+        exported with --noise-inputs) or are sampled independently (without).
+
+        :param text: Text to get timings for.
+        :param syn_config: Synthesis configuration.
+        :return: Phoneme/audio alignments for each sentence (None if alignment
+            failed, e.g. for pinyin voices).
+        """
+        if self.durations_session is None:
+            raise ValueError("Voice was not loaded with durations=True")
+
+        if syn_config is None:
+            syn_config = _DEFAULT_SYNTHESIS_CONFIG
+
+        aligner = self._get_phoneme_aligner()
+        sentence_alignments: list[Optional[PhonemeAlignments]] = []
+        for phonemes, phoneme_ids in self._get_sentences(text, syn_config):
+            phoneme_id_samples = self.phoneme_ids_to_durations(phoneme_ids, syn_config)
+
+            alignments: Optional[PhonemeAlignments] = None
+            if len(phoneme_id_samples) == len(phoneme_ids):
+                alignments = aligner.align(phonemes, phoneme_ids, phoneme_id_samples)
+
+            if alignments is None:
+                _LOGGER.debug("Phoneme alignment failed")
+
+            sentence_alignments.append(alignments)
+
+        return sentence_alignments
+
+    def phoneme_ids_to_durations(
+        self, phoneme_ids: _PhonemeIds, syn_config: Optional[SynthesisConfig] = None
+    ) -> np.ndarray:
+        """
+        Predict the number of audio samples for each phoneme id.
+
+        Requires a voice loaded with durations=True.
+
+        :param phoneme_ids: List of phoneme ids.
+        :param syn_config: Synthesis configuration.
+        :return: Number of audio samples per phoneme id (int64).
+        """
+        if self.durations_session is None:
+            raise ValueError("Voice was not loaded with durations=True")
+
+        if syn_config is None:
+            syn_config = _DEFAULT_SYNTHESIS_CONFIG
+
+        phoneme_ids_array = np.expand_dims(np.asarray(phoneme_ids, dtype=np.int64), 0)
+        phoneme_ids_lengths = np.array([phoneme_ids_array.shape[1]], dtype=np.int64)
+        args = self._get_model_args(
+            phoneme_ids_array,
+            phoneme_ids_lengths,
+            syn_config,
+            session=self.durations_session,
+        )
+        durations = self.durations_session.run(None, args)[0].reshape(-1)
+
+        return (durations * self.config.hop_length).astype(np.int64)
+
+    def get_model_inputs(
+        self, phoneme_ids: _PhonemeIds, syn_config: Optional[SynthesisConfig] = None
+    ) -> dict[str, np.ndarray]:
+        """
+        Get the voice model inputs for one sentence of phoneme ids.
+
+        Useful for running the voice model directly (e.g., to calibrate
+        quantization). Noise inputs are included if the model has them.
+
+        :param phoneme_ids: List of phoneme ids.
+        :param syn_config: Synthesis configuration.
+        :return: Inputs by name.
+        """
+        if syn_config is None:
+            syn_config = _DEFAULT_SYNTHESIS_CONFIG
+
+        phoneme_ids_array = np.expand_dims(np.asarray(phoneme_ids, dtype=np.int64), 0)
+        phoneme_ids_lengths = np.array([phoneme_ids_array.shape[1]], dtype=np.int64)
+
+        return self._get_model_args(phoneme_ids_array, phoneme_ids_lengths, syn_config)
+
+    def _run_model(
+        self, phoneme_ids_batch: Sequence[_PhonemeIds], syn_config: SynthesisConfig
+    ) -> list[np.ndarray]:
+        """Run the voice model on a session from the pool (if any)."""
+        if self.session_pool is None:
+            return self._run_session(self.session, phoneme_ids_batch, syn_config)
+
+        with self.session_pool.checkout() as session:
+            return self._run_session(session, phoneme_ids_batch, syn_config)
+
+    def _run_session(
+        self,
+        session: onnxruntime.InferenceSession,
+        phoneme_ids_batch: Sequence[_PhonemeIds],
+        syn_config: SynthesisConfig,
+    ) -> list[np.ndarray]:
+        """Run a voice model session on phoneme id sequences, padded with 0.
+
+        With io_binding, inputs are written to the buffers of a binding that
+        no other thread is using. Pooled sessions are only used by one thread
+        at a time, so each has one binding.
+        """
+        if self.io_binding:
+            with self._checkout_session_binding(session) as binding:
+                phoneme_ids_array, phoneme_ids_lengths = _pad_phoneme_ids(
+                    phoneme_ids_batch, binding
+                )
+                return binding.run(
+                    self._get_model_args(
+                        phoneme_ids_array,
+                        phoneme_ids_lengths,
+                        syn_config,
+                        session=session,
+                        binding=binding,
+                    )
+                )
+
+        phoneme_ids_array, phoneme_ids_lengths = _pad_phoneme_ids(phoneme_ids_batch)
+        return session.run(
+            None,
+            self._get_model_args(
+                phoneme_ids_array, phoneme_ids_lengths, syn_config, session=session
+            ),
+        )
+
+    def _get_model_args(
+        self,
+        phoneme_ids_array: np.ndarray,
+        phoneme_ids_lengths: np.ndarray,
+        syn_config: SynthesisConfig,
+        session: Optional[onnxruntime.InferenceSession] = None,
+        binding: Optional[SessionBinding] = None,
+    ) -> dict[str, np.ndarray]:
+        """Get voice model inputs for a (batch_size, phonemes) array of ids.
+
+        Inputs are for the main session unless another is given, and are
+        written to the binding's buffers if one is given.
+        """
+        if session is None:
+            session = self.session
+
+        speaker_id, length_scale, noise_scale, noise_w_scale = (
+            self._get_synthesis_settings(syn_config)
+        )
+
+        scales = _empty_array("scales", (3,), np.float32, binding)
+        scales[:] = (noise_scale, length_scale, noise_w_scale)
+
+        args = {
+            "input": phoneme_ids_array,
+            "input_lengths": phoneme_ids_lengths,
+            "scales": scales,
+        }
+
+        if speaker_id is not None:
+            sid = _empty_array("sid", (len(phoneme_ids_array),), np.int64, binding)
+            sid.fill(speaker_id)
+            args["sid"] = sid
+
+        model_inputs = {
+            model_input.name: model_input for model_input in session.get_inputs()
+        }
+        if "noise_w" in model_inputs:
+            # Duration models have noise_w only. It is sampled first, so
+            # durations match those of the full model with the same seed.
+            noise_channels = 0
+            if "noise" in model_inputs:
+                noise_channels = model_inputs["noise"].shape[1]
+
+            noise, args["noise_w"] = _make_noise(
+                phoneme_ids_lengths,
+                noise_channels,
+                length_scale,
+                syn_config.seed,
+                binding=binding,
+            )
+            if "noise" in model_inputs:
+                args["noise"] = noise
+        elif syn_config.seed is not None:
+            _LOGGER.debug("Voice model has no noise inputs, seed is ignored")
+
+        return args
+
+    def _get_synthesis_settings(
+        self, syn_config: SynthesisConfig
+    ) -> Tuple[Optional[int], float, float, float]:
+        """Get (speaker_id, length_scale, noise_scale, noise_w_scale) with defaults."""
         speaker_id = syn_config.speaker_id
         length_scale = syn_config.length_scale
         noise_scale = syn_config.noise_scale
@@ -508,19 +1404,6 @@ class PiperVoice:
         if noise_w_scale is None:
             noise_w_scale = self.config.noise_w_scale
 
-        phoneme_ids_array = np.expand_dims(np.array(phoneme_ids, dtype=np.int64), 0)
-        phoneme_ids_lengths = np.array([phoneme_ids_array.shape[1]], dtype=np.int64)
-        scales = np.array(
-            [noise_scale, length_scale, noise_w_scale],
-            dtype=np.float32,
-        )
-
-        args = {
-            "input": phoneme_ids_array,
-            "input_lengths": phoneme_ids_lengths,
-            "scales": scales,
-        }
-
         if self.config.num_speakers <= 1:
             speaker_id = None
 
@@ -528,26 +1411,532 @@ class PiperVoice:
             # Default speaker
             speaker_id = self.config.default_speaker_id
 
-        if speaker_id is not None:
-            sid = np.array([speaker_id], dtype=np.int64)
-            args["sid"] = sid
+        return speaker_id, length_scale, noise_scale, noise_w_scale
 
-        # Synthesize through onnx
-        result = self.session.run(
-            None,
-            args,
+    def _get_cache_key(
+        self, phoneme_ids: _PhonemeIds, syn_config: SynthesisConfig
+    ) -> str:
+        """Get the audio cache key for phoneme ids."""
+        return AudioCache.make_key(
+            phoneme_ids,
+            *self._get_synthesis_settings(syn_config),
+            seed=syn_config.seed,
         )
-        audio = result[0].squeeze()
-        if not include_alignments:
-            return audio
 
-        if len(result) == 1:
-            # Alignment is not available from voice model
-            return audio, None
+    def _get_async_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool for synthesize_async, creating it if needed."""
+        with _ASYNC_EXECUTOR_LOCK:
+            if self._async_executor is None:
+                max_workers = self.max_async_workers
+                if max_workers < 1:
+                    max_workers = len(self.session_pool) if self.session_pool else 1
+
+                self._async_executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="piper-async"
+                )
+
+            return self._async_executor
+
+    @contextmanager
+    def _checkout_session_binding(
+        self, session: onnxruntime.InferenceSession
+    ) -> Iterator[SessionBinding]:
+        """Get an idle I/O binding of a session, creating one if all are in use."""
+        with _SESSION_BINDINGS_LOCK:
+            idle_bindings = self._session_bindings.setdefault(id(session), [])
+            binding = idle_bindings.pop() if idle_bindings else None
+
+        if binding is None:
+            binding = SessionBinding(session)
+
+        try:
+            yield binding
+        finally:
+            with _SESSION_BINDINGS_LOCK:
+                idle_bindings.append(binding)
+
+    def _get_phoneme_aligner(self) -> PhonemeAligner:
+        """Get an aligner for the voice's phoneme id map."""
+        aligner = self._phoneme_aligner
+        if (aligner is None) or (
+            aligner.phoneme_id_map is not self.config.phoneme_id_map
+        ):
+            aligner = PhonemeAligner(self.config.phoneme_id_map)
+            self._phoneme_aligner = aligner
+
+        return aligner
+
+    def _get_sentences(
+        self, text: str, syn_config: SynthesisConfig
+    ) -> Iterable[Tuple[list[str], np.ndarray]]:
+        """Get (phonemes, phoneme_ids) for each sentence of text."""
+        if syn_config.phonemize_ahead > 0:
+            return self._phonemize_ahead(text, syn_config)
 
-        # Number of samples for each phoneme id
-        phoneme_id_samples = (result[1].squeeze() * self.config.hop_length).astype(
-            np.int64
+        sentence_phonemes = self.phonemize(text)
+        _LOGGER.debug("text=%s, phonemes=%s", text, sentence_phonemes)
+
+        return (
+            (phonemes, self.config.phoneme_id_encoder.encode(phonemes))
+            for phonemes in _split_sentences(
+                sentence_phonemes, syn_config.max_sentence_phonemes
+            )
         )
 
-        return audio, phoneme_id_samples
+    def _decode_streaming(
+        self, z: np.ndarray, speaker_id: Optional[int], chunk_frames: int
+    ) -> Iterable[np.ndarray]:
+        """Decode latent frames ([1, channels, frames]) to audio a window at a time."""
+        assert self.decoder_session is not None
+
+        hop_length = self.config.hop_length
+        context_frames = max(_STREAMING_CONTEXT_FRAMES, _STREAMING_CROSSFADE_FRAMES)
+        fade_samples = _STREAMING_CROSSFADE_FRAMES * hop_length
+        fade_in = np.linspace(0.0, 1.0, fade_samples, dtype=np.float32)
+        num_frames = z.shape[2]
+
+        # End of the previous chunk, decoded past its last frame
+        prev_tail: Optional[np.ndarray] = None
+
+        start = 0
+        while start < num_frames:
+            end = min(
+                num_frames, start + max(_STREAMING_CROSSFADE_FRAMES, chunk_frames)
+            )
+            if (num_frames - end) < _STREAMING_CROSSFADE_FRAMES:
+                # Last chunk must be long enough to crossfade into
+                end = num_frames
+
+            window_start = max(0, start - context_frames)
+            window_end = min(num_frames, end + context_frames)
+            args = {"z": z[:, :, window_start:window_end]}
+            if speaker_id is not None:
+                args["sid"] = np.array([speaker_id], dtype=np.int64)
+
+            window_audio = self.decoder_session.run(None, args)[0].reshape(-1)
+
+            is_last_chunk = end >= num_frames
+            audio_end = end if is_last_chunk else (end + _STREAMING_CROSSFADE_FRAMES)
+            audio = window_audio[
+                (start - window_start)
+                * hop_length : (audio_end - window_start)
+                * hop_length
+            ]
+
+            if prev_tail is not None:
+                audio[:fade_samples] = (prev_tail * (1.0 - fade_in)) + (
+                    audio[:fade_samples] * fade_in
+                )
+
+            if is_last_chunk:
+                yield audio
+            else:
+                prev_tail = audio[-fade_samples:].copy()
+                yield audio[:-fade_samples]
+
+            start = end
+
+    def _sentences_to_audio(
+        self,
+        sentences: Iterable[Tuple[list[str], np.ndarray]],
+        syn_config: SynthesisConfig,
+        include_alignments: bool,
+    ) -> Iterable[Tuple[list[str], np.ndarray, _AudioResult]]:
+        """Synthesize (phonemes, phoneme_ids) sentences in order, batching if enabled."""
+        can_batch = len(self.session.get_outputs()) > 1
+        if (syn_config.batch_size > 1) and (not can_batch):
+            if not self._warned_no_batching:
+                _LOGGER.warning(
+                    "batch_size is ignored: voice model has no alignments "
+                    "(load with include_alignments=True)"
+                )
+                self._warned_no_batching = True
+
+        if (syn_config.batch_size <= 1) or (not can_batch):
+            for phonemes, phoneme_ids in sentences:
+                yield phonemes, phoneme_ids, self.phoneme_ids_to_audio(
+                    phoneme_ids, syn_config, include_alignments=include_alignments
+                )
+
+            return
+
+        sentences_iter = iter(sentences)
+        window_size = syn_config.batch_size * _BATCH_WINDOW
+        while True:
+            window = list(itertools.islice(sentences_iter, window_size))
+            if not window:
+                break
+
+            # Group sentences by length, then run the groups in order of their
+            # earliest sentence so audio can be yielded as soon as possible.
+            sorted_idxs = sorted(range(len(window)), key=lambda i: len(window[i][1]))
+            batches = sorted(
+                (
+                    sorted_idxs[i : i + syn_config.batch_size]
+                    for i in range(0, len(sorted_idxs), syn_config.batch_size)
+                ),
+                key=min,
+            )
+
+            results: dict[int, _AudioResult] = {}
+            next_idx = 0
+            for batch in batches:
+                batch_results = self.phoneme_ids_to_audio_batch(
+                    [window[i][1] for i in batch],
+                    syn_config,
+                    include_alignments=include_alignments,
+                )
+                results.update(zip(batch, batch_results))
+
+                while next_idx in results:
+                    phonemes, phoneme_ids = window[next_idx]
+                    yield phonemes, phoneme_ids, results.pop(next_idx)
+                    next_idx += 1
+
+    def _phonemize_ahead(
+        self, text: str, syn_config: SynthesisConfig
+    ) -> Iterable[Tuple[list[str], np.ndarray]]:
+        """Phonemize text sentence by sentence in a background thread."""
+        stream_to_sentences = _import_sentence_stream().stream_to_sentences
+
+        sentence_queue: "queue.Queue[Any]" = queue.Queue(
+            maxsize=syn_config.phonemize_ahead
+        )
+        stopped = threading.Event()
+
+        def put(item: Any) -> bool:
+            while not stopped.is_set():
+                try:
+                    sentence_queue.put(item, timeout=_PHONEMIZE_AHEAD_POLL)
+                    return True
+                except queue.Full:
+                    pass
+
+            return False
+
+        def phonemize_sentences() -> None:
+            try:
+                for sentence_text in stream_to_sentences([text]):
+                    sentence_phonemes = self.phonemize(sentence_text)
+                    _LOGGER.debug(
+                        "text=%s, phonemes=%s", sentence_text, sentence_phonemes
+                    )
+
+                    for phonemes in _split_sentences(
+                        sentence_phonemes, syn_config.max_sentence_phonemes
+                    ):
+                        if not put(
+                            (phonemes, self.config.phoneme_id_encoder.encode(phonemes))
+                        ):
+                            return
+            except Exception as error:  # pylint: disable=broad-except
+                put(error)
+                return
+
+            put(None)
+
+        phonemize_thread = threading.Thread(
+            target=phonemize_sentences, name="piper-phonemize", daemon=True
+        )
+        phonemize_thread.start()
+
+        try:
+            while True:
+                item = sentence_queue.get()
+                if item is None:
+                    break
+
+                if isinstance(item, Exception):
+                    raise item
+
+                yield item
+        finally:
+            # Also runs when synthesis is stopped early
+            stopped.set()
+            phonemize_thread.join()
+
+
+def _get_optimized_model_path(
+    model_path: Union[str, Path],
+    session_config: SessionConfig,
+    use_cuda: bool,
+    include_alignments: bool,
+) -> Path:
+    """Get the path of an optimized model in the cache directory.
+
+    Optimized models depend on the hardware and onnxruntime version, so these
+    are part of the key along with the model contents.
+    """
+    assert session_config.optimized_model_dir is not None
+
+    key = get_model_key(
+        model_path,
+        {
+            "onnxruntime": onnxruntime.__version__,
+            "machine": platform.machine(),
+            "cuda": use_cuda,
+            "alignments": include_alignments,
+            "graph_optimization_level": session_config.graph_optimization_level,
+        },
+    )
+
+    return Path(session_config.optimized_model_dir) / f"{key}.onnx"
+
+
+def _make_session_options(
+    session_config: SessionConfig, num_sessions: int = 1
+) -> onnxruntime.SessionOptions:
+    """Get onnxruntime session options from a session config.
+
+    Thread counts are split evenly between num_sessions sessions.
+    """
+    if session_config.execution_mode not in _EXECUTION_MODES:
+        raise ValueError(
+            f"Unknown execution mode: {session_config.execution_mode} "
+            f"(expected one of {list(_EXECUTION_MODES)})"
+        )
+
+    if session_config.graph_optimization_level not in _GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(
+            "Unknown graph optimization level: "
+            f"{session_config.graph_optimization_level} "
+            f"(expected one of {list(_GRAPH_OPTIMIZATION_LEVELS)})"
+        )
+
+    intra_op_num_threads = session_config.intra_op_num_threads
+    inter_op_num_threads = session_config.inter_op_num_threads
+    if num_sessions > 1:
+        intra_op_num_threads = max(
+            1, (intra_op_num_threads or os.cpu_count() or 1) // num_sessions
+        )
+        if inter_op_num_threads > 0:
+            inter_op_num_threads = max(1, inter_op_num_threads // num_sessions)
+
+    sess_options = onnxruntime.SessionOptions()
+    sess_options.intra_op_num_threads = intra_op_num_threads
+    sess_options.inter_op_num_threads = inter_op_num_threads
+    sess_options.execution_mode = _EXECUTION_MODES[session_config.execution_mode]
+    sess_options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVELS[
+        session_config.graph_optimization_level
+    ]
+    sess_options.enable_cpu_mem_arena = session_config.enable_cpu_mem_arena
+    sess_options.enable_mem_pattern = session_config.enable_mem_pattern
+
+    spinning = "1" if session_config.allow_spinning else "0"
+    sess_options.add_session_config_entry("session.intra_op.allow_spinning", spinning)
+    sess_options.add_session_config_entry("session.inter_op.allow_spinning", spinning)
+
+    return sess_options
+
+
+def _split_sentences(
+    sentence_phonemes: Iterable[list[str]], max_phonemes: int
+) -> Iterable[list[str]]:
+    """Skip empty sentences and split long ones at clause boundaries.
+
+    Clauses are kept together while the phonemes fit in max_phonemes (0 = no
+    limit). A single clause longer than that is not split.
+    """
+    for phonemes in sentence_phonemes:
+        if not phonemes:
+            continue
+
+        if (max_phonemes <= 0) or (len(phonemes) <= max_phonemes):
+            yield phonemes
+            continue
+
+        part_start = 0
+        clause_start = 0
+        for i, phoneme in enumerate(phonemes):
+            is_clause_end = (
+                (phoneme in _CLAUSE_TERMINATORS)
+                and ((i + 1) < len(phonemes))
+                and (phonemes[i + 1] == " ")
+            )
+            if not is_clause_end:
+                continue
+
+            # Clause includes the space after its terminator
+            clause_end = i + 2
+            if ((clause_end - part_start) > max_phonemes) and (
+                clause_start > part_start
+            ):
+                yield phonemes[part_start:clause_start]
+                part_start = clause_start
+
+            clause_start = clause_end
+
+        if ((len(phonemes) - part_start) > max_phonemes) and (
+            clause_start > part_start
+        ):
+            yield phonemes[part_start:clause_start]
+            part_start = clause_start
+
+        yield phonemes[part_start:]
+
+
+def _pad_phoneme_ids(
+    phoneme_ids_batch: Sequence[_PhonemeIds], binding: Optional[SessionBinding] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Get (phoneme_ids_array, phoneme_ids_lengths) inputs, padding ids with 0."""
+    phoneme_ids_lengths = _empty_array(
+        "input_lengths", (len(phoneme_ids_batch),), np.int64, binding
+    )
+    phoneme_ids_lengths[:] = [len(phoneme_ids) for phoneme_ids in phoneme_ids_batch]
+
+    if len(phoneme_ids_batch) == 1:
+        phoneme_ids = phoneme_ids_batch[0]
+        if (
+            isinstance(phoneme_ids, np.ndarray)
+            and (phoneme_ids.dtype == np.int64)
+            and phoneme_ids.flags.c_contiguous
+        ):
+            # No copy needed
+            return np.expand_dims(phoneme_ids, 0), phoneme_ids_lengths
+
+    phoneme_ids_array = _empty_array(
+        "input",
+        (len(phoneme_ids_batch), int(phoneme_ids_lengths.max())),
+        np.int64,
+        binding,
+    )
+    for row, phoneme_ids in enumerate(phoneme_ids_batch):
+        length = phoneme_ids_lengths[row]
+        phoneme_ids_array[row, :length] = phoneme_ids
+        phoneme_ids_array[row, length:] = 0
+
+    return phoneme_ids_array, phoneme_ids_lengths
+
+
+def _empty_array(
+    name: str,
+    shape: Tuple[int, ...],
+    dtype: type,
+    binding: Optional[SessionBinding] = None,
+) -> np.ndarray:
+    """Get an uninitialized model input array, from the binding's buffer if given."""
+    if binding is None:
+        return np.empty(shape, dtype=dtype)
+
+    return binding.get_buffer(name, shape, dtype)
+
+
+def _make_noise(
+    phoneme_ids_lengths: np.ndarray,
+    noise_channels: int,
+    length_scale: float,
+    seed: Optional[int],
+    binding: Optional[SessionBinding] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Get (noise, noise_w) inputs for a batch of phoneme id sequences.
+
+    Each sequence gets noise from its own generator, so a sentence gets the
+    same noise whether it is synthesized alone or in a batch.
+    """
+    num_frames = [
+        max(1, int(np.ceil(length * length_scale * _NOISE_FRAMES_PER_PHONEME_ID)))
+        for length in phoneme_ids_lengths
+    ]
+    noise = _empty_array(
+        "noise",
+        (len(phoneme_ids_lengths), noise_channels, max(num_frames)),
+        np.float32,
+        binding,
+    )
+    noise_w = _empty_array(
+        "noise_w",
+        (len(phoneme_ids_lengths), 2, int(phoneme_ids_lengths.max())),
+        np.float32,
+        binding,
+    )
+    noise_w.fill(0)
+
+    for row, length in enumerate(phoneme_ids_lengths):
+        rng = np.random.default_rng(seed)
+
+        # Sampled time-major, so the first frames don't depend on padding
+        noise_w[row, :, :length] = rng.standard_normal((length, 2)).T
+
+        row_noise = rng.standard_normal((num_frames[row], noise_channels))
+        noise[row] = np.resize(row_noise, (noise.shape[2], noise_channels)).T
+
+    return noise, noise_w
+
+
+def _close_after(
+    audio_chunks: Iterator[AudioChunk], pending: Optional["Future[Any]"]
+) -> None:
+    """Close a synthesis generator once its pending step (if any) is done."""
+    if pending is not None:
+        wait_futures([pending])
+
+    close = getattr(audio_chunks, "close", None)
+    if close is not None:
+        close()
+
+
+def _import_sentence_stream() -> ModuleType:
+    """Import sentence_stream, which is only needed to split text into sentences."""
+    try:
+        import sentence_stream
+    except ImportError as error:
+        raise ImportError(
+            "The sentence-stream package is required for phonemize_ahead and "
+            "synthesize_stream. Install it with: pip install piper-tts[stream]"
+        ) from error
+
+    return sentence_stream
+
+
+def _postprocess_audio(
+    audio: np.ndarray, normalize_audio: bool, volume: float, edge_samples: int = 0
+) -> np.ndarray:
+    """Normalize, apply volume to, and clip voice model audio in place.
+
+    Audio from the model is modified directly; read-only arrays (from the
+    audio cache) and arrays of other types are copied once first.
+    The last edge_samples are left out of the peak for normalization, unless
+    the audio is too short.
+    """
+    if (audio.dtype != np.float32) or (not audio.flags.writeable):
+        audio = audio.astype(np.float32)
+
+    gain = volume
+    if normalize_audio and (audio.size > 0):
+        peak_audio = audio
+        if 0 < edge_samples < audio.size:
+            peak_audio = audio[:-edge_samples]
+
+        # Peak without allocating abs(audio)
+        max_val = max(float(peak_audio.max()), -float(peak_audio.min()))
+        if max_val < 1e-8:
+            # Prevent division by zero
+            gain = 0.0
+        else:
+            gain = volume / max_val
+
+    if gain != 1.0:
+        np.multiply(audio, gain, out=audio)
+
+    np.clip(audio, -1.0, 1.0, out=audio)
+
+    return audio
+
+
+def _float_to_int16(audio: np.ndarray) -> np.ndarray:
+    """Convert float audio in [-1, 1] to int16 samples."""
+    audio_int16 = np.empty(audio.shape, dtype=np.int16)
+    if (audio.size == 0) or ((audio.max() <= 1.0) and (audio.min() >= -1.0)):
+        # Scale straight into the int16 array
+        np.multiply(audio, _MAX_WAV_VALUE, out=audio_int16, casting="unsafe")
+    else:
+        # Out of range or NaN
+        np.clip(
+            audio * _MAX_WAV_VALUE,
+            -_MAX_WAV_VALUE,
+            _MAX_WAV_VALUE,
+            out=audio_int16,
+            casting="unsafe",
+        )
+
+    return audio_int16
@@ -0,0 +1,76 @@
+"""Generate a tiny, untrained VITS test voice with noise inputs.
+
+Unlike test_voice.onnx, this is a real exported VITS model (random weights), so
+it produces alignments and audio that depends on padding and noise.
+
+Requires torch, lightning, and onnx.
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import lightning as L
+import torch
+
+from piper import PiperConfig
+from piper.train import export_onnx
+from piper.train.vits.lightning import VitsModel
+
+_DIR = Path(__file__).parent
+_TESTS_DIR = _DIR
+_TEST_VOICE = _TESTS_DIR / "test_vits_voice.onnx"
+_TEST_CONFIG = f"{_TEST_VOICE}.json"
+
+# Same phonemes as the silent test voice
+_SOURCE_CONFIG = _TESTS_DIR / "test_voice.onnx.json"
+
+
+def main() -> None:
+    """Export test voice."""
+    torch.manual_seed(1234)
+
+    with open(_SOURCE_CONFIG, "r", encoding="utf-8") as config_file:
+        config_dict = json.load(config_file)
+        config = PiperConfig.from_dict(config_dict)
+
+    # Smallest model with the same structure (and hop length) as a real voice
+    model = VitsModel(
+        num_symbols=config.num_symbols,
+        resblock_kernel_sizes=(3,),
+        resblock_dilation_sizes=((1, 2),),
+        upsample_initial_channel=16,
+        inter_channels=16,
+        hidden_channels=16,
+        filter_channels=32,
+        n_layers=1,
+        n_layers_q=1,
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        checkpoint_path = Path(temp_dir) / "test_vits_voice.ckpt"
+        trainer = L.Trainer(accelerator="cpu", logger=False)
+        trainer.strategy.connect(model)
+        trainer.save_checkpoint(checkpoint_path)
+
+        sys.argv = [
+            sys.argv[0],
+            "--checkpoint",
+            str(checkpoint_path),
+            "--output-file",
+            str(_TEST_VOICE),
+            "--noise-inputs",
+        ]
+        export_onnx.main()
+
+    shutil.copyfile(_SOURCE_CONFIG, _TEST_CONFIG)
+
+    print(_TEST_VOICE)
+
+
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
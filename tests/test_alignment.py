@@ -0,0 +1,70 @@
+"""Tests for phoneme/audio alignments."""
+
+import numpy as np
+
+from piper.alignment import PhonemeAligner, PhonemeAlignment
+from piper.const import BOS, EOS, PAD
+from piper.phoneme_ids import phonemes_to_ids
+
+_PHONEME_ID_MAP = {PAD: [0], BOS: [1], EOS: [2], "a": [3], "b": [4, 5]}
+
+
+def test_align() -> None:
+    """Each phoneme's ids and PAD (except EOS) are summed."""
+    phonemes = ["a", "b"]
+    phoneme_ids = phonemes_to_ids(phonemes, _PHONEME_ID_MAP)
+    assert phoneme_ids == [1, 0, 3, 0, 4, 5, 0, 2]
+
+    phoneme_id_samples = np.array([1, 2, 3, 4, 5, 6, 7, 8])
+    alignments = PhonemeAligner(_PHONEME_ID_MAP).align(
+        phonemes, phoneme_ids, phoneme_id_samples
+    )
+    assert alignments is not None
+    assert alignments.num_samples.tolist() == [3, 7, 18, 8]
+    assert alignments == [
+        PhonemeAlignment(phoneme=BOS, phoneme_ids=[1, 0], num_samples=3),
+        PhonemeAlignment(phoneme="a", phoneme_ids=[3, 0], num_samples=7),
+        PhonemeAlignment(phoneme="b", phoneme_ids=[4, 5, 0], num_samples=18),
+        PhonemeAlignment(phoneme=EOS, phoneme_ids=[2], num_samples=8),
+    ]
+
+    # Sequence access
+    assert len(alignments) == 4
+    assert alignments[-1].phoneme == EOS
+    assert [a.phoneme for a in alignments[1:3]] == ["a", "b"]
+    assert sum(a.num_samples for a in alignments) == phoneme_id_samples.sum()
+
+
+def test_align_no_eos_ids() -> None:
+    """Phonemes without ids get empty spans."""
+    phoneme_id_map = {PAD: [0], BOS: [1], "a": [3]}
+    alignments = PhonemeAligner(phoneme_id_map).align(
+        ["a"], [1, 0, 3, 0], np.array([1, 2, 3, 4])
+    )
+    assert alignments is not None
+    assert alignments.num_samples.tolist() == [3, 7, 0]
+    assert alignments[2] == PhonemeAlignment(phoneme=EOS, phoneme_ids=[], num_samples=0)
+
+
+def test_align_mismatch() -> None:
+    """Alignment fails if the phonemes did not produce the phoneme ids."""
+    aligner = PhonemeAligner(_PHONEME_ID_MAP)
+    samples = np.ones(8, dtype=np.int64)
+
+    # Wrong id
+    assert aligner.align(["a", "b"], [1, 0, 3, 0, 4, 4, 0, 2], samples) is None
+
+    # Too few ids
+    assert aligner.align(["a", "b"], [1, 0, 3, 0, 4, 5, 0], samples[:7]) is None
+
+
+def test_align_missing_phoneme() -> None:
+    """Phonemes missing from the map are skipped, like by phonemes_to_ids."""
+    phoneme_ids = phonemes_to_ids(["a", "c", "b"], _PHONEME_ID_MAP)
+    assert phoneme_ids == phonemes_to_ids(["a", "b"], _PHONEME_ID_MAP)
+
+    alignments = PhonemeAligner(_PHONEME_ID_MAP).align(
+        ["a", "c", "b"], phoneme_ids, np.ones(len(phoneme_ids), dtype=np.int64)
+    )
+    assert alignments is not None
+    assert alignments.phonemes == [BOS, "a", "b", EOS]
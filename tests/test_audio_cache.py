@@ -0,0 +1,101 @@
+"""Tests for the audio cache."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from piper.audio_cache import AudioCache
+
+
+def _key(phoneme_ids: list[int], length_scale: float = 1.0) -> str:
+    return AudioCache.make_key(phoneme_ids, None, length_scale, 0.667, 0.8)
+
+
+def test_key() -> None:
+    """Keys depend on phoneme ids and every synthesis setting."""
+    assert _key([1, 0, 2]) == _key([1, 0, 2])
+    assert _key([1, 0, 2]) != _key([1, 0, 3])
+    assert _key([1, 0, 2]) != _key([1, 0, 2], length_scale=1.5)
+    assert AudioCache.make_key([1], None, 1.0, 0.667, 0.8) != AudioCache.make_key(
+        [1], 0, 1.0, 0.667, 0.8
+    )
+    assert AudioCache.make_key([1], None, 1.0, 0.667, 0.8) != AudioCache.make_key(
+        [1], None, 1.0, 0.667, 0.8, seed=0
+    )
+
+
+def test_lru_eviction() -> None:
+    """Least recently used entries are evicted to stay under the byte limit."""
+    audio = np.zeros(100, dtype=np.float32)  # 400 bytes
+    cache = AudioCache(max_bytes=1000)
+
+    cache.put(_key([1]), audio, None)
+    cache.put(_key([2]), audio, None)
+    assert cache.get(_key([1])) is not None  # [2] is now least recently used
+
+    cache.put(_key([3]), audio, None)
+    assert len(cache) == 2
+    assert cache.num_bytes == 800
+    assert cache.get(_key([2])) is None
+    assert cache.get(_key([3])) is not None
+
+    stats = cache.stats
+    assert stats.hits == 2
+    assert stats.misses == 1
+    assert stats.evictions == 1
+
+
+def test_read_only() -> None:
+    """Cached arrays can't be modified by callers."""
+    cache = AudioCache(max_bytes=1000)
+    audio = np.zeros(10, dtype=np.float32)
+    cache.put(_key([1]), audio, np.array([256, 512]))
+
+    # The caller's array is copied
+    audio[0] = 1.0
+
+    cached = cache.get(_key([1]))
+    assert cached is not None
+    cached_audio, cached_samples = cached
+    assert not cached_audio.any()
+    assert cached_samples is not None
+
+    with pytest.raises(ValueError):
+        cached_audio[0] = 1.0
+
+    with pytest.raises(ValueError):
+        cached_samples[0] = 1
+
+
+def test_disk_spill(tmp_path: Path) -> None:
+    """Evicted entries are written to disk and loaded back."""
+    audio = np.arange(100, dtype=np.float32)
+    cache = AudioCache(max_bytes=500, cache_dir=tmp_path)
+
+    cache.put(_key([1]), audio, np.array([256, 512]))
+    cache.put(_key([2]), audio, None)  # evicts [1]
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    cached = cache.get(_key([1]))
+    assert cached is not None
+    cached_audio, cached_samples = cached
+    assert (cached_audio == audio).all()
+    assert cached_samples is not None
+    assert list(cached_samples) == [256, 512]
+
+    # Entries from disk are read-only too
+    assert not cached_audio.flags.writeable
+    assert not cached_samples.flags.writeable
+
+    stats = cache.stats
+    assert stats.hits == 1
+    assert stats.disk_hits == 1
+
+    # Loading [1] back into memory evicted [2]
+    assert len(list(tmp_path.glob("*.npz"))) == 2
+
+    # Shared with another cache (e.g., after a restart)
+    other_cache = AudioCache(max_bytes=500, cache_dir=tmp_path)
+    assert other_cache.get(_key([2])) is not None
+    assert other_cache.get(_key([3])) is None
@@ -1,4 +1,19 @@
-from piper.phonemize_espeak import EspeakPhonemizer
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from piper import espeakbridge
+from piper.config import PhonemeType, PiperConfig
+from piper.phoneme_cache import PhonemeCache
+from piper.phonemize_espeak import (
+    EspeakPhonemizer,
+    EspeakPhonemizerPool,
+    VowelClusterMerger,
+)
 
 from . import EN_US_VOWEL_CLUSTERS
 
@@ -70,3 +85,280 @@ def test_vowel_clusters_without_terminator() -> None:
     assert phonemizer.phonemize("en-us", "my", vowel_clusters=EN_US_VOWEL_CLUSTERS) == [
         ["m", "ˈ", "aɪ"],
     ]
+
+
+def test_phonemize_threads() -> None:
+    """Test phonemizing with different voices from several threads."""
+    phonemizer = EspeakPhonemizer()
+    requests = [("en-us", "This is a test."), ("de", "Das ist ein Test.")] * 20
+    expected = [phonemizer.phonemize(voice, text) for voice, text in requests]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        actual = list(
+            executor.map(lambda request: phonemizer.phonemize(*request), requests)
+        )
+
+    assert actual == expected
+
+
+def test_set_voice_repeated() -> None:
+    """The voice is only changed when it differs, including after errors."""
+    phonemizer = EspeakPhonemizer()
+    expected_de = phonemizer.phonemize("de", "Das ist ein Test.")
+    assert phonemizer.phonemize("de", "Das ist ein Test.") == expected_de
+
+    with pytest.raises(RuntimeError):
+        phonemizer.phonemize("not-a-voice", "test")
+
+    assert phonemizer.phonemize("de", "Das ist ein Test.") == expected_de
+
+    # A new phonemizer doesn't initialize espeak-ng again
+    with patch.object(espeakbridge, "initialize") as initialize:
+        EspeakPhonemizer()
+
+    initialize.assert_not_called()
+    assert phonemizer.phonemize("de", "Das ist ein Test.") == expected_de
+
+
+def test_phonemize_voices_concurrently() -> None:
+    """Two threads with different voices get the same phonemes as one thread."""
+    phonemizer = EspeakPhonemizer()
+    requests = {
+        "en-us": ["This is a test.", "Another test, with a comma."],
+        "de": ["Das ist ein Test.", "Noch ein Test, mit einem Komma."],
+    }
+    expected = {
+        voice: [phonemizer.phonemize(voice, text) for text in texts]
+        for voice, texts in requests.items()
+    }
+
+    barrier = threading.Barrier(len(requests))
+
+    def phonemize_voice(voice: str) -> list[list[list[str]]]:
+        barrier.wait(timeout=5)
+        return [
+            phonemizer.phonemize(voice, text)
+            for _ in range(20)
+            for text in requests[voice]
+        ]
+
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        actual = dict(zip(requests, executor.map(phonemize_voice, requests)))
+
+    for voice, voice_phonemes in actual.items():
+        assert voice_phonemes == expected[voice] * 20
+
+
+def test_espeakbridge_voice() -> None:
+    """The remembered voice matches the voice espeak-ng selected."""
+    EspeakPhonemizer()
+    espeakbridge.set_voice("de")
+    assert espeakbridge.get_voice() == "gmw/de"
+    espeakbridge.set_voice("en-us")
+    assert espeakbridge.get_voice() == "gmw/en-US"
+
+    with pytest.raises(RuntimeError):
+        espeakbridge.set_voice("not-a-voice")
+
+    espeakbridge.set_voice("en-us")
+    assert espeakbridge.get_voice() == "gmw/en-US"
+
+    # Initializing espeak-ng again clears its voice, so the same voice is
+    # selected again. Done in a separate process, since initializing again
+    # can crash espeak-ng.
+    code = "\n".join(
+        [
+            "from piper import espeakbridge",
+            "from piper.phonemize_espeak import ESPEAK_DATA_DIR",
+            "espeakbridge.initialize(str(ESPEAK_DATA_DIR))",
+            "espeakbridge.set_voice('de')",
+            "espeakbridge.initialize(str(ESPEAK_DATA_DIR))",
+            "assert espeakbridge.get_voice() is None",
+            "espeakbridge.set_voice('de')",
+            "assert espeakbridge.get_voice() == 'gmw/de'",
+        ]
+    )
+    result = subprocess.run([sys.executable, "-c", code], check=False)
+    assert result.returncode == 0
+
+
+def test_phonemize_batch() -> None:
+    """Batch phonemization matches phonemizing texts one at a time."""
+    phonemizer = EspeakPhonemizer()
+    texts = [
+        "This is a test.",
+        "First sentence, with a comma; and more: words. Second sentence?",
+        "No terminator",
+        "",
+        "My cow says hello (in French): bonjour!",
+        "Toy day. No way.",
+    ]
+
+    for vowel_clusters in (None, EN_US_VOWEL_CLUSTERS):
+        assert phonemizer.phonemize_batch(
+            "en-us", texts, vowel_clusters=vowel_clusters
+        ) == [
+            phonemizer.phonemize("en-us", text, vowel_clusters=vowel_clusters)
+            for text in texts
+        ]
+
+    # Voice is set for the batch, and (lang) switch flags are removed
+    de_texts = ["Das ist ein Test.", "Ich habe einen Laptop. Hallo"]
+    assert phonemizer.phonemize_batch("de", de_texts) == [
+        phonemizer.phonemize("de", text) for text in de_texts
+    ]
+    assert phonemizer.phonemize_batch("en-us", []) == []
+
+
+def test_espeakbridge_get_phonemes_batch() -> None:
+    """The extension's batch output matches get_phonemes for each text."""
+    EspeakPhonemizer()
+    assert hasattr(
+        espeakbridge, "get_phonemes_batch"
+    ), "espeakbridge is out of date (rebuild with script/dev_build)"
+
+    texts = [
+        "This is a test.",
+        "First sentence, with a comma; and more: words. Second sentence?",
+        "No terminator",
+        "",
+        "My cow says hello (in French): bonjour!",
+    ]
+    for voice in ("en-us", "de"):
+        espeakbridge.set_voice(voice)
+        expected = ""
+        for text in texts:
+            for phonemes, terminator, end_of_sentence in espeakbridge.get_phonemes(
+                text
+            ):
+                expected += phonemes + terminator
+                if terminator in (",", ":", ";"):
+                    expected += " "
+
+                if end_of_sentence:
+                    expected += "\x1e"
+
+            expected += "\x1d"
+
+        # Voice is set by get_phonemes_batch
+        espeakbridge.set_voice("en-us" if voice == "de" else "de")
+        assert espeakbridge.get_phonemes_batch(voice, texts) == expected
+
+    assert espeakbridge.get_phonemes_batch("en-us", ()) == ""
+
+    # Not split into characters
+    for texts_arg in ("test", b"test"):
+        with pytest.raises(TypeError):
+            espeakbridge.get_phonemes_batch("en-us", texts_arg)  # type: ignore[arg-type]
+
+
+def test_phonemizer_pool() -> None:
+    """Worker processes phonemize the same as this process."""
+    phonemizer = EspeakPhonemizer()
+    texts = [
+        "This is a test.",
+        "First sentence, with a comma. Second sentence?",
+        "",
+        "My cow",
+    ]
+
+    with EspeakPhonemizerPool(num_processes=2) as pool:
+        assert len(pool) == 2
+        assert pool.phonemize_batch(
+            "en-us", texts, vowel_clusters=EN_US_VOWEL_CLUSTERS
+        ) == phonemizer.phonemize_batch(
+            "en-us", texts, vowel_clusters=EN_US_VOWEL_CLUSTERS
+        )
+        assert pool.phonemize_batch("en-us", []) == []
+
+        # Several voices from several threads
+        requests = [("en-us", "This is a test."), ("de", "Das ist ein Test.")] * 10
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            actual = list(
+                executor.map(lambda request: pool.phonemize(*request), requests)
+            )
+
+        assert actual == [phonemizer.phonemize(voice, text) for voice, text in requests]
+
+        with pytest.raises(RuntimeError):
+            pool.phonemize("not-a-voice", "test")
+
+
+def test_phonemize_cache() -> None:
+    """Cached texts skip espeak-ng and give the same phonemes."""
+    phonemizer = EspeakPhonemizer()
+    cache = PhonemeCache(max_entries=10)
+    cached_phonemizer = EspeakPhonemizer(cache=cache)
+    texts = ["This is a test.", "My cow", "This is a test."]
+
+    for _ in range(2):
+        for text in texts:
+            assert cached_phonemizer.phonemize(
+                "en-us", text, vowel_clusters=EN_US_VOWEL_CLUSTERS
+            ) == phonemizer.phonemize(
+                "en-us", text, vowel_clusters=EN_US_VOWEL_CLUSTERS
+            )
+
+    assert len(cache) == 2
+    assert (cache.stats.hits, cache.stats.misses) == (4, 2)
+
+    # Cache is shared with batches
+    batch_texts = ["My cow", "Test", "This is a test."]
+    assert cached_phonemizer.phonemize_batch(
+        "en-us", batch_texts, vowel_clusters=EN_US_VOWEL_CLUSTERS
+    ) == phonemizer.phonemize_batch(
+        "en-us", batch_texts, vowel_clusters=EN_US_VOWEL_CLUSTERS
+    )
+    assert (cache.stats.hits, cache.stats.misses) == (6, 3)
+
+    # Keyed on vowel clusters
+    assert cached_phonemizer.phonemize("en-us", "My cow") == phonemizer.phonemize(
+        "en-us", "My cow"
+    )
+    assert (cache.stats.hits, cache.stats.misses) == (6, 4)
+
+    # Cache given for one call
+    other_cache = PhonemeCache(max_entries=10)
+    phonemizer.phonemize("de", "Das ist ein Test.", cache=other_cache)
+    assert len(other_cache) == 1
+    assert len(cache) == 4
+
+
+def test_vowel_cluster_merger() -> None:
+    """Longest cluster at each position is merged in one pass."""
+    merger = VowelClusterMerger({("a", "ɪ"), ("a", "ɪ", "ə"), ("ɪ", "ə"), ("x",)})
+    assert merger.merge(list("maɪə")) == ["m", "aɪə"]
+    assert merger.merge(list("maɪt")) == ["m", "aɪ", "t"]
+    assert merger.merge(list("ɪaɪəa")) == ["ɪ", "aɪə", "a"]
+    assert merger.merge(list("maɪ")) == ["m", "aɪ"]
+    assert merger.merge(list("ɪə")) == ["ɪə"]
+    assert merger.merge(list("ax")) == ["a", "x"]  # single phonemes are ignored
+    assert not merger.merge([])
+
+    # Same phonemes as sets of clusters
+    phonemizer = EspeakPhonemizer()
+    assert phonemizer.phonemize(
+        "en-us", "my cow", vowel_clusters=VowelClusterMerger(EN_US_VOWEL_CLUSTERS)
+    ) == phonemizer.phonemize("en-us", "my cow", vowel_clusters=EN_US_VOWEL_CLUSTERS)
+
+
+def test_config_vowel_cluster_merger() -> None:
+    """Merger is compiled once per set of vowel clusters."""
+    config = PiperConfig(
+        num_symbols=256,
+        num_speakers=1,
+        sample_rate=22050,
+        espeak_voice="en-us",
+        phoneme_id_map={},
+        phoneme_type=PhonemeType.ESPEAK,
+    )
+    assert config.vowel_cluster_merger is None
+
+    config.vowel_clusters = EN_US_VOWEL_CLUSTERS
+    merger = config.vowel_cluster_merger
+    assert merger is not None
+    assert config.vowel_cluster_merger is merger
+
+    config.vowel_clusters = {("a", "ɪ")}
+    assert config.vowel_cluster_merger is not merger
+    assert config.vowel_cluster_merger.merge(list("aʊaɪ")) == ["a", "ʊ", "aɪ"]
@@ -0,0 +1,93 @@
+"""Tests for the phoneme cache."""
+
+from pathlib import Path
+
+from piper.phoneme_cache import PhonemeCache
+
+
+def test_key() -> None:
+    """Keys depend on voice, text, and vowel clusters."""
+    key = PhonemeCache.make_key("en-us", "test")
+    assert key == PhonemeCache.make_key("en-us", "test")
+    assert key != PhonemeCache.make_key("en-gb", "test")
+    assert key != PhonemeCache.make_key("en-us", "test.")
+    assert key != PhonemeCache.make_key("en-us", "test", {("a", "ɪ")})
+    assert PhonemeCache.make_key(
+        "en-us", "test", {("a", "ɪ"), ("o", "ʊ")}
+    ) == PhonemeCache.make_key("en-us", "test", {("o", "ʊ"), ("a", "ɪ")})
+
+    # Separator between voice and text
+    assert PhonemeCache.make_key("a", "bc") != PhonemeCache.make_key("ab", "c")
+
+
+def test_lru_eviction() -> None:
+    """Least recently used entries are evicted to stay under the entry limit."""
+    cache = PhonemeCache(max_entries=2)
+
+    cache.put("1", [["a"]])
+    cache.put("2", [["b"]])
+    assert cache.get("1") == [["a"]]  # "2" is now least recently used
+
+    cache.put("3", [["c"]])
+    assert len(cache) == 2
+    assert cache.get("2") is None
+    assert cache.get("3") == [["c"]]
+
+    stats = cache.stats
+    assert stats.hits == 2
+    assert stats.misses == 1
+    assert stats.evictions == 1
+    assert stats.hit_rate == 2 / 3
+
+
+def test_copies() -> None:
+    """Changing returned phonemes doesn't change the cache."""
+    cache = PhonemeCache(max_entries=10)
+    phonemes = [["t", "ɛ"], ["s", "t"]]
+    cache.put("test", phonemes)
+    phonemes[0].append("x")
+
+    cached_phonemes = cache.get("test")
+    assert cached_phonemes == [["t", "ɛ"], ["s", "t"]]
+    assert cached_phonemes is not None
+    cached_phonemes[1].append("x")
+    assert cache.get("test") == [["t", "ɛ"], ["s", "t"]]
+
+
+def test_database(tmp_path: Path) -> None:
+    """Entries are kept in the database for other caches."""
+    db_path = tmp_path / "phonemes.db"
+    cache = PhonemeCache(max_entries=1, db_path=db_path)
+    cache.put("1", [["a"], []])
+    cache.put("2", [["b"]])
+    assert len(cache) == 1
+
+    # Evicted from memory, but still in the database
+    assert cache.get("1") == [["a"], []]
+    assert cache.stats.disk_hits == 1
+    cache.close()
+
+    # Another process or after a restart
+    other_cache = PhonemeCache(max_entries=10, db_path=db_path)
+    assert other_cache.get("2") == [["b"]]
+    assert other_cache.get("3") is None
+
+    stats = other_cache.stats
+    assert (stats.hits, stats.disk_hits, stats.misses) == (1, 1, 1)
+    assert stats.hit_rate == 0.5
+
+    assert PhonemeCache(max_entries=10).stats.hit_rate == 0
+
+
+def test_database_only(tmp_path: Path) -> None:
+    """Entries are not held in memory with max_entries=0."""
+    cache = PhonemeCache(max_entries=0, db_path=tmp_path / "phonemes.db")
+    cache.put("1", [["a"]])
+    assert len(cache) == 0
+
+    assert cache.get("1") == [["a"]]
+    assert cache.get("1") == [["a"]]
+    assert len(cache) == 0
+
+    stats = cache.stats
+    assert (stats.hits, stats.disk_hits, stats.evictions) == (2, 2, 0)
@@ -0,0 +1,62 @@
+"""Tests for converting phonemes to ids."""
+
+import numpy as np
+
+from piper.config import PhonemeType, PiperConfig
+from piper.const import BOS, EOS, PAD
+from piper.phoneme_ids import DEFAULT_PHONEME_ID_MAP, PhonemeIdEncoder, phonemes_to_ids
+
+
+def test_encode() -> None:
+    """Encoder matches phonemes_to_ids for a map with one id per phoneme."""
+    phonemes = list("ðɪs ɪz ɐ tˈɛst.")
+    phoneme_ids = PhonemeIdEncoder(DEFAULT_PHONEME_ID_MAP).encode(phonemes)
+    assert phoneme_ids.dtype == np.int64
+    assert phoneme_ids.tolist() == phonemes_to_ids(phonemes, DEFAULT_PHONEME_ID_MAP)
+
+    # No phonemes
+    assert PhonemeIdEncoder(DEFAULT_PHONEME_ID_MAP).encode([]).tolist() == [1, 0, 2]
+
+
+def test_encode_multiple_ids() -> None:
+    """Phonemes with several ids (or several PAD ids) are supported."""
+    id_map = {PAD: [0, 9], BOS: [1], EOS: [2], "a": [3], "b": [4, 5], "c": []}
+    encoder = PhonemeIdEncoder(id_map)
+    for phonemes in (["a", "b", "c", "a"], [], ["c"]):
+        assert encoder.encode(phonemes).tolist() == phonemes_to_ids(phonemes, id_map)
+
+
+def test_encode_pad_after() -> None:
+    """Only some phonemes are followed by PAD (e.g. pinyin groups)."""
+    id_map = {PAD: [0], BOS: [1], EOS: [2], "n": [3], "i": [4], "3": [5]}
+    encoder = PhonemeIdEncoder(id_map, pad_after={"3"})
+    phoneme_ids = encoder.encode(["n", "i", "3", "n", "i", "3"])
+    assert phoneme_ids.tolist() == [1, 3, 4, 5, 0, 3, 4, 5, 0, 2]
+
+
+def test_encode_missing_phonemes() -> None:
+    """Missing phonemes are skipped and counted."""
+    encoder = PhonemeIdEncoder(DEFAULT_PHONEME_ID_MAP)
+    assert encoder.encode(["a", "☃", "b", "☃", "☂"]).tolist() == phonemes_to_ids(
+        ["a", "b"], DEFAULT_PHONEME_ID_MAP
+    )
+    encoder.encode(["☃"])
+    assert encoder.missing_phonemes == {"☃": 3, "☂": 1}
+
+
+def test_config_encoder() -> None:
+    """Encoder is compiled once per phoneme id map."""
+    config = PiperConfig(
+        num_symbols=len(DEFAULT_PHONEME_ID_MAP),
+        num_speakers=1,
+        sample_rate=22050,
+        espeak_voice="en-us",
+        phoneme_id_map=DEFAULT_PHONEME_ID_MAP,
+        phoneme_type=PhonemeType.ESPEAK,
+    )
+    encoder = config.phoneme_id_encoder
+    assert config.phoneme_id_encoder is encoder
+
+    config.phoneme_id_map = {**DEFAULT_PHONEME_ID_MAP, "a": [99]}
+    assert config.phoneme_id_encoder is not encoder
+    assert config.phoneme_id_encoder.encode(["a"]).tolist() == [1, 0, 99, 0, 2]
@@ -1,18 +1,30 @@
 """Tests for Piper."""
 
+import asyncio
+import dataclasses
 import io
+import logging
+import mmap
+import os
 import shutil
 import struct
 import sys
+import threading
+import time
 import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 
-from piper import PiperVoice
+from piper import AudioCache, AudioChunk, PiperVoice, SessionConfig, SynthesisConfig
 from piper.const import BOS, EOS
-from piper.phonemize_espeak import EspeakPhonemizer
+from piper.phonemize_espeak import EspeakPhonemizer, EspeakPhonemizerPool
+from piper.session_binding import SessionBinding
 
 from . import EN_US_VOWEL_CLUSTERS
 
@@ -21,6 +33,13 @@ _TESTS_DIR = _DIR
 _TEST_VOICE = _TESTS_DIR / "test_voice.onnx"
 _TEST_CONFIG = _TESTS_DIR / "test_voice.onnx.json"
 
+# Tiny VITS model with random weights (see generate_vits_test_voice.py)
+_TEST_VITS_VOICE = _TESTS_DIR / "test_vits_voice.onnx"
+
+# Frames at the end of a shorter sentence in a batch whose audio is affected by
+# padding (the decoder convolutions are not masked).
+_PADDING_EDGE_FRAMES = 8
+
 
 def test_load_voice() -> None:
     """Test loading a voice that generates silence."""
@@ -32,6 +51,203 @@ def test_load_voice() -> None:
     assert voice.config.espeak_voice == "en-us"
 
 
+def test_load_session_config() -> None:
+    """Test onnxruntime session settings."""
+    voice = PiperVoice.load(
+        _TEST_VOICE,
+        session_config=SessionConfig(
+            intra_op_num_threads=1,
+            graph_optimization_level="basic",
+            enable_cpu_mem_arena=False,
+            allow_spinning=False,
+        ),
+    )
+    sess_options = voice.session.get_session_options()
+    assert sess_options.intra_op_num_threads == 1
+    assert not sess_options.enable_cpu_mem_arena
+    assert (
+        sess_options.get_session_config_entry("session.intra_op.allow_spinning") == "0"
+    )
+    assert list(voice.synthesize("This is a test."))
+
+    with pytest.raises(ValueError):
+        PiperVoice.load(
+            _TEST_VOICE, session_config=SessionConfig(execution_mode="fast")
+        )
+
+
+def test_load_session_pool() -> None:
+    """Test running the voice model from several threads with a session pool."""
+    voice = PiperVoice.load(
+        _TEST_VOICE,
+        session_config=SessionConfig(num_sessions=2, intra_op_num_threads=4),
+    )
+    assert voice.session_pool is not None
+    assert len(voice.session_pool) == 2
+    assert voice.session is voice.session_pool.sessions[0]
+
+    # Thread budget is split between sessions
+    for session in voice.session_pool.sessions:
+        assert session.get_session_options().intra_op_num_threads == 2
+
+    texts = ["This is a test.", "This is another test.", "Test."] * 4
+    expected_phonemes = [[c.phonemes for c in voice.synthesize(text)] for text in texts]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        actual_phonemes = list(
+            executor.map(
+                lambda text: [c.phonemes for c in voice.synthesize(text)], texts
+            )
+        )
+
+    assert actual_phonemes == expected_phonemes
+    assert voice.session_pool.num_available == 2
+
+
+def test_load_io_binding() -> None:
+    """Test running the voice model with reused input buffers."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    bound_voice = PiperVoice.load(
+        _TEST_VOICE, session_config=SessionConfig(use_io_binding=True)
+    )
+    assert bound_voice.io_binding
+
+    text = "This is a longer test sentence. Test."
+    syn_config = SynthesisConfig(normalize_audio=False)
+    expected_audio = [c.audio_int16_bytes for c in voice.synthesize(text, syn_config)]
+    assert [
+        c.audio_int16_bytes for c in bound_voice.synthesize(text, syn_config)
+    ] == expected_audio
+
+
+def test_load_io_binding_batched() -> None:
+    """Test padded batches and noise inputs from reused input buffers."""
+    pytest.importorskip("onnx")
+    voice = PiperVoice.load(_TEST_VITS_VOICE, include_alignments=True)
+    bound_voice = PiperVoice.load(
+        _TEST_VITS_VOICE,
+        include_alignments=True,
+        session_config=SessionConfig(use_io_binding=True),
+    )
+
+    def get_audio(piper_voice: PiperVoice, text: str) -> list[np.ndarray]:
+        syn_config = SynthesisConfig(seed=1, normalize_audio=False, batch_size=2)
+        return [
+            chunk.audio_float_array
+            for chunk in piper_voice.synthesize(
+                text, syn_config, include_alignments=True
+            )
+        ]
+
+    # Longer sentences first, so buffers are reused for shorter ones after
+    for text in (
+        "This is a much longer test sentence. This is another long one.",
+        "Test. This is a test. Short.",
+    ):
+        expected_audio = get_audio(voice, text)
+        with patch.object(
+            SessionBinding,
+            "get_buffer",
+            autospec=True,
+            side_effect=SessionBinding.get_buffer,
+        ) as get_buffer:
+            audio = get_audio(bound_voice, text)
+
+        buffer_names = {call.args[1] for call in get_buffer.call_args_list}
+        assert {"input", "noise", "noise_w"} <= buffer_names
+        assert len(audio) == len(expected_audio)
+        for sentence_audio, expected_sentence_audio in zip(audio, expected_audio):
+            np.testing.assert_allclose(
+                sentence_audio, expected_sentence_audio, atol=1e-6
+            )
+
+
+def test_load_io_binding_concurrent() -> None:
+    """Test that concurrent runs of one session each get their own buffers."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    bound_voice = PiperVoice.load(
+        _TEST_VOICE, session_config=SessionConfig(use_io_binding=True)
+    )
+    texts = ["This is a test.", "This is a longer test sentence."]
+    syn_config = SynthesisConfig(normalize_audio=False)
+    expected_audio = [
+        [c.audio_int16_bytes for c in voice.synthesize(text, syn_config)]
+        for text in texts
+    ]
+
+    # Both runs are in progress at once
+    barrier = threading.Barrier(len(texts))
+    binding_ids: set[int] = set()
+    original_run = SessionBinding.run
+
+    def run(binding: SessionBinding, args):
+        binding_ids.add(id(binding))
+        barrier.wait(timeout=5)
+        return original_run(binding, args)
+
+    def synthesize(text: str) -> list[bytes]:
+        return [c.audio_int16_bytes for c in bound_voice.synthesize(text, syn_config)]
+
+    with patch.object(SessionBinding, "run", autospec=True, side_effect=run):
+        with ThreadPoolExecutor(len(texts)) as executor:
+            audio = list(executor.map(synthesize, texts))
+
+    assert len(binding_ids) == len(texts)
+    assert audio == expected_audio
+
+
+def test_session_binding_buffers() -> None:
+    """Buffers grow by doubling and keep their contents."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    binding = SessionBinding(voice.session)
+
+    buffer = binding.get_buffer("input", (1, 10), np.int64)
+    buffer[:] = np.arange(10)
+    smaller = binding.get_buffer("input", (2, 3), np.int64)
+    assert np.shares_memory(buffer, smaller)
+    assert smaller.flags.c_contiguous
+    assert smaller.reshape(-1).tolist() == list(range(6))
+    assert binding.buffer_bytes == 10 * 8
+
+    binding.get_buffer("input", (1, 11), np.int64)
+    assert binding.buffer_bytes == 20 * 8
+
+    # A different type replaces the buffer
+    binding.get_buffer("input", (1, 3), np.float32)
+    assert binding.buffer_bytes == 3 * 4
+
+
+def test_warmup() -> None:
+    """Test running the voice model on dummy input."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    with patch.object(voice.session, "run", wraps=voice.session.run) as run:
+        assert voice.warmup() > 0
+        assert run.call_count == 3
+        assert [call.args[1]["input"].shape[1] for call in run.call_args_list] == [
+            16,
+            64,
+            256,
+        ]
+
+    # Default speaker only, including the duration model
+    voice.session = _FakeAlignmentSession(voice.config.hop_length)
+    voice.config.num_speakers = 3
+    voice.durations_session = _FakeDurationsSession()
+    with patch.object(
+        voice.durations_session, "run", wraps=voice.durations_session.run
+    ) as durations_run:
+        voice.warmup(lengths=[8, 4])
+        assert voice.session.batch_sizes == [1, 1]
+        assert [
+            call.args[1]["input"].shape[1] for call in durations_run.call_args_list
+        ] == [4, 8]
+
+    # Every other speaker at the shortest length
+    voice.session = _FakeAlignmentSession(voice.config.hop_length)
+    voice.warmup(lengths=[8, 4], all_speakers=True)
+    assert voice.session.batch_sizes == [1, 1, 1, 1]
+
+
 def test_phonemize_synthesize() -> None:
     """Test phonemizing and synthesizing."""
     voice = PiperVoice.load(_TEST_VOICE)
@@ -108,6 +324,17 @@ def test_phonemize_synthesize() -> None:
     assert not any(audio_array)
 
 
+def test_phonemize_pool() -> None:
+    """Voice phonemizes the same with a pool of espeak-ng processes."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    text = "Test 1, [[ tˈɛst ]] two. Test 3"
+    expected_phonemes = voice.phonemize(text)
+
+    with EspeakPhonemizerPool(num_processes=1) as pool:
+        voice.espeak_phonemizer_pool = pool
+        assert voice.phonemize(text) == expected_phonemes
+
+
 def test_language_switch_flags_removed() -> None:
     """Test that (language) switch (flags) are removed."""
     phonemizer = EspeakPhonemizer()
@@ -442,6 +669,669 @@ def test_synthesize_alignment() -> None:
             assert actual_alignment.phoneme_ids == expected_ids
 
 
+def test_synthesize_batched() -> None:
+    """Test synthesizing several sentences per voice model run."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.session = _FakeAlignmentSession(voice.config.hop_length)
+
+    text = "Test. This is a test. Test 1. This is another test. Test 2."
+    syn_config = SynthesisConfig(batch_size=2, normalize_audio=False)
+    audio_chunks = list(voice.synthesize(text, syn_config, include_alignments=True))
+
+    # 5 sentences in batches of 2
+    assert voice.session.batch_sizes == [2, 2, 1]
+
+    expected_chunks = list(
+        voice.synthesize(text, SynthesisConfig(normalize_audio=False))
+    )
+
+    # Same order and audio as without batching
+    assert len(audio_chunks) == len(expected_chunks) == 5
+    for chunk, expected_chunk in zip(audio_chunks, expected_chunks):
+        assert chunk.phonemes == expected_chunk.phonemes
+        assert chunk.phoneme_ids == expected_chunk.phoneme_ids
+        assert len(chunk.audio_float_array) == (
+            len(chunk.phoneme_ids) * voice.config.hop_length
+        )
+        assert (chunk.audio_float_array == expected_chunk.audio_float_array).all()
+        assert chunk.phoneme_alignments is not None
+
+
+def test_synthesize_batched_vits() -> None:
+    """Test splitting batched audio from a real voice model into sentences."""
+    pytest.importorskip("onnx")
+    voice = PiperVoice.load(_TEST_VITS_VOICE, include_alignments=True)
+    hop_length = voice.config.hop_length
+
+    text = (
+        "Test. This is a test. This is another, somewhat longer test. "
+        "And a fourth sentence that is the longest of them all."
+    )
+
+    # No noise, so audio only depends on batching
+    syn_config = SynthesisConfig(
+        noise_scale=0.0, noise_w_scale=0.0, normalize_audio=False
+    )
+    expected_chunks = list(voice.synthesize(text, syn_config, include_alignments=True))
+
+    syn_config.batch_size = 4
+    audio_chunks = list(voice.synthesize(text, syn_config, include_alignments=True))
+
+    assert len(audio_chunks) == len(expected_chunks) == 4
+    for chunk, expected_chunk in zip(audio_chunks, expected_chunks):
+        assert chunk.phoneme_ids == expected_chunk.phoneme_ids
+        assert chunk.phoneme_id_samples is not None
+        assert expected_chunk.phoneme_id_samples is not None
+        assert np.array_equal(
+            chunk.phoneme_id_samples, expected_chunk.phoneme_id_samples
+        )
+        assert len(chunk.audio_float_array) == chunk.phoneme_id_samples.sum()
+
+    # All sentences are in one batch, so only the longest has no padding
+    _assert_same_audio_before_padding(audio_chunks, expected_chunks, hop_length)
+    assert np.allclose(
+        audio_chunks[-1].audio_float_array,
+        expected_chunks[-1].audio_float_array,
+        atol=1e-5,
+    )
+
+
+def test_synthesize_batched_vits_normalized() -> None:
+    """Test that padding in a batch doesn't change normalized audio."""
+    pytest.importorskip("onnx")
+    voice = PiperVoice.load(_TEST_VITS_VOICE, include_alignments=True)
+
+    # Audio for the first sentence peaks in its last frames when run alone
+    text = "Hi. And a second sentence that is longer than the first."
+    syn_config = SynthesisConfig(noise_scale=0.0, noise_w_scale=0.0)
+    expected_chunks = list(voice.synthesize(text, syn_config))
+
+    syn_config.batch_size = 2
+    audio_chunks = list(voice.synthesize(text, syn_config))
+
+    assert len(audio_chunks) == len(expected_chunks) == 2
+    _assert_same_audio_before_padding(
+        audio_chunks, expected_chunks, voice.config.hop_length
+    )
+
+
+def test_synthesize_batched_no_alignments(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that batch_size without alignments warns once and runs sentences alone."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    text = "This is a test. This is another test."
+    expected_chunks = list(voice.synthesize(text))
+
+    syn_config = SynthesisConfig(batch_size=2)
+    with caplog.at_level(logging.WARNING, logger="piper.voice"):
+        audio_chunks = list(voice.synthesize(text, syn_config))
+        list(voice.synthesize(text, syn_config))
+
+    assert [c.phoneme_ids for c in audio_chunks] == [
+        c.phoneme_ids for c in expected_chunks
+    ]
+    assert len([r for r in caplog.records if "batch_size" in r.getMessage()]) == 1
+
+
+def _assert_same_audio_before_padding(
+    audio_chunks: list[AudioChunk], expected_chunks: list[AudioChunk], hop_length: int
+) -> None:
+    """Check audio matches, except where padding in a batch can change it."""
+    edge_samples = _PADDING_EDGE_FRAMES * hop_length
+    for chunk, expected_chunk in zip(audio_chunks, expected_chunks):
+        audio = chunk.audio_float_array
+        expected_audio = expected_chunk.audio_float_array
+        assert len(audio) == len(expected_audio)
+        assert len(audio) > edge_samples
+        assert np.allclose(
+            audio[:-edge_samples], expected_audio[:-edge_samples], atol=1e-5
+        )
+
+
+def test_synthesize_phonemize_ahead() -> None:
+    """Test phonemizing in a background thread while the voice model runs."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    text = "This is a test. This is another test. And a third."
+    expected_chunks = list(voice.synthesize(text))
+
+    phonemize_threads: set[str] = set()
+    original_phonemize = voice.phonemize
+
+    def phonemize(sentence_text: str) -> list[list[str]]:
+        phonemize_threads.add(threading.current_thread().name)
+        return original_phonemize(sentence_text)
+
+    syn_config = SynthesisConfig(phonemize_ahead=1)
+    with patch.object(voice, "phonemize", phonemize):
+        audio_chunks = list(voice.synthesize(text, syn_config))
+
+    assert phonemize_threads == {"piper-phonemize"}
+    assert [c.phonemes for c in audio_chunks] == [c.phonemes for c in expected_chunks]
+    assert [c.phoneme_ids for c in audio_chunks] == [
+        c.phoneme_ids for c in expected_chunks
+    ]
+
+    # Stopping early also stops the background thread
+    audio_stream = iter(voice.synthesize(text, syn_config))
+    next(audio_stream)
+    audio_stream.close()  # type: ignore[attr-defined]
+    assert not any(t.name == "piper-phonemize" for t in threading.enumerate())
+
+
+def test_synthesize_phonemize_ahead_missing_sentence_stream() -> None:
+    """Test that phonemize_ahead explains how to install sentence-stream."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    syn_config = SynthesisConfig(phonemize_ahead=1)
+
+    with patch.dict(sys.modules, {"sentence_stream": None}):
+        with pytest.raises(ImportError, match=r"piper-tts\[stream\]"):
+            list(voice.synthesize("This is a test.", syn_config))
+
+        with pytest.raises(ImportError, match=r"piper-tts\[stream\]"):
+            list(voice.synthesize_stream(["This is a test."]))
+
+    # Doesn't need sentence-stream
+    assert list(voice.synthesize("This is a test."))
+
+
+def test_synthesize_seed() -> None:
+    """Test reproducible audio from voice models with noise inputs."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.session = _FakeAlignmentSession(voice.config.hop_length, noise_channels=4)
+    text = "Test. This is a test. Test 1. This is another test."
+
+    def get_audio(syn_config: SynthesisConfig) -> list[np.ndarray]:
+        return [chunk.audio_float_array for chunk in voice.synthesize(text, syn_config)]
+
+    audio_1 = get_audio(SynthesisConfig(seed=1, normalize_audio=False))
+    assert len(audio_1) == 4
+
+    # Same seed, with and without batching
+    for syn_config in (
+        SynthesisConfig(seed=1, normalize_audio=False),
+        SynthesisConfig(seed=1, normalize_audio=False, batch_size=2),
+    ):
+        assert all(np.array_equal(a, b) for a, b in zip(audio_1, get_audio(syn_config)))
+
+    # Different seed
+    audio_2 = get_audio(SynthesisConfig(seed=2, normalize_audio=False))
+    assert not any(np.array_equal(a, b) for a, b in zip(audio_1, audio_2))
+
+
+def test_synthesize_seed_vits() -> None:
+    """Test what a seed guarantees for a real voice model with noise inputs."""
+    pytest.importorskip("onnx")
+    voice = PiperVoice.load(_TEST_VITS_VOICE, include_alignments=True)
+    text = (
+        "Test. This is a test. This is another, somewhat longer test. "
+        "And a fourth sentence that is the longest of them all."
+    )
+
+    def get_chunks(syn_config: SynthesisConfig) -> list[AudioChunk]:
+        return list(voice.synthesize(text, syn_config, include_alignments=True))
+
+    chunks_1 = get_chunks(SynthesisConfig(seed=1, normalize_audio=False))
+    assert len(chunks_1) == 4
+
+    # Same seed: identical audio
+    for chunk, expected_chunk in zip(
+        get_chunks(SynthesisConfig(seed=1, normalize_audio=False)), chunks_1
+    ):
+        assert np.array_equal(chunk.audio_float_array, expected_chunk.audio_float_array)
+
+    # Same seed in a batch: same noise, so same durations, and the same audio
+    # except for the frames next to padding.
+    batched_chunks = get_chunks(
+        SynthesisConfig(seed=1, normalize_audio=False, batch_size=4)
+    )
+    for chunk, expected_chunk in zip(batched_chunks, chunks_1):
+        assert chunk.phoneme_id_samples is not None
+        assert expected_chunk.phoneme_id_samples is not None
+        assert np.array_equal(
+            chunk.phoneme_id_samples, expected_chunk.phoneme_id_samples
+        )
+
+    _assert_same_audio_before_padding(batched_chunks, chunks_1, voice.config.hop_length)
+
+    # Different seed
+    chunks_2 = get_chunks(SynthesisConfig(seed=2, normalize_audio=False))
+    assert not any(
+        (len(a.audio_float_array) == len(b.audio_float_array))
+        and np.allclose(a.audio_float_array, b.audio_float_array)
+        for a, b in zip(chunks_1, chunks_2)
+    )
+
+
+def test_synthesize_streaming() -> None:
+    """Test decoding sentences a window at a time."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    hop_length = voice.config.hop_length
+
+    with pytest.raises(ValueError):
+        next(iter(voice.synthesize_streaming("This is a test.")))
+
+    with pytest.raises(FileNotFoundError):
+        PiperVoice.load(_TEST_VOICE, streaming=True)
+
+    voice.encoder_session = _FakeEncoderSession()
+    voice.decoder_session = _FakeDecoderSession(hop_length)
+
+    text = "This is a test. This is another test."
+    syn_config = SynthesisConfig(volume=0.5)
+    audio_chunks = list(voice.synthesize_streaming(text, syn_config, chunk_frames=8))
+
+    # Phonemes are only on the first chunk of each sentence
+    sentence_audio: list[list[np.ndarray]] = []
+    for chunk in audio_chunks:
+        assert chunk.sample_rate == voice.config.sample_rate
+        if chunk.phonemes:
+            sentence_audio.append([])
+        else:
+            assert not chunk.phoneme_ids
+
+        sentence_audio[-1].append(chunk.audio_float_array)
+
+    sentence_phonemes = voice.phonemize(text)
+    assert len(sentence_audio) == len(sentence_phonemes) == 2
+    for phonemes, chunk_audio in zip(sentence_phonemes, sentence_audio):
+        # Several windows per sentence, joined without gaps or overlap
+        phoneme_ids = voice.phonemes_to_ids(phonemes)
+        assert len(chunk_audio) > 1
+        expected_audio = np.repeat(np.array(phoneme_ids) / 256, hop_length) * 0.5
+        np.testing.assert_allclose(
+            np.concatenate(chunk_audio), expected_audio, atol=1e-6
+        )
+
+
+def test_synthesize_max_sentence_phonemes() -> None:
+    """Test splitting long sentences at clause boundaries."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    text = (
+        "This is a test, with several clauses; each of them is short: "
+        "but together they make a long sentence. Short one."
+    )
+    sentence_phonemes = voice.phonemize(text)
+    assert len(sentence_phonemes) == 2
+    long_phonemes, short_phonemes = sentence_phonemes[0], sentence_phonemes[1]
+
+    audio_chunks = list(
+        voice.synthesize(text, SynthesisConfig(max_sentence_phonemes=30))
+    )
+    assert len(audio_chunks) > 2
+
+    # Parts end at clauses and join back into the original sentence
+    *long_chunks, short_chunk = audio_chunks
+    for chunk in long_chunks[:-1]:
+        assert chunk.phonemes[-2] in (",", ";", ":")
+        assert chunk.phonemes[-1] == " "
+
+    assert sum((c.phonemes for c in long_chunks), []) == long_phonemes
+    assert short_chunk.phonemes == short_phonemes
+
+    # Sentences that fit are left alone
+    audio_chunks = list(
+        voice.synthesize(text, SynthesisConfig(max_sentence_phonemes=1000))
+    )
+    assert [c.phonemes for c in audio_chunks] == [long_phonemes, short_phonemes]
+
+
+def test_synthesize_audio_cache() -> None:
+    """Test skipping the voice model for repeated sentences."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.audio_cache = AudioCache(max_bytes=1024 * 1024)
+
+    with patch.object(voice.session, "run", wraps=voice.session.run) as run:
+        list(voice.synthesize("This is a test. This is another test."))
+        assert run.call_count == 2
+
+        # Same sentences
+        audio_chunks = list(voice.synthesize("This is another test. This is a test."))
+        assert run.call_count == 2
+
+        # Different settings
+        list(voice.synthesize("This is a test.", SynthesisConfig(length_scale=2.0)))
+        assert run.call_count == 3
+
+    assert len(audio_chunks) == 2
+    assert all(len(c.audio_float_array) == 22050 for c in audio_chunks)
+
+    stats = voice.audio_cache.stats
+    assert stats.hits == 2
+    assert stats.misses == 3
+
+
+def test_synthesize_audio_cache_postprocess() -> None:
+    """Test that post-processing does not modify cached audio."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.audio_cache = AudioCache(max_bytes=1024 * 1024)
+    model_audio = np.full((1, 1, 100), 0.25, dtype=np.float32)
+    syn_config = SynthesisConfig(normalize_audio=False, volume=0.5)
+
+    with patch.object(
+        voice.session, "run", side_effect=lambda *_: [model_audio.copy()]
+    ):
+        for _ in range(2):
+            (audio_chunk,) = voice.synthesize("This is a test.", syn_config)
+            assert (audio_chunk.audio_float_array == 0.125).all()
+
+    assert voice.audio_cache.stats.hits == 1
+
+
+def test_audio_chunk_int16() -> None:
+    """Test converting float audio to 16-bit samples."""
+    audio_chunk = AudioChunk(
+        sample_rate=22050,
+        sample_width=2,
+        sample_channels=1,
+        audio_float_array=np.array([0.0, 0.5, -1.0, 1.5, -2.0], dtype=np.float32),
+        phonemes=[],
+        phoneme_ids=[],
+    )
+    assert audio_chunk.audio_int16_array.tolist() == [0, 16383, -32767, 32767, -32767]
+
+    audio_bytes = audio_chunk.audio_int16_bytes
+    assert audio_bytes == audio_chunk.audio_int16_array.tobytes()
+
+    audio_view = audio_chunk.audio_int16_memoryview
+    assert audio_view.readonly
+    assert audio_view.tobytes() == audio_bytes
+
+
+def test_audio_chunk_drop_float_audio() -> None:
+    """Test keeping only int16 samples in an audio chunk."""
+    audio_float = np.array([0.0, 0.5, -1.0], dtype=np.float32)
+    audio_chunk = AudioChunk(
+        sample_rate=22050,
+        sample_width=2,
+        sample_channels=1,
+        audio_float_array=audio_float,
+        phonemes=["a", "b"],
+        phoneme_ids=[1, 0, 14, 0, 15, 0, 2],
+    )
+    assert audio_chunk.phonemes == ["a", "b"]
+    assert audio_chunk.phoneme_ids == [1, 0, 14, 0, 15, 0, 2]
+    assert audio_chunk.phoneme_ids_array.dtype == np.int64
+
+    audio_int16 = audio_chunk.audio_int16_array
+    audio_chunk.drop_float_audio()
+    assert audio_chunk.audio_int16_array is audio_int16
+    assert audio_chunk.num_samples == 3
+    np.testing.assert_allclose(audio_chunk.audio_float_array, audio_float, atol=1e-4)
+
+    # Only int16
+    pcm_chunk = AudioChunk(
+        sample_rate=22050,
+        sample_width=2,
+        sample_channels=1,
+        audio_int16_array=audio_int16,
+    )
+    assert pcm_chunk.audio_int16_bytes == audio_int16.tobytes()
+    assert not pcm_chunk.phonemes
+
+    with pytest.raises(ValueError):
+        AudioChunk(sample_rate=22050, sample_width=2, sample_channels=1)
+
+
+def test_audio_chunk_dataclass() -> None:
+    """Test that audio chunks work with dataclass functions."""
+    audio_chunk = AudioChunk(
+        sample_rate=22050,
+        sample_width=2,
+        sample_channels=1,
+        audio_float_array=np.array([0.0, 0.5, -1.0], dtype=np.float32),
+        phonemes=["a", "b"],
+        phoneme_ids=[1, 14, 15, 2],
+    )
+    assert [f.name for f in dataclasses.fields(audio_chunk)] == [
+        "sample_rate",
+        "sample_width",
+        "sample_channels",
+        "audio_float_array",
+        "phonemes",
+        "phoneme_ids",
+        "phoneme_id_samples",
+        "phoneme_alignments",
+        "audio_int16_array",
+    ]
+    assert repr(audio_chunk).startswith("AudioChunk(sample_rate=22050, ")
+
+    chunk_dict = dataclasses.asdict(audio_chunk)
+    assert chunk_dict["phonemes"] == ["a", "b"]
+    assert chunk_dict["phoneme_ids"] == [1, 14, 15, 2]
+    assert chunk_dict["audio_int16_array"].tolist() == [0, 16383, -32767]
+
+    # Arrays are compared by value
+    assert dataclasses.replace(audio_chunk) == audio_chunk
+    other_chunk = dataclasses.replace(audio_chunk, phonemes=["c"])
+    assert other_chunk != audio_chunk
+    assert other_chunk.phonemes == ["c"]
+    assert other_chunk.phoneme_ids_array.dtype == np.int64
+
+    # Only int16
+    audio_chunk.drop_float_audio()
+    pcm_chunk = dataclasses.replace(audio_chunk)
+    assert pcm_chunk.audio_int16_array.tolist() == [0, 16383, -32767]
+
+
+def test_synthesize_async() -> None:
+    """Test synthesizing from asyncio."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.session = _FakeAlignmentSession(voice.config.hop_length)
+    text = "This is a test. This is another test."
+    expected_chunks = list(voice.synthesize(text, include_alignments=True))
+
+    async def synthesize() -> list[AudioChunk]:
+        return [
+            audio_chunk
+            async for audio_chunk in voice.synthesize_async(
+                text, include_alignments=True
+            )
+        ]
+
+    audio_chunks = asyncio.run(synthesize())
+    assert len(audio_chunks) == len(expected_chunks) == 2
+    for audio_chunk, expected_chunk in zip(audio_chunks, expected_chunks):
+        assert audio_chunk.phonemes == expected_chunk.phonemes
+        assert (audio_chunk.audio_float_array == expected_chunk.audio_float_array).all()
+        assert audio_chunk.phoneme_alignments == expected_chunk.phoneme_alignments
+
+
+def test_synthesize_async_cancel() -> None:
+    """Test that cancelling stops synthesis at the next sentence."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.session = _FakeAlignmentSession(voice.config.hop_length)
+    text = " ".join(f"Test {i}." for i in range(10))
+    original_run = voice.session.run
+    num_runs = 0
+
+    def run(*args, **kwargs):
+        nonlocal num_runs
+        num_runs += 1
+        time.sleep(0.05)
+        return original_run(*args, **kwargs)
+
+    async def synthesize_one() -> None:
+        first_chunk = asyncio.Event()
+
+        async def synthesize() -> None:
+            async for _audio_chunk in voice.synthesize_async(text):
+                first_chunk.set()
+
+        task = asyncio.create_task(synthesize())
+        await first_chunk.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with patch.object(voice.session, "run", side_effect=run):
+        asyncio.run(synthesize_one())
+        voice.close_async()
+
+    assert 1 <= num_runs <= 2
+
+
+def test_synthesize_async_max_workers() -> None:
+    """Test limiting concurrent synthesis per voice."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.session = _FakeAlignmentSession(voice.config.hop_length)
+    voice.max_async_workers = 2
+    original_run = voice.session.run
+    lock = threading.Lock()
+    num_running = 0
+    max_running = 0
+
+    def run(*args, **kwargs):
+        nonlocal num_running, max_running
+        with lock:
+            num_running += 1
+            max_running = max(max_running, num_running)
+
+        time.sleep(0.02)
+        with lock:
+            num_running -= 1
+
+        return original_run(*args, **kwargs)
+
+    async def synthesize(text: str) -> list[str]:
+        return [
+            phoneme
+            async for audio_chunk in voice.synthesize_async(text)
+            for phoneme in audio_chunk.phonemes
+        ]
+
+    async def synthesize_all() -> list[list[str]]:
+        return await asyncio.gather(
+            *(synthesize(f"Test {i}. Another test.") for i in range(4))
+        )
+
+    expected_results = [
+        [
+            p
+            for sentence in voice.phonemize(f"Test {i}. Another test.")
+            for p in sentence
+        ]
+        for i in range(4)
+    ]
+
+    with patch.object(voice.session, "run", side_effect=run):
+        results = asyncio.run(synthesize_all())
+
+    assert max_running == 2
+    assert results == expected_results
+
+    # Thread pool is created again after closing
+    voice.close_async()
+    voice.max_async_workers = 1
+    max_running = 0
+    with patch.object(voice.session, "run", side_effect=run):
+        results = asyncio.run(synthesize_all())
+
+    assert max_running == 1
+    assert results == expected_results
+    voice.close_async()
+
+
+def test_synthesize_async_close_async() -> None:
+    """Test closing a synthesize_async iterator after its thread pool is shut down."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    closed = threading.Event()
+    original_synthesize = voice.synthesize
+
+    def synthesize(*args, **kwargs):
+        try:
+            yield from original_synthesize(*args, **kwargs)
+        finally:
+            closed.set()
+
+    async def synthesize_one() -> AudioChunk:
+        audio_chunks = voice.synthesize_async("This is a test. This is another test.")
+        audio_chunk = await audio_chunks.__anext__()
+        voice.close_async()
+        await audio_chunks.aclose()
+
+        return audio_chunk
+
+    with patch.object(voice, "synthesize", synthesize):
+        assert asyncio.run(synthesize_one()).phonemes
+
+    assert closed.wait(timeout=5)
+
+
+def test_synthesize_stream() -> None:
+    """Test synthesizing sentences as soon as their text is complete."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    text_pieces = ["This is", " a test. This", " is another", " test."]
+    events: list[str] = []
+
+    def text_stream():
+        for text_piece in text_pieces:
+            events.append(f"text:{text_piece}")
+            yield text_piece
+
+    for audio_chunk in voice.synthesize_stream(text_stream()):
+        events.append(f"audio:{len(audio_chunk.phonemes)}")
+
+    expected_chunks = list(voice.synthesize("".join(text_pieces)))
+    assert [e for e in events if e.startswith("audio:")] == [
+        f"audio:{len(c.phonemes)}" for c in expected_chunks
+    ]
+
+    # First sentence is synthesized before the rest of the text is read
+    assert events.index(f"audio:{len(expected_chunks[0].phonemes)}") < events.index(
+        "text: test."
+    )
+
+
+def test_synthesize_stream_async() -> None:
+    """Test synthesizing sentences from an async text stream."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    text_pieces = ["This is", " a test. This", " is another", " test."]
+
+    async def text_stream():
+        for text_piece in text_pieces:
+            await asyncio.sleep(0)
+            yield text_piece
+
+    async def synthesize() -> list[AudioChunk]:
+        return [
+            audio_chunk
+            async for audio_chunk in voice.synthesize_stream_async(text_stream())
+        ]
+
+    audio_chunks = asyncio.run(synthesize())
+    expected_chunks = list(voice.synthesize("".join(text_pieces)))
+    assert [c.phonemes for c in audio_chunks] == [c.phonemes for c in expected_chunks]
+
+    # Errors from the text stream are raised
+    async def failing_text_stream():
+        yield "This is a test. This"
+        raise ValueError("text stream failed")
+
+    async def synthesize_failing() -> None:
+        async for _audio_chunk in voice.synthesize_stream_async(failing_text_stream()):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(synthesize_failing())
+
+
+def test_synthesize_keep_float_audio() -> None:
+    """Test synthesizing chunks that only hold int16 samples."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.session = _FakeAlignmentSession(voice.config.hop_length)
+    text = "This is a test. This is another test."
+    expected_chunks = list(voice.synthesize(text))
+
+    audio_chunks = list(voice.synthesize(text, SynthesisConfig(keep_float_audio=False)))
+    assert len(audio_chunks) == len(expected_chunks)
+    for audio_chunk, expected_chunk in zip(audio_chunks, expected_chunks):
+        assert (audio_chunk.audio_int16_array == expected_chunk.audio_int16_array).all()
+
+        # Float samples were dropped, so they're recomputed from int16 each time
+        assert audio_chunk.audio_float_array is not audio_chunk.audio_float_array
+        assert expected_chunk.audio_float_array is expected_chunk.audio_float_array
+        assert audio_chunk.phoneme_ids == expected_chunk.phoneme_ids
+
+
 def test_add_alignment_output_autodetect() -> None:
     """Test autodetecting and marking the Ceil tensor as an output."""
     onnx = pytest.importorskip("onnx")
@@ -505,6 +1395,172 @@ def test_load_include_alignments_in_memory(tmp_path: Path) -> None:
     assert [o.name for o in on_disk.graph.output] == ["output"]
 
 
+def test_load_optimized_model_dir(tmp_path: Path) -> None:
+    """Test caching optimized (and alignment-patched) models between loads."""
+    onnx = pytest.importorskip("onnx")
+    import onnxruntime
+
+    optimized_model_dir = tmp_path / "optimized"
+    session_config = SessionConfig(optimized_model_dir=str(optimized_model_dir))
+    voice = PiperVoice.load(
+        _TEST_VOICE, include_alignments=True, session_config=session_config
+    )
+    assert len(list(optimized_model_dir.glob("*.onnx"))) == 1
+    assert not list(optimized_model_dir.glob("*.tmp"))
+
+    # Second load uses the cached model without patching or optimizing again
+    with patch.object(onnx, "load", side_effect=AssertionError("patched again")):
+        cached_voice = PiperVoice.load(
+            _TEST_VOICE, include_alignments=True, session_config=session_config
+        )
+
+    assert [o.name for o in cached_voice.session.get_outputs()] == [
+        o.name for o in voice.session.get_outputs()
+    ]
+    assert (
+        cached_voice.session.get_session_options().graph_optimization_level
+        == onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+    )
+    assert list(cached_voice.synthesize("This is a test."))
+
+    # Different settings are cached separately
+    PiperVoice.load(_TEST_VOICE, session_config=session_config)
+    assert len(list(optimized_model_dir.glob("*.onnx"))) == 2
+
+
+def test_get_model_key(tmp_path: Path) -> None:
+    """Test that model keys come from the file's path, size, and time."""
+    from piper.model_cache import get_model_key
+
+    model_path = tmp_path / "model.onnx"
+    shutil.copy(_TEST_VOICE, model_path)
+    settings = {"alignments": False}
+
+    # Model contents are not read
+    with patch("builtins.open", side_effect=AssertionError("model was read")):
+        key = get_model_key(model_path, settings)
+
+    assert get_model_key(model_path, settings) == key
+    assert get_model_key(model_path, {"alignments": True}) != key
+
+    # Same contents in another file
+    other_path = tmp_path / "other.onnx"
+    shutil.copy(model_path, other_path)
+    assert get_model_key(other_path, settings) != key
+
+    # Modified model
+    model_stat = model_path.stat()
+    os.utime(
+        model_path, ns=(model_stat.st_atime_ns, model_stat.st_mtime_ns + 1_000_000)
+    )
+    assert get_model_key(model_path, settings) != key
+
+
+def test_load_shared_weights(tmp_path: Path) -> None:
+    """Test loading a copy of the model with memory-mapped weights."""
+    onnx = pytest.importorskip("onnx")
+
+    shared_weights_dir = tmp_path / "shared"
+    session_config = SessionConfig(shared_weights_dir=str(shared_weights_dir))
+    voice = PiperVoice.load(_TEST_VOICE, session_config=session_config)
+    assert (
+        voice.session.get_session_options().get_session_config_entry(
+            "session.disable_prepacking"
+        )
+        == "1"
+    )
+    assert list(voice.synthesize("This is a test."))
+
+    (shared_model_path,) = shared_weights_dir.glob("*.onnx")
+    assert shared_model_path.with_name(f"{shared_model_path.name}.data").exists()
+
+    # Copy is reused
+    with patch.object(onnx, "load", side_effect=AssertionError("copied again")):
+        PiperVoice.load(_TEST_VOICE, session_config=session_config)
+
+    # Copy is patched for alignments
+    model_path = tmp_path / "ceil_voice.onnx"
+    _make_ceil_model(onnx, model_path)
+    shutil.copy(_TEST_CONFIG, f"{model_path}.json")
+    voice = PiperVoice.load(
+        model_path, include_alignments=True, session_config=session_config
+    )
+    assert [o.name for o in voice.session.get_outputs()] == ["output", "w_ceil"]
+
+
+def test_load_shared_weights_concurrent(tmp_path: Path) -> None:
+    """Test that loads of the same voice at once create one shared copy."""
+    onnx = pytest.importorskip("onnx")
+    from piper.model_cache import get_shared_weights_model
+
+    shared_weights_dir = tmp_path / "shared"
+    original_load = onnx.load
+    num_loads = 0
+
+    def slow_load(*args, **kwargs):
+        nonlocal num_loads
+        num_loads += 1
+        time.sleep(0.2)
+        return original_load(*args, **kwargs)
+
+    # Both calls start before the copy exists
+    with patch.object(onnx, "load", slow_load), ThreadPoolExecutor(2) as executor:
+        futures = [
+            executor.submit(get_shared_weights_model, _TEST_VOICE, shared_weights_dir)
+            for _ in range(2)
+        ]
+        shared_model_paths = {future.result() for future in futures}
+
+    assert num_loads == 1
+    (shared_model_path,) = shared_model_paths
+    assert shared_model_path is not None
+    assert shared_model_path.exists()
+
+
+def test_save_with_external_weights(tmp_path: Path) -> None:
+    """Test that large weights are moved out of the model at aligned offsets."""
+    onnx = pytest.importorskip("onnx")
+    import onnxruntime
+    from onnx import TensorProto, helper, numpy_helper
+
+    from piper.model_cache import save_with_external_weights
+
+    weights = [np.arange(1000, dtype=np.float32) * (i + 1) for i in range(2)]
+    model = helper.make_model(
+        helper.make_graph(
+            [
+                helper.make_node("Add", ["input", "w0"], ["sum"]),
+                helper.make_node("Add", ["sum", "w1"], ["output"]),
+            ],
+            "external_weights",
+            [helper.make_tensor_value_info("input", TensorProto.FLOAT, [1000])],
+            [helper.make_tensor_value_info("output", TensorProto.FLOAT, [1000])],
+            initializer=[
+                numpy_helper.from_array(w, name=f"w{i}") for i, w in enumerate(weights)
+            ],
+        ),
+        opset_imports=[helper.make_opsetid("", 15)],
+    )
+    model.ir_version = 8
+    model_path = tmp_path / "model.onnx"
+    save_with_external_weights(model, model_path)
+    assert not list(tmp_path.glob("*.tmp"))
+
+    saved_model = onnx.load(str(model_path), load_external_data=False)
+    for tensor in saved_model.graph.initializer:
+        assert tensor.data_location == TensorProto.EXTERNAL
+        external_data = {entry.key: entry.value for entry in tensor.external_data}
+        assert external_data["location"] == "model.onnx.data"
+        assert (int(external_data["offset"]) % mmap.ALLOCATIONGRANULARITY) == 0
+
+    session = onnxruntime.InferenceSession(
+        str(model_path), providers=["CPUExecutionProvider"]
+    )
+    input_array = np.ones(1000, dtype=np.float32)
+    (output,) = session.run(None, {"input": input_array})
+    np.testing.assert_allclose(output, input_array + weights[0] + weights[1])
+
+
 def test_load_include_alignments_no_ceil() -> None:
     """Test that loading falls back gracefully when there is no Ceil tensor."""
     # The test voice has no Ceil tensor, so alignments cannot be added.
@@ -515,6 +1571,184 @@ def test_load_include_alignments_no_ceil() -> None:
 # -----------------------------------------------------------------------------
 
 
+def test_predict_durations() -> None:
+    """Test phoneme timings from a duration model."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    hop_length = voice.config.hop_length
+    text = "This is a test. This is another test."
+
+    with pytest.raises(ValueError):
+        voice.predict_durations(text)
+
+    with pytest.raises(FileNotFoundError):
+        PiperVoice.load(_TEST_VOICE, durations=True)
+
+    voice.durations_session = _FakeDurationsSession()
+    sentence_alignments = voice.predict_durations(text)
+
+    sentence_phonemes = voice.phonemize(text)
+    assert len(sentence_alignments) == len(sentence_phonemes) == 2
+    for phonemes, alignments in zip(sentence_phonemes, sentence_alignments):
+        assert alignments is not None
+        assert alignments.phonemes == [BOS, *phonemes, EOS]
+
+        ids_array = np.array(voice.phonemes_to_ids(phonemes))
+        assert alignments.num_samples.sum() == (1 + ids_array % 3).sum() * hop_length
+
+    # noise_w is the same as for a full voice model with the same seed
+    durations_session = _FakeDurationsSession(noise_inputs=True)
+    voice.durations_session = durations_session
+    syn_config = SynthesisConfig(seed=1)
+    phoneme_ids = voice.phonemes_to_ids(sentence_phonemes[0])
+    voice.phoneme_ids_to_durations(phoneme_ids, syn_config)
+
+    alignment_session = _FakeAlignmentSession(hop_length, noise_channels=4)
+    voice.session = alignment_session
+    voice.phoneme_ids_to_audio(phoneme_ids, syn_config)
+    assert "noise" not in durations_session.last_args
+    np.testing.assert_array_equal(
+        durations_session.last_args["noise_w"], alignment_session.last_args["noise_w"]
+    )
+
+
+def test_get_model_inputs() -> None:
+    """Test getting voice model inputs for one sentence."""
+    voice = PiperVoice.load(_TEST_VITS_VOICE)
+    phoneme_ids = voice.phonemes_to_ids(voice.phonemize("This is a test.")[0])
+
+    model_inputs = voice.get_model_inputs(phoneme_ids, SynthesisConfig(seed=1))
+    assert set(model_inputs) == {"input", "input_lengths", "scales", "noise", "noise_w"}
+    assert model_inputs["input"].tolist() == [phoneme_ids]
+    assert model_inputs["input_lengths"].tolist() == [len(phoneme_ids)]
+    assert model_inputs["noise_w"].shape == (1, 2, len(phoneme_ids))
+
+    # Inputs can be run directly
+    audio = voice.session.run(None, model_inputs)[0].reshape(-1)
+    expected_audio = voice.phoneme_ids_to_audio(phoneme_ids, SynthesisConfig(seed=1))
+    assert isinstance(expected_audio, np.ndarray)
+    np.testing.assert_allclose(audio, expected_audio.reshape(-1), atol=1e-5)
+
+
+def test_predict_durations_missing_phoneme() -> None:
+    """Test that timings match synthesis when a phoneme is missing from the map."""
+    voice = PiperVoice.load(_TEST_VOICE)
+    voice.session = _FakeAlignmentSession(voice.config.hop_length)
+    voice.durations_session = _FakeDurationsSession()
+
+    # X is not in the phoneme id map
+    text = "Test [[ bˈæt X mæn ]] test."
+    assert "X" not in voice.config.phoneme_id_map
+
+    audio_chunks = list(voice.synthesize(text, include_alignments=True))
+    sentence_alignments = voice.predict_durations(text)
+    assert len(audio_chunks) == len(sentence_alignments) == 1
+
+    alignments = audio_chunks[0].phoneme_alignments
+    assert alignments is not None
+    assert sentence_alignments[0] is not None
+    phonemes = [alignment.phoneme for alignment in alignments]
+    assert "X" not in phonemes
+    assert phonemes == [alignment.phoneme for alignment in sentence_alignments[0]]
+
+
+class _FakeAlignmentSession:
+    """Session for a voice with alignments where every phoneme id is 1 frame.
+
+    Audio samples are the phoneme id they were produced from, scaled to [0, 1).
+    With noise_channels set, the session has noise inputs and the first noise
+    channel is added to each frame.
+    """
+
+    def __init__(self, hop_length: int, noise_channels: Optional[int] = None) -> None:
+        self.hop_length = hop_length
+        self.noise_channels = noise_channels
+        self.batch_sizes: list[int] = []
+        self.last_args: dict[str, np.ndarray] = {}
+
+    def get_inputs(self):
+        inputs = [SimpleNamespace(name="input"), SimpleNamespace(name="input_lengths")]
+        if self.noise_channels is not None:
+            inputs.append(
+                SimpleNamespace(
+                    name="noise", shape=["batch_size", self.noise_channels, "frames"]
+                )
+            )
+            inputs.append(
+                SimpleNamespace(name="noise_w", shape=["batch_size", 2, "phonemes"])
+            )
+
+        return inputs
+
+    def get_outputs(self):
+        return [SimpleNamespace(name="output"), SimpleNamespace(name="w_ceil")]
+
+    def run(self, _output_names, args):
+        phoneme_ids, lengths = args["input"], args["input_lengths"]
+        self.batch_sizes.append(len(phoneme_ids))
+        self.last_args = args
+
+        w_ceil = (np.arange(phoneme_ids.shape[1]) < lengths[:, None]).astype(np.float32)
+        frames = (phoneme_ids * w_ceil).astype(np.float32) / 256
+        if "noise" in args:
+            frames += args["noise"][:, 0, : frames.shape[1]]
+
+        audio = np.repeat(frames, self.hop_length, axis=1)
+
+        return [np.expand_dims(audio, 1), np.expand_dims(w_ceil, 1)]
+
+
+class _FakeDurationsSession:
+    """Duration model where each phoneme id is 1 + (id % 3) frames."""
+
+    def __init__(self, noise_inputs: bool = False) -> None:
+        self.noise_inputs = noise_inputs
+        self.last_args: dict[str, np.ndarray] = {}
+
+    def get_inputs(self):
+        inputs = [SimpleNamespace(name="input"), SimpleNamespace(name="input_lengths")]
+        if self.noise_inputs:
+            inputs.append(
+                SimpleNamespace(name="noise_w", shape=["batch_size", 2, "phonemes"])
+            )
+
+        return inputs
+
+    def run(self, _output_names, args):
+        self.last_args = args
+        durations = (1 + (args["input"] % 3)).astype(np.float32)
+
+        return [np.expand_dims(durations, 1)]
+
+
+class _FakeEncoderSession:
+    """Streaming encoder where every phoneme id is 1 latent frame.
+
+    The first channel of each frame is the phoneme id, scaled to [0, 1).
+    """
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input"), SimpleNamespace(name="input_lengths")]
+
+    def run(self, _output_names, args):
+        phoneme_ids = args["input"].astype(np.float32) / 256
+        z = np.zeros((len(phoneme_ids), 4, phoneme_ids.shape[1]), dtype=np.float32)
+        z[:, 0, :] = phoneme_ids
+
+        return [z]
+
+
+class _FakeDecoderSession:
+    """Streaming decoder that repeats the first channel of each latent frame."""
+
+    def __init__(self, hop_length: int) -> None:
+        self.hop_length = hop_length
+
+    def run(self, _output_names, args):
+        audio = np.repeat(args["z"][:, 0, :], self.hop_length, axis=1)
+
+        return [np.expand_dims(audio, 1)]
+
+
 def _make_ceil_model(onnx, path: Path) -> None:
     """Write a minimal ONNX model with a Ceil node (unpatched, single output)."""
     helper = onnx.helper
@@ -0,0 +1,101 @@
+"""Tests for quantizing voice models."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+_DIR = Path(__file__).parent
+_TEST_VOICE = _DIR / "test_voice.onnx"
+_TEST_CONFIG = _DIR / "test_voice.onnx.json"
+
+
+@pytest.mark.parametrize("mode", ["static", "dynamic"])
+def test_quantize_voice(tmp_path: Path, mode: str) -> None:
+    """Quantized model is written with its config and a report."""
+    pytest.importorskip("onnx")
+    from piper.quantize_voice import main
+
+    calibration_path = tmp_path / "calibration.txt"
+    calibration_path.write_text(
+        "This is a test. This is another test.\n\nA third test.\n", encoding="utf-8"
+    )
+    output_path = tmp_path / "voice.int8.onnx"
+    report_path = tmp_path / "report.json"
+
+    with patch.object(
+        sys,
+        "argv",
+        [
+            "quantize_voice",
+            str(_TEST_VOICE),
+            "--calibration-file",
+            str(calibration_path),
+            "--output-file",
+            str(output_path),
+            "--mode",
+            mode,
+            "--max-sentences",
+            "2",
+            "--report-file",
+            str(report_path),
+        ],
+    ):
+        assert main() == 0
+
+    assert output_path.exists()
+    assert Path(f"{output_path}.json").read_bytes() == _TEST_CONFIG.read_bytes()
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["mode"] == mode
+    assert report["sentences"] == 2
+    assert report["fp32"]["model_size"] == _TEST_VOICE.stat().st_size
+    assert report["int8"]["model_size"] == output_path.stat().st_size
+    assert report["fp32"]["real_time_factor"] > 0
+    assert report["spectral_distance_db"] >= 0
+
+
+def test_quantize_voice_no_sentences(tmp_path: Path) -> None:
+    """Exit code is non-zero if the calibration file has no sentences."""
+    pytest.importorskip("onnx")
+
+    calibration_path = tmp_path / "calibration.txt"
+    calibration_path.write_text("\n\n", encoding="utf-8")
+    output_path = tmp_path / "voice.int8.onnx"
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "piper.quantize_voice",
+            str(_TEST_VOICE),
+            "--calibration-file",
+            str(calibration_path),
+            "--output-file",
+            str(output_path),
+        ],
+        check=False,
+    )
+    assert result.returncode == 1
+    assert not output_path.exists()
+
+
+def test_spectral_distance() -> None:
+    """Distance is zero for the same audio and grows with the difference."""
+    pytest.importorskip("onnx")
+    from piper.quantize_voice import spectral_distance
+
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(4096).astype(np.float32)
+    assert spectral_distance(audio, audio) == 0
+
+    # Extra samples are ignored
+    assert spectral_distance(audio, np.concatenate([audio, audio])) == 0
+
+    small_noise = spectral_distance(audio + 0.01 * rng.standard_normal(4096), audio)
+    large_noise = spectral_distance(audio + 0.5 * rng.standard_normal(4096), audio)
+    assert 0 < small_noise < large_noise